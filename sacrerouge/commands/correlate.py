@@ -13,9 +13,9 @@ from typing import Dict, List, Tuple, Union
 
 from sacrerouge.commands import RootSubcommand
 from sacrerouge.common.logging import prepare_global_logging
-from sacrerouge.data import Metrics, MetricsDict
+from sacrerouge.data import Metrics, MetricsDict, MetricsTable
 from sacrerouge.io import JsonlReader
-from sacrerouge.stats import convert_to_matrices, corr_ci, global_corr, summary_level_corr, system_level_corr
+from sacrerouge.stats import corr_ci, fast_kendalltau, global_corr, summary_level_corr, system_level_corr
 
 logger = logging.getLogger(__name__)
 
@@ -116,7 +116,7 @@ def compute_summary_level_correlations(X: np.ndarray,
 
     pearson = functools.partial(summary_level_corr, pearsonr)
     spearman = functools.partial(summary_level_corr, spearmanr)
-    kendall = functools.partial(summary_level_corr, kendalltau)
+    kendall = functools.partial(summary_level_corr, fast_kendalltau)
 
     r, r_groups = pearson(X, Y, return_num_instances=True)
     r_lower, r_upper = corr_ci(pearson, X, Y, ci_method, alpha, two_tailed, kwargs=pearson_kwargs)
@@ -303,25 +303,53 @@ def _plot_values(values1: List[float],
     plt.close()
 
 
-def _plot_system_level_metrics(metrics_list: List[Metrics],
+def _plot_system_level_metrics(X: np.ndarray,
+                               Y: np.ndarray,
                                metric1: str,
                                metric2: str,
                                output_file: str) -> None:
-    metrics_list = list(aggregate_metrics(metrics_list).values())
-    values1 = [metrics[metric1] for metrics in metrics_list]
-    values2 = [metrics[metric2] for metrics in metrics_list]
+    values1 = np.nanmean(X, axis=1)
+    values2 = np.nanmean(Y, axis=1)
     _plot_values(values1, values2, metric1, metric2, 'Systems', output_file)
 
 
-def _plot_global_metrics(metrics_list: List[Metrics],
+def _plot_global_metrics(X: np.ndarray,
+                         Y: np.ndarray,
                          metric1: str,
                          metric2: str,
                          output_file: str) -> None:
-    values1 = [metrics.metrics[metric1] for metrics in metrics_list]
-    values2 = [metrics.metrics[metric2] for metrics in metrics_list]
+    values1 = X[~np.isnan(X)]
+    values2 = Y[~np.isnan(Y)]
     _plot_values(values1, values2, metric1, metric2, 'Summaries', output_file)
 
 
+def load_metrics_table(metrics_jsonl_files_or_metrics_list: Union[str, List[str], List[Metrics]],
+                       summarizer_type: str,
+                       *metric_names: str) -> MetricsTable:
+    """
+    Loads the metrics from the jsonl or npz file(s) or list of `Metrics` into a `MetricsTable` with only the metrics in
+    `metric_names`, then filters it to `summarizer_type` and the rows which have all of the metrics.
+    """
+    if isinstance(metrics_jsonl_files_or_metrics_list, str):
+        # A single file
+        metrics_jsonl_files_or_metrics_list = [metrics_jsonl_files_or_metrics_list]
+
+    if isinstance(metrics_jsonl_files_or_metrics_list, list) and all(isinstance(item, str) for item in metrics_jsonl_files_or_metrics_list):
+        # A list of files
+        logger.info(f'Loading metrics from {metrics_jsonl_files_or_metrics_list}')
+        table = MetricsTable.from_files(metrics_jsonl_files_or_metrics_list, metric_names=list(metric_names))
+    else:
+        # A list of metrics
+        assert isinstance(metrics_jsonl_files_or_metrics_list, list) and all(isinstance(item, Metrics) for item in metrics_jsonl_files_or_metrics_list)
+        table = MetricsTable.from_metrics_list(metrics_jsonl_files_or_metrics_list, metric_names=list(metric_names))
+    logger.info(f'Loaded {len(table)} unique (instance, summarizer) pairs')
+
+    logger.info(f'Filtering instances to summarizer type "{summarizer_type}" and metrics "{metric_names}"')
+    table = table.filter(summarizer_type, *metric_names)
+    logger.info(f'{len(table)} instances remain after filtering')
+    return table
+
+
 def compute_correlation(metrics_jsonl_files_or_metrics_list: Union[str, List[str], List[Metrics]],
                         metric1: str,
                         metric2: str,
@@ -343,29 +371,8 @@ def compute_correlation(metrics_jsonl_files_or_metrics_list: Union[str, List[str
     ci_kwargs = ci_kwargs or {}
     summary_kwargs, system_kwargs, global_kwargs = _split_level_kwargs(ci_kwargs)
 
-    if isinstance(metrics_jsonl_files_or_metrics_list, str):
-        # A single file
-        metrics_list = load_metrics([metrics_jsonl_files_or_metrics_list])
-    elif isinstance(metrics_jsonl_files_or_metrics_list, list) and all(isinstance(item, str) for item in metrics_jsonl_files_or_metrics_list):
-        # A list of files
-        metrics_list = load_metrics(metrics_jsonl_files_or_metrics_list)
-    else:
-        # A list of metrics
-        assert isinstance(metrics_jsonl_files_or_metrics_list, list) and all(isinstance(item, Metrics) for item in metrics_jsonl_files_or_metrics_list)
-        metrics_list = metrics_jsonl_files_or_metrics_list
-
-    # Merge duplicate metrics objects into one
-    metrics_list = merge_metrics(metrics_list)
-
-    for metrics in metrics_list:
-        metrics.flatten_keys()
-
-    metrics_list = filter_metrics(metrics_list, summarizer_type, metric1, metric2)
-    for metrics in metrics_list:
-        metrics.select_metrics([metric1, metric2])
-        metrics.average_values()
-
-    X, Y = convert_to_matrices(metrics_list, metric1, metric2)
+    table = load_metrics_table(metrics_jsonl_files_or_metrics_list, summarizer_type, metric1, metric2)
+    X, Y = table.to_matrices(metric1, metric2)
 
     results = {
         'metric1': metric1,
@@ -380,13 +387,13 @@ def compute_correlation(metrics_jsonl_files_or_metrics_list: Union[str, List[str
         results['system_level'] = compute_system_level_correlations(X, Y, ci_method=ci_method, alpha=alpha,
                                                                     two_tailed=two_tailed, ci_kwargs=system_kwargs)
         if system_level_output_plot is not None:
-            _plot_system_level_metrics(metrics_list, metric1, metric2, system_level_output_plot)
+            _plot_system_level_metrics(X, Y, metric1, metric2, system_level_output_plot)
 
     if not skip_global:
         results['global'] = compute_global_correlations(X, Y, ci_method=ci_method, alpha=alpha, two_tailed=two_tailed,
                                                         ci_kwargs=global_kwargs)
         if global_output_plot is not None:
-            _plot_global_metrics(metrics_list, metric1, metric2, global_output_plot)
+            _plot_global_metrics(X, Y, metric1, metric2, global_output_plot)
 
     return results
 
@@ -400,8 +407,8 @@ class CorrelateSubcommand(RootSubcommand):
         self.parser.add_argument(
             '--metrics-jsonl-files',
             nargs='+',
-            help='The jsonl files with the metric values. If the values are split across multiple files, they can all '
-                 'be passed as arguments.',
+            help='The jsonl (or binary npz) files with the metric values. If the values are split across multiple '
+                 'files, they can all be passed as arguments.',
             required=True
         )
         self.parser.add_argument(
@@ -441,6 +448,18 @@ class CorrelateSubcommand(RootSubcommand):
             default='{}',
             help='A serialized JSON string that will be parsed and passed as kwargs to the confidence interval calculation'
         )
+        self.parser.add_argument(
+            '--num-jobs',
+            type=int,
+            default=1,
+            help='The number of workers to use to calculate the bootstrap confidence intervals'
+        )
+        self.parser.add_argument(
+            '--parallel-backend',
+            choices=['process', 'thread'],
+            default='process',
+            help='The type of worker pool to use if --num-jobs is greater than 1'
+        )
         self.parser.add_argument(
             '--output-file',
             type=str,
@@ -490,6 +509,9 @@ class CorrelateSubcommand(RootSubcommand):
         two_tailed = args.num_tails == 2
         alpha = 1.0 - args.confidence / 100
         ci_kwargs = json.loads(args.confidence_interval_kwargs)
+        if args.num_jobs > 1:
+            ci_kwargs.setdefault('n_jobs', args.num_jobs)
+            ci_kwargs.setdefault('backend', args.parallel_backend)
         results = compute_correlation(args.metrics_jsonl_files, metric1, metric2, args.summarizer_type,
                                       skip_summary_level=args.skip_summary_level,
                                       skip_system_level=args.skip_system_level,
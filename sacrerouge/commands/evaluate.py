@@ -12,7 +12,7 @@ from sacrerouge.common.util import import_module_and_submodules
 from sacrerouge.data import EvalInstance, Metrics, MetricsDict
 from sacrerouge.data.dataset_readers import DatasetReader
 from sacrerouge.io import JsonlWriter
-from sacrerouge.metrics import Metric
+from sacrerouge.metrics import Metric, ShardedMetric
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +32,17 @@ def get_initial_micro_list(instances: List[EvalInstance]) -> List[Metrics]:
     return micro_list
 
 
-def evaluate_instances(instances: List[EvalInstance], metrics: List[Metric]) -> Tuple[MetricsDict, List[Metrics]]:
+def evaluate_instances(instances: List[EvalInstance],
+                       metrics: List[Metric],
+                       num_workers: int = 1) -> Tuple[MetricsDict, List[Metrics]]:
+    if num_workers > 1:
+        sharded_metrics = [ShardedMetric(metric, num_workers) for metric in metrics]
+        try:
+            return evaluate_instances(instances, sharded_metrics)
+        finally:
+            for metric in sharded_metrics:
+                metric.close()
+
     macro = MetricsDict()
     micro_list = get_initial_micro_list(instances)
 
@@ -103,6 +113,12 @@ def add_evaluate_arguments(parser: argparse.ArgumentParser, include_config_argum
         help='The path to where the input-level metrics should be written',
         required=True
     )
+    parser.add_argument(
+        '--num-workers',
+        type=int,
+        default=1,
+        help='The number of processes which each metric uses to score the summaries'
+    )
     parser.add_argument(
         '--log-file',
         type=str,
@@ -147,6 +163,6 @@ class EvaluateSubcommand(RootSubcommand):
             input_files = [input_files]
 
         instances = dataset_reader.read(*input_files)
-        macro, micro_list = evaluate_instances(instances, metrics)
+        macro, micro_list = evaluate_instances(instances, metrics, num_workers=args.num_workers)
 
         save_evaluation_results(macro, micro_list, args.macro_output_json, args.micro_output_jsonl, args.silent)
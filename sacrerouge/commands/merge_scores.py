@@ -0,0 +1,170 @@
+import argparse
+import heapq
+import logging
+from overrides import overrides
+from typing import Dict, Iterable, Iterator, List
+
+from sacrerouge.commands import RootSubcommand
+from sacrerouge.common import TemporaryDirectory
+from sacrerouge.common.logging import prepare_global_logging
+from sacrerouge.data import MetricsTable
+from sacrerouge.io import JsonlReader, JsonlWriter
+
+logger = logging.getLogger(__name__)
+
+
+def _get_key(record: Dict) -> tuple:
+    return record['instance_id'], record['summarizer_id']
+
+
+def _write_sorted_runs(records: Iterable[Dict], temp_dir: str, max_records_in_memory: int) -> List[str]:
+    """
+    Splits the records into sorted runs of at most `max_records_in_memory` records each. The runs are created
+    in the order of the records and the sort is stable, so the merge can preserve which record came last.
+    """
+    run_files = []
+
+    def _write_run(buffer: List[Dict]) -> None:
+        run_file = f'{temp_dir}/run-{len(run_files)}.jsonl'
+        with JsonlWriter(run_file) as out:
+            for record in sorted(buffer, key=_get_key):
+                out.write(record)
+        run_files.append(run_file)
+
+    buffer = []
+    for record in records:
+        buffer.append(record)
+        if len(buffer) == max_records_in_memory:
+            _write_run(buffer)
+            buffer = []
+    if buffer:
+        _write_run(buffer)
+    return run_files
+
+
+def _read_files(input_files: List[str]) -> Iterator[Dict]:
+    for input_file in input_files:
+        with JsonlReader(input_file) as f:
+            yield from f
+
+
+def _read_run(run_file: str) -> Iterator[Dict]:
+    with JsonlReader(run_file) as f:
+        yield from f
+
+
+def _merge_sorted_records(records: Iterator[Dict]) -> Iterator[Dict]:
+    # Combines consecutive records for the same (instance, summary) like `Metrics.merge`, so if
+    # a metric is in more than one record, the value from the later input file is kept
+    current = None
+    for record in records:
+        if current is not None and _get_key(current) == _get_key(record):
+            if current['summarizer_type'] != record['summarizer_type']:
+                raise Exception(f'Cannot merge two Metrics if metadata is not the same.')
+            current['metrics'].update(record['metrics'])
+        else:
+            if current is not None:
+                yield current
+            current = record
+    if current is not None:
+        yield current
+
+
+def merge_score_records(records: Iterable[Dict],
+                        output_jsonl: str = None,
+                        output_npz: str = None,
+                        max_records_in_memory: int = 100000) -> int:
+    """
+    Merges serialized `Metrics` records into one file which is sorted by instance_id and summarizer_id, with the
+    same semantics as `merge_metrics`. The records are merged with an external k-way merge, so at most
+    `max_records_in_memory` records are held in memory at once (the npz output is columnar, so it is built in
+    memory). Returns the number of merged records.
+    """
+    if output_jsonl is None and output_npz is None:
+        raise Exception(f'At least one of `output_jsonl` and `output_npz` must be set')
+
+    num_records = 0
+    with TemporaryDirectory() as temp_dir:
+        run_files = _write_sorted_runs(records, temp_dir, max_records_in_memory)
+        logger.info(f'Merging {len(run_files)} sorted runs')
+        # `heapq.merge` is stable, so records from earlier runs come first for equal keys
+        merged = _merge_sorted_records(heapq.merge(*[_read_run(run_file) for run_file in run_files], key=_get_key))
+
+        if output_jsonl is not None:
+            with JsonlWriter(output_jsonl) as out:
+                for record in merged:
+                    out.write(record)
+                    num_records += 1
+            if output_npz is not None:
+                MetricsTable.from_jsonl(output_jsonl).save_npz(output_npz)
+        else:
+            def _count(records: Iterator[Dict]) -> Iterator[Dict]:
+                nonlocal num_records
+                for record in records:
+                    num_records += 1
+                    yield record
+
+            MetricsTable.from_dicts(_count(merged)).save_npz(output_npz)
+
+    logger.info(f'Merged into {num_records} instances')
+    return num_records
+
+
+def merge_score_files(input_files: List[str],
+                      output_jsonl: str = None,
+                      output_npz: str = None,
+                      max_records_in_memory: int = 100000) -> int:
+    """
+    Merges the score files (for instance, the outputs of "score" on different shards) with
+    `merge_score_records`. Records in later files replace those in earlier files. Returns the number of
+    merged records.
+    """
+    logger.info(f'Merging the records from {len(input_files)} files')
+    return merge_score_records(_read_files(input_files), output_jsonl, output_npz, max_records_in_memory)
+
+
+@RootSubcommand.register('merge-scores')
+class MergeScoresSubcommand(RootSubcommand):
+    @overrides
+    def add_subparser(self, parser: argparse._SubParsersAction):
+        description = 'Merge the outputs of "score" (e.g., from different shards) into one sorted file'
+        self.parser = parser.add_parser('merge-scores', description=description, help=description)
+        self.parser.add_argument(
+            '--input-files',
+            nargs='+',
+            help='The jsonl score files to merge. If a metric for the same summary is in more than one file, '
+                 'the value from the last file is kept',
+            required=True
+        )
+        self.parser.add_argument(
+            '--output-jsonl',
+            type=str,
+            help='The path to where the merged metrics should be written'
+        )
+        self.parser.add_argument(
+            '--output-npz',
+            type=str,
+            help='The path to where the merged metrics should be written in the binary columnar format'
+        )
+        self.parser.add_argument(
+            '--max-records-in-memory',
+            type=int,
+            default=100000,
+            help='The maximum number of records which will be sorted in memory at once'
+        )
+        self.parser.add_argument(
+            '--log-file',
+            type=str,
+            help='The file where the log should be written'
+        )
+        self.parser.add_argument(
+            '--silent',
+            action='store_true',
+            help='Controls whether the log should be written to stdout'
+        )
+        self.parser.set_defaults(func=self.run)
+
+    @overrides
+    def run(self, args):
+        prepare_global_logging(file_path=args.log_file, silent=args.silent)
+        merge_score_files(args.input_files, args.output_jsonl, args.output_npz, args.max_records_in_memory)
@@ -4,7 +4,7 @@ from typing import Type
 
 from sacrerouge.commands import Subcommand
 from sacrerouge.commands.evaluate import add_evaluate_arguments, evaluate_instances, save_evaluation_results
-from sacrerouge.commands.score import add_score_arguments, save_score_results, score_instances
+from sacrerouge.commands.score import add_score_arguments, score_dataset
 from sacrerouge.common import Registrable
 from sacrerouge.common.arguments import add_metric_arguments, get_dataset_reader_from_argument, get_metric_from_arguments
 from sacrerouge.common.logging import prepare_global_logging
@@ -73,7 +73,7 @@ class MetricSubcommand(Subcommand):
         input_files = args.input_files
 
         instances = dataset_reader.read(*input_files)
-        macro, micro_list = evaluate_instances(instances, [metric])
+        macro, micro_list = evaluate_instances(instances, [metric], num_workers=args.num_workers)
 
         save_evaluation_results(macro, micro_list, args.macro_output_json, args.micro_output_jsonl, args.silent)
 
@@ -89,7 +89,4 @@ class MetricSubcommand(Subcommand):
         metric = get_metric_from_arguments(self.metric_type, args)
         input_files = args.input_files
 
-        instances = dataset_reader.read(*input_files)
-        metrics_dicts = score_instances(instances, [metric], args.disable_peer_jackknifing)
-
-        save_score_results(metrics_dicts, args.output_jsonl, args.silent)
\ No newline at end of file
+        score_dataset(dataset_reader, input_files, [metric], args)
\ No newline at end of file
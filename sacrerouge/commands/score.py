@@ -1,17 +1,24 @@
 import argparse
+import hashlib
 import logging
+import os
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from overrides import overrides
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
 
 from sacrerouge.commands import RootSubcommand
+from sacrerouge.commands.merge_scores import merge_score_records
 from sacrerouge.common import Params
 from sacrerouge.common.logging import prepare_global_logging
 from sacrerouge.common.util import import_module_and_submodules
-from sacrerouge.data import EvalInstance, Metrics
+from sacrerouge.data import EvalInstance, Metrics, MetricsDict, MetricsTable
+from sacrerouge.data.jackknifers import ReferencesJackknifer
 from sacrerouge.data.dataset_readers import DatasetReader
 from sacrerouge.io import JsonlWriter
-from sacrerouge.metrics import Metric
+from sacrerouge.io.serialization import dumps, loads
+from sacrerouge.metrics import CachedMetric, Metric, ScoreCache, ShardedMetric
+from sacrerouge.metrics.score_cache import get_metric_fingerprint
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +43,63 @@ def add_score_arguments(parser: argparse.ArgumentParser, include_config_argument
         help='The path to where the input-level metrics should be written',
         required=True
     )
+    parser.add_argument(
+        '--output-npz',
+        type=str,
+        help='The path to where the input-level metrics should additionally be written in a binary columnar '
+             'format, which can be read much faster by "correlate" and "stat-sig-test"'
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        help='If set, the instances will be lazily read and scored in chunks of this many instances, so the whole '
+             'dataset is never in memory. The results for each chunk are saved to a checkpoint next to the output '
+             'file, and if the command is restarted after a crash, the summaries which are in the checkpoint will '
+             'not be scored again. Summaries are only grouped by their context within a chunk'
+    )
+    parser.add_argument(
+        '--score-cache',
+        type=str,
+        help='The path to a SQLite file which caches the scores across runs. Summaries which have already been '
+             'scored by a metric with the same parameters and context will not be scored again'
+    )
+    parser.add_argument(
+        '--score-cache-max-size',
+        type=float,
+        help='The maximum size of the score cache in megabytes. The least recently used scores are evicted first'
+    )
+    parser.add_argument(
+        '--num-shards',
+        type=int,
+        help='If set, the instances will be partitioned into this many shards by a hash of their instance_id '
+             'and only the shard "--shard-index" will be scored. The outputs of the shards can be combined '
+             'with "merge-scores"'
+    )
+    parser.add_argument(
+        '--shard-index',
+        type=int,
+        help='The index of the shard to score, from 0 to "--num-shards" - 1'
+    )
+    parser.add_argument(
+        '--num-workers',
+        type=int,
+        default=1,
+        help='The number of processes which each metric uses to score the summaries. The summaries are split '
+             'into shards by their context, so this speeds up CPU-bound metrics like ROUGE'
+    )
+    parser.add_argument(
+        '--max-parallel-metrics',
+        type=int,
+        default=1,
+        help='The maximum number of metrics which will be scored at the same time. Metrics which share a resource '
+             '(e.g., the GPU) are never run at the same time'
+    )
+    parser.add_argument(
+        '--parallel-metrics-backend',
+        choices=['thread', 'process'],
+        default='thread',
+        help='Whether the metrics should be run in parallel in threads or processes'
+    )
     parser.add_argument(
         '--log-file',
         type=str,
@@ -70,6 +134,11 @@ def _score_with_metric(metric: Metric,
                        instances: List[EvalInstance],
                        metrics_dicts: Dict[str, Dict[str, Metrics]],
                        disable_peer_jackknifing: bool = False) -> None:
+    if not disable_peer_jackknifing and isinstance(metric.jackknifer, ReferencesJackknifer) and \
+            metric.supports_reference_statistics():
+        _score_with_reference_statistics(metric, instances, metrics_dicts)
+        return
+
     # The summaries need to be grouped based on identical context. For instance, we group all of the summaries
     # that have the same reference documents together. This can sometimes make calculating the metric faster. The
     # following variables assist doing this.
@@ -155,7 +224,11 @@ def _score_with_metric(metric: Metric,
             else:
                 metrics_dicts[instance.instance_id][instance.summarizer_id].metrics.update(results)
 
-    # Aggregate the jk results
+    _aggregate_jackknifing_results(jk_results, metrics_dicts)
+
+
+def _aggregate_jackknifing_results(jk_results: Dict[str, Dict[str, List[MetricsDict]]],
+                                   metrics_dicts: Dict[str, Dict[str, Metrics]]) -> None:
     for instance_id in jk_results.keys():
         for summarizer_id, results in jk_results[instance_id].items():
             result = sum(results) / len(results)
@@ -163,6 +236,63 @@ def _score_with_metric(metric: Metric,
                 metrics_dicts[instance_id][summarizer_id].metrics[name + '_jk'] = value
 
 
+def _score_with_reference_statistics(metric: Metric,
+                                     instances: List[EvalInstance],
+                                     metrics_dicts: Dict[str, Dict[str, Metrics]]) -> None:
+    """
+    Scores the instances with a metric which supports per-reference statistics. Instead of scoring every peer
+    again for each leave-one-out subset of its references, the statistics of every summary against each
+    reference are calculated once and then combined for the full set of references and for each subset. The
+    results are identical to `_score_with_metric`.
+    """
+    fields_list = []
+    field_to_index = {}
+    instances_list = []
+    summary_fields_lists = []
+
+    for instance in instances:
+        summary_fields = instance.fields.select_fields(metric.required_summary_fields)
+        context_fields = instance.fields.select_fields(metric.required_context_fields)
+        if context_fields not in field_to_index:
+            field_to_index[context_fields] = len(field_to_index)
+            fields_list.append(context_fields)
+            instances_list.append([])
+            summary_fields_lists.append([])
+
+        index = field_to_index[context_fields]
+        instances_list[index].append(instance)
+        summary_fields_lists[index].append(summary_fields)
+
+    summary_args = []
+    for name in metric.required_summary_fields:
+        summary_args.append([[summary_fields[name].to_input() for summary_fields in summary_fields_list] for summary_fields_list in summary_fields_lists])
+
+    context_args = []
+    for name in metric.required_context_fields:
+        context_args.append([fields[name].to_input() for fields in fields_list])
+
+    statistics_lists = metric.score_reference_statistics_multi_all(*summary_args, *context_args)
+
+    jk_results = defaultdict(lambda: defaultdict(list))
+    for i, statistics_list in enumerate(statistics_lists):
+        for j, statistics in enumerate(statistics_list):
+            instance = instances_list[i][j]
+            results = metric.combine_reference_statistics(statistics)
+            if instance.summarizer_type == 'reference':
+                # The reference was already removed from its own context, so this is its jackknifing score
+                jk_results[instance.instance_id][instance.summarizer_id].append(results)
+            else:
+                metrics_dicts[instance.instance_id][instance.summarizer_id].metrics.update(results)
+                # Jackknifing cannot be done with only one reference
+                if len(statistics) > 1:
+                    for k in range(len(statistics)):
+                        jk_results[instance.instance_id][instance.summarizer_id].append(
+                            metric.combine_reference_statistics(statistics[:k] + statistics[k + 1:])
+                        )
+
+    _aggregate_jackknifing_results(jk_results, metrics_dicts)
+
+
 def _get_initial_metrics_dicts(instances: List[EvalInstance]) -> Dict[str, Dict[str, Metrics]]:
     metrics_dicts = defaultdict(dict)
     for instance in instances:
@@ -171,20 +301,285 @@ def _get_initial_metrics_dicts(instances: List[EvalInstance]) -> Dict[str, Dict[
     return metrics_dicts
 
 
+def _group_by_resources(metrics: List[Metric]) -> List[List[int]]:
+    """
+    Groups the indices of the metrics so that any two metrics which share a resource hint are in the same
+    group. The groups can be run in parallel, but the metrics within a group must be run sequentially.
+    """
+    groups = []
+    for i, metric in enumerate(metrics):
+        resources = set(metric.resource_hints)
+        # Merge every existing group which shares a resource with this metric
+        overlapping = [group for group in groups if group[1] & resources]
+        indices = sorted([i] + [index for group in overlapping for index in group[0]])
+        resources = resources.union(*[group[1] for group in overlapping])
+        groups = [group for group in groups if group not in overlapping] + [(indices, resources)]
+    return sorted([indices for indices, _ in groups])
+
+
+def _score_metric_group(tasks: List[Tuple[Metric, List[EvalInstance]]],
+                        disable_peer_jackknifing: bool) -> List[Dict[str, Dict[str, Metrics]]]:
+    results = []
+    for metric, instances in tasks:
+        metrics_dicts = _get_initial_metrics_dicts(instances)
+        _score_with_metric(metric, instances, metrics_dicts, disable_peer_jackknifing=disable_peer_jackknifing)
+        results.append(metrics_dicts)
+    return results
+
+
+def _score_metrics_in_parallel(tasks: List[Tuple[Metric, List[EvalInstance]]],
+                               disable_peer_jackknifing: bool,
+                               max_parallel_metrics: int,
+                               backend: str) -> List[Dict[str, Dict[str, Metrics]]]:
+    """
+    Scores every (metric, instances) task with at most `max_parallel_metrics` metrics running at the same time
+    and returns the results of each task separately in the same order as `tasks`. Metrics with a resource hint
+    in common are run one after the other.
+    """
+    if backend == 'thread':
+        executor_cls = ThreadPoolExecutor
+    elif backend == 'process':
+        executor_cls = ProcessPoolExecutor
+    else:
+        raise Exception(f'Unknown parallel backend: {backend}')
+
+    groups = _group_by_resources([metric for metric, _ in tasks])
+    results = [None] * len(tasks)
+    with executor_cls(max_workers=max_parallel_metrics) as executor:
+        futures = [
+            executor.submit(_score_metric_group, [tasks[i] for i in group], disable_peer_jackknifing)
+            for group in groups
+        ]
+        for group, future in zip(groups, futures):
+            for i, metrics_dicts in zip(group, future.result()):
+                results[i] = metrics_dicts
+    return results
+
+
 def score_instances(instances: List[EvalInstance],
                     metrics: List[Metric],
-                    disable_peer_jackknifing: bool = False) -> Dict[str, Dict[str, Metrics]]:
+                    disable_peer_jackknifing: bool = False,
+                    max_parallel_metrics: int = 1,
+                    parallel_backend: str = 'thread') -> Dict[str, Dict[str, Metrics]]:
+    """
+    Scores the instances with every metric. If `max_parallel_metrics` is larger than 1, that many metrics will be
+    scored concurrently with the `parallel_backend` ("thread" or "process"), which helps when the metrics spend
+    most of their time waiting on external processes. The results are merged in the order of `metrics`, so they
+    are identical to scoring the metrics sequentially.
+    """
     metrics_dicts = _get_initial_metrics_dicts(instances)
-    for metric in metrics:
-        _score_with_metric(metric, instances, metrics_dicts, disable_peer_jackknifing=disable_peer_jackknifing)
+    if max_parallel_metrics == 1 or len(metrics) <= 1:
+        for metric in metrics:
+            _score_with_metric(metric, instances, metrics_dicts, disable_peer_jackknifing=disable_peer_jackknifing)
+        return metrics_dicts
+
+    tasks = [(metric, instances) for metric in metrics]
+    for metric_dicts in _score_metrics_in_parallel(tasks, disable_peer_jackknifing, max_parallel_metrics,
+                                                   parallel_backend):
+        _merge_metrics_dicts(metrics_dicts, metric_dicts)
     return metrics_dicts
 
 
-def save_score_results(metrics_dicts: Dict[str, Dict[str, Metrics]], output_file: str, silent: bool) -> None:
+def _merge_metrics_dicts(metrics_dicts: Dict[str, Dict[str, Metrics]],
+                         other: Dict[str, Dict[str, Metrics]]) -> None:
+    for instance_id in other.keys():
+        for summarizer_id, metrics in other[instance_id].items():
+            metrics_dicts[instance_id][summarizer_id].metrics.update(metrics.metrics)
+
+
+def _sort_metrics(metrics_dicts: Dict[str, Dict[str, Metrics]]) -> List[Metrics]:
+    metrics_list = []
+    for instance_id in sorted(metrics_dicts.keys()):
+        for summarizer_id in sorted(metrics_dicts[instance_id].keys()):
+            metrics_list.append(metrics_dicts[instance_id][summarizer_id])
+    return metrics_list
+
+
+def save_score_results(metrics_dicts: Dict[str, Dict[str, Metrics]],
+                       output_file: str,
+                       silent: bool,
+                       output_npz: str = None) -> None:
+    metrics_list = _sort_metrics(metrics_dicts)
+
     with JsonlWriter(output_file) as out:
-        for instance_id in sorted(metrics_dicts.keys()):
-            for summarizer_id in sorted(metrics_dicts[instance_id].keys()):
-                out.write(metrics_dicts[instance_id][summarizer_id])
+        for metrics in metrics_list:
+            out.write(metrics)
+
+    if output_npz is not None:
+        MetricsTable.from_metrics_list(metrics_list).save_npz(output_npz)
+
+
+def _get_metric_keys(metrics: List[Metric]) -> List[str]:
+    # Identifies the metrics in the checkpoint by a hash of their fingerprints, so a checkpoint cannot be resumed
+    # with different metric parameters. The index is included in case the same metric is used more than once
+    keys = []
+    for i, metric in enumerate(metrics):
+        while isinstance(metric, (CachedMetric, ShardedMetric)):
+            metric = metric.metric
+        digest = hashlib.sha256(get_metric_fingerprint(metric).encode()).hexdigest()[:16]
+        keys.append(f'{i}-{type(metric).__name__}-{digest}')
+    return keys
+
+
+def _load_checkpoint(checkpoint_file: str, metric_keys: List[str]) -> Set[Tuple[str, str, str]]:
+    """
+    Loads the set of (metric key, instance_id, summarizer_id) triples that the checkpoint has finished. If the
+    previous run crashed while writing, the last line may be incomplete, so the file is truncated to the last
+    complete record. An exception is raised if the checkpoint has records for metrics which are not in
+    `metric_keys` because it was created with different metrics or metric parameters.
+    """
+    finished = set()
+    if not os.path.exists(checkpoint_file):
+        return finished
+
+    with open(checkpoint_file, 'rb+') as f:
+        offset = 0
+        for line in f:
+            try:
+                record = loads(line.decode())
+            except ValueError:
+                logger.warning(f'Truncating incomplete checkpoint record at byte {offset} of {checkpoint_file}')
+                f.truncate(offset)
+                break
+            finished.add((record['metric'], record['metrics']['instance_id'], record['metrics']['summarizer_id']))
+            offset += len(line)
+
+    unknown_keys = set(key for key, _, _ in finished) - set(metric_keys)
+    if len(unknown_keys) > 0:
+        raise Exception(f'Checkpoint {checkpoint_file} has scores for metrics {sorted(unknown_keys)} which do not '
+                        f'match the current metrics {metric_keys}. The metrics or their parameters have changed '
+                        f'since it was created, so it cannot be resumed. Delete it to score from the beginning')
+
+    logger.info(f'Loaded {len(finished)} finished scores from checkpoint {checkpoint_file}')
+    return finished
+
+
+def _read_checkpoint_records(checkpoint_file: str) -> Iterator[Dict]:
+    with open(checkpoint_file, 'r') as f:
+        for line in f:
+            yield loads(line)['metrics']
+
+
+def score_instance_chunks(instance_chunks: Iterable[List[EvalInstance]],
+                          metrics: List[Metric],
+                          output_file: str,
+                          disable_peer_jackknifing: bool = False,
+                          output_npz: str = None,
+                          checkpoint_file: str = None,
+                          max_parallel_metrics: int = 1,
+                          parallel_backend: str = 'thread',
+                          max_records_in_memory: int = 100000) -> None:
+    """
+    Scores the instances one chunk at a time, so `instance_chunks` can be a lazy iterator (e.g.
+    `DatasetReader.read_chunks`) over a dataset which does not fit in memory. The results of each metric on
+    each chunk are appended to `checkpoint_file` (by default, `output_file` + ".checkpoint") as soon as they are
+    calculated. If the checkpoint already exists because a previous run did not finish, the
+    (instance_id, summarizer_id, metric) triples in it will not be scored again. After every chunk is scored,
+    the checkpoint is merged into `output_file` with `merge_score_records`, which holds at most
+    `max_records_in_memory` records in memory, and deleted. The `output_npz` file is columnar, so it is built
+    from `output_file` with all of its scores (but not the `Metrics` objects) in memory.
+    """
+    checkpoint_file = checkpoint_file or f'{output_file}.checkpoint'
+    metric_keys = _get_metric_keys(metrics)
+    finished = _load_checkpoint(checkpoint_file, metric_keys)
+
+    dirname = os.path.dirname(checkpoint_file)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    with open(checkpoint_file, 'a') as checkpoint:
+        for i, instances in enumerate(instance_chunks):
+            tasks, task_keys = [], []
+            for metric, key in zip(metrics, metric_keys):
+                remaining = [
+                    instance for instance in instances
+                    if (key, instance.instance_id, instance.summarizer_id) not in finished
+                ]
+                if len(remaining) > 0:
+                    logger.info(f'Scoring {len(remaining)} instances in chunk {i} with {key}')
+                    tasks.append((metric, remaining))
+                    task_keys.append(key)
+
+            if max_parallel_metrics == 1 or len(tasks) <= 1:
+                results = (_score_metric_group([task], disable_peer_jackknifing)[0] for task in tasks)
+            else:
+                results = _score_metrics_in_parallel(tasks, disable_peer_jackknifing, max_parallel_metrics,
+                                                     parallel_backend)
+
+            for key, metrics_dicts in zip(task_keys, results):
+                for metrics_object in _sort_metrics(metrics_dicts):
+                    checkpoint.write(dumps({'metric': key, 'metrics': Metrics.serialize(metrics_object)}) + '\n')
+                checkpoint.flush()
+
+    # Combine the results from all of the metrics with an external merge, so the checkpoint is never in memory
+    merge_score_records(_read_checkpoint_records(checkpoint_file), output_file, output_npz,
+                        max_records_in_memory=max_records_in_memory)
+    os.remove(checkpoint_file)
+
+
+def score_dataset(dataset_reader: DatasetReader,
+                  input_files: List[str],
+                  metrics: List[Metric],
+                  args: argparse.Namespace) -> None:
+    original_metrics = metrics
+    if args.num_workers > 1:
+        metrics = [ShardedMetric(metric, args.num_workers) for metric in metrics]
+    if args.score_cache is not None:
+        max_size_bytes = int(args.score_cache_max_size * 1e6) if args.score_cache_max_size is not None else None
+        cache = ScoreCache(args.score_cache, max_size_bytes=max_size_bytes)
+        # The fingerprint is based on the original metric so the cache is shared regardless of `num_workers`
+        metrics = [
+            CachedMetric(metric, cache, fingerprint=get_metric_fingerprint(original))
+            for metric, original in zip(metrics, original_metrics)
+        ]
+
+    try:
+        _score_dataset(dataset_reader, input_files, metrics, args)
+    finally:
+        if args.num_workers > 1:
+            for metric in metrics:
+                while not isinstance(metric, ShardedMetric):
+                    metric = metric.metric
+                metric.close()
+
+
+def get_shard_index(instance_id: str, num_shards: int) -> int:
+    """
+    Deterministically assigns an instance to a shard based on a hash of its instance_id. All of the summaries
+    for an instance, including the references which are used for jackknifing, are assigned to the same shard.
+    """
+    digest = hashlib.md5(instance_id.encode()).digest()
+    return int.from_bytes(digest[:8], 'big') % num_shards
+
+
+def _select_shard(instances: List[EvalInstance], shard_index: int, num_shards: int) -> List[EvalInstance]:
+    return [instance for instance in instances if get_shard_index(instance.instance_id, num_shards) == shard_index]
+
+
+def _score_dataset(dataset_reader: DatasetReader,
+                   input_files: List[str],
+                   metrics: List[Metric],
+                   args: argparse.Namespace) -> None:
+    if (args.num_shards is None) != (args.shard_index is None):
+        raise Exception(f'"--num-shards" and "--shard-index" must be set together')
+    if args.num_shards is not None and not 0 <= args.shard_index < args.num_shards:
+        raise Exception(f'Shard index {args.shard_index} is out of range for {args.num_shards} shards')
+
+    if args.chunk_size is not None:
+        instance_chunks = dataset_reader.read_chunks(*input_files, chunk_size=args.chunk_size)
+        if args.num_shards is not None:
+            instance_chunks = (_select_shard(instances, args.shard_index, args.num_shards)
+                               for instances in instance_chunks)
+        score_instance_chunks(instance_chunks, metrics, args.output_jsonl, args.disable_peer_jackknifing,
+                              output_npz=args.output_npz, max_parallel_metrics=args.max_parallel_metrics,
+                              parallel_backend=args.parallel_metrics_backend)
+    else:
+        instances = dataset_reader.read(*input_files)
+        if args.num_shards is not None:
+            instances = _select_shard(instances, args.shard_index, args.num_shards)
+        metrics_dicts = score_instances(instances, metrics, args.disable_peer_jackknifing,
+                                        max_parallel_metrics=args.max_parallel_metrics,
+                                        parallel_backend=args.parallel_metrics_backend)
+        save_score_results(metrics_dicts, args.output_jsonl, args.silent, output_npz=args.output_npz)
 
 
 @RootSubcommand.register('score')
@@ -213,7 +608,4 @@ class ScoreSubcommand(RootSubcommand):
         if isinstance(input_files, str):
             input_files = [input_files]
 
-        instances = dataset_reader.read(*input_files)
-        metrics_dicts = score_instances(instances, metrics, args.disable_peer_jackknifing)
-
-        save_score_results(metrics_dicts, args.output_jsonl, args.silent)
+        score_dataset(dataset_reader, input_files, metrics, args)
@@ -6,14 +6,15 @@ import numpy as np
 import os
 import random
 from overrides import overrides
-from scipy.stats import kendalltau, pearsonr, spearmanr
+from scipy.stats import pearsonr, spearmanr
 from typing import Dict, List, Tuple, Union
 
 from sacrerouge.commands import RootSubcommand
-from sacrerouge.commands.correlate import load_metrics, filter_metrics, merge_metrics
+from sacrerouge.commands.correlate import load_metrics_table
 from sacrerouge.common.logging import prepare_global_logging
 from sacrerouge.data import Metrics
-from sacrerouge.stats import convert_to_matrices, corr_diff_test, global_corr, summary_level_corr, system_level_corr
+from sacrerouge.stats import corr_diff_test, fast_kendalltau, global_corr, summary_level_corr, \
+    system_level_corr
 
 logger = logging.getLogger(__name__)
 
@@ -34,14 +35,16 @@ def _run_test(corr_func,
               X: np.ndarray, Y: np.ndarray, Z: np.ndarray,
               test_method: str,
               alpha: float,
-              two_tailed: bool) -> Dict:
+              two_tailed: bool,
+              test_kwargs: Dict = None) -> Dict:
     pearson = functools.partial(corr_func, pearsonr)
     spearman = functools.partial(corr_func, spearmanr)
-    kendall = functools.partial(corr_func, kendalltau)
+    kendall = functools.partial(corr_func, fast_kendalltau)
 
-    r_pvalue, r_statistic = corr_diff_test(pearson, X, Y, Z, test_method, two_tailed, kwargs={"return_test_statistic": True})
-    rho_pvalue, rho_statistic = corr_diff_test(spearman, X, Y, Z, test_method, two_tailed, kwargs={"return_test_statistic": True})
-    tau_pvalue, tau_statistic = corr_diff_test(kendall, X, Y, Z, test_method, two_tailed, kwargs={"return_test_statistic": True})
+    kwargs = dict(**(test_kwargs or {}), return_test_statistic=True)
+    r_pvalue, r_statistic = corr_diff_test(pearson, X, Y, Z, test_method, two_tailed, kwargs=kwargs)
+    rho_pvalue, rho_statistic = corr_diff_test(spearman, X, Y, Z, test_method, two_tailed, kwargs=kwargs)
+    tau_pvalue, tau_statistic = corr_diff_test(kendall, X, Y, Z, test_method, two_tailed, kwargs=kwargs)
 
     # For some reason, without casting `pvalue <= alpha` to a bool, the result
     # would be type `bool_` which was not json serializable
@@ -74,33 +77,13 @@ def run_hypothesis_tests(metrics_jsonl_files_or_metrics_list: Union[str, List[st
                          two_tailed: bool = True,
                          skip_summary_level: bool = False,
                          skip_system_level: bool = False,
-                         skip_global: bool = False) -> Dict:
-    if isinstance(metrics_jsonl_files_or_metrics_list, str):
-        # A single file
-        metrics_list = load_metrics([metrics_jsonl_files_or_metrics_list])
-    elif isinstance(metrics_jsonl_files_or_metrics_list, list) and all(
-            isinstance(item, str) for item in metrics_jsonl_files_or_metrics_list):
-        # A list of files
-        metrics_list = load_metrics(metrics_jsonl_files_or_metrics_list)
-    else:
-        # A list of metrics
-        assert isinstance(metrics_jsonl_files_or_metrics_list, list) and all(
-            isinstance(item, Metrics) for item in metrics_jsonl_files_or_metrics_list)
-        metrics_list = metrics_jsonl_files_or_metrics_list
-
-    # Merge duplicate metrics objects into one
-    metrics_list = merge_metrics(metrics_list)
-
-    for metrics in metrics_list:
-        metrics.flatten_keys()
-
-    metrics_list = filter_metrics(metrics_list, summarizer_type, dependent_metric, metric_A, metric_B)
-    for metrics in metrics_list:
-        metrics.select_metrics([dependent_metric, metric_A, metric_B])
-        metrics.average_values()
+                         skip_global: bool = False,
+                         test_kwargs: Dict = None) -> Dict:
+    table = load_metrics_table(metrics_jsonl_files_or_metrics_list, summarizer_type,
+                               dependent_metric, metric_A, metric_B)
 
     # Follow the math in the paper: the dependent metric is Z
-    X, Y, Z = convert_to_matrices(metrics_list, metric_A, metric_B, dependent_metric)
+    X, Y, Z = table.to_matrices(metric_A, metric_B, dependent_metric)
 
     H0, H1 = _get_hypotheses(two_tailed, dependent_metric, metric_A, metric_B)
     results = {
@@ -115,13 +98,16 @@ def run_hypothesis_tests(metrics_jsonl_files_or_metrics_list: Union[str, List[st
         'H1': H1
     }
     if not skip_summary_level:
-        results['summary_level'] = _run_test(summary_level_corr, X, Y, Z, test_method, alpha, two_tailed)
+        results['summary_level'] = _run_test(summary_level_corr, X, Y, Z, test_method, alpha, two_tailed,
+                                             test_kwargs=test_kwargs)
 
     if not skip_system_level:
-        results['system_level'] = _run_test(system_level_corr, X, Y, Z, test_method, alpha, two_tailed)
+        results['system_level'] = _run_test(system_level_corr, X, Y, Z, test_method, alpha, two_tailed,
+                                            test_kwargs=test_kwargs)
 
     if not skip_global:
-        results['global'] = _run_test(global_corr, X, Y, Z, test_method, alpha, two_tailed)
+        results['global'] = _run_test(global_corr, X, Y, Z, test_method, alpha, two_tailed,
+                                      test_kwargs=test_kwargs)
 
     return results
 
@@ -136,8 +122,8 @@ class StatisticalSignificanceTestSubcommand(RootSubcommand):
         self.parser.add_argument(
             '--metrics-jsonl-files',
             nargs='+',
-            help='The jsonl files with the metric values. If the values are split across multiple files, they can all '
-                 'be passed as arguments.',
+            help='The jsonl (or binary npz) files with the metric values. If the values are split across multiple '
+                 'files, they can all be passed as arguments.',
             required=True
         )
         self.parser.add_argument(
@@ -189,6 +175,18 @@ class StatisticalSignificanceTestSubcommand(RootSubcommand):
             type=int,
             help='The random seed to use for numpy. Python random will be this number plus one'
         )
+        self.parser.add_argument(
+            '--num-jobs',
+            type=int,
+            default=1,
+            help='The number of workers to use to run the bootstrap or permutation tests'
+        )
+        self.parser.add_argument(
+            '--parallel-backend',
+            choices=['process', 'thread'],
+            default='process',
+            help='The type of worker pool to use if --num-jobs is greater than 1'
+        )
         self.parser.add_argument(
             '--skip-summary-level',
             action='store_true',
@@ -230,6 +228,9 @@ class StatisticalSignificanceTestSubcommand(RootSubcommand):
 
         two_tailed = args.num_tails == 2
         alpha = 1.0 - args.confidence / 100
+        test_kwargs = None
+        if args.num_jobs > 1:
+            test_kwargs = {'n_jobs': args.num_jobs, 'backend': args.parallel_backend}
         results = run_hypothesis_tests(args.metrics_jsonl_files,
                                        args.dependent_metric,
                                        args.metric_A,
@@ -240,7 +241,8 @@ class StatisticalSignificanceTestSubcommand(RootSubcommand):
                                        two_tailed=two_tailed,
                                        skip_summary_level=args.skip_summary_level,
                                        skip_system_level=args.skip_system_level,
-                                       skip_global=args.skip_global)
+                                       skip_global=args.skip_global,
+                                       test_kwargs=test_kwargs)
 
         if args.output_file:
             dirname = os.path.dirname(args.output_file)
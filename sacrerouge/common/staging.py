@@ -0,0 +1,123 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# The in-memory file system which is preferred for staging if it exists and has at least this much free space
+_SHM_ROOT = '/dev/shm'
+_MIN_SHM_FREE_BYTES = 1 << 30
+
+# The total number of seconds spent staging files for each metric in this process
+_STAGING_TIMES: Dict[str, float] = defaultdict(float)
+_STAGING_TIMES_LOCK = threading.Lock()
+
+
+def get_staging_root() -> Optional[str]:
+    """
+    Returns the directory where the staging directories are created: `$SACREROUGE_TMPDIR` if it is set,
+    otherwise /dev/shm if it is a writable in-memory file system with enough free space, otherwise ``None``
+    (the ``tempfile.mkdtemp`` default location).
+    """
+    root = os.getenv('SACREROUGE_TMPDIR')
+    if root:
+        return root
+    if os.path.isdir(_SHM_ROOT) and os.access(_SHM_ROOT, os.W_OK | os.X_OK):
+        stats = os.statvfs(_SHM_ROOT)
+        if stats.f_bavail * stats.f_frsize >= _MIN_SHM_FREE_BYTES:
+            return _SHM_ROOT
+    return None
+
+
+def get_staging_times() -> Dict[str, float]:
+    """
+    Returns the total number of seconds spent creating, writing and deleting staging directories
+    for each metric in this process.
+    """
+    with _STAGING_TIMES_LOCK:
+        return dict(_STAGING_TIMES)
+
+
+class StagingDirectory(object):
+    """
+    A temporary directory for the input files of a metric which is run as an external program. It works like
+    `TemporaryDirectory`, except it is created in `get_staging_root()`, so it is in memory if possible, and the
+    files are written in batches: `add_file` queues a file and `flush` writes all of the queued files, creating
+    every directory only once. The time spent on the directory is added to the total for `name`, which is
+    returned by `get_staging_times`.
+
+    Example usage::
+
+        with StagingDirectory('rouge') as staging:
+            staging.add_file('summaries/0.txt', summary)
+            staging.flush()
+            run_metric(staging.path)
+
+    Parameters
+    ----------
+    name: ``str``, required.
+        The name of the metric which uses the directory.
+    root: ``str``, optional (default = ``None``)
+        The root directory where the staging directory should be created. If ``None``,
+        `get_staging_root()` is used.
+    persist: ``bool``, optional (default = False)
+        Indicates whether or not the directory should be persist on disk after the
+        context closes.
+    """
+    def __init__(self,
+                 name: str,
+                 root: Optional[str] = None,
+                 persist: bool = False) -> None:
+        self.name = name
+        self.root = root or get_staging_root()
+        self.persist = persist
+        self.path = None
+        self.num_files = 0
+        self.seconds = 0.0
+        self._pending: List[Tuple[str, str]] = []
+
+    def _add_time(self, seconds: float) -> None:
+        self.seconds += seconds
+        with _STAGING_TIMES_LOCK:
+            _STAGING_TIMES[self.name] += seconds
+
+    def __enter__(self) -> 'StagingDirectory':
+        start = time.time()
+        if self.root is not None:
+            os.makedirs(self.root, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix=f'sacrerouge-{self.name}-', dir=self.root)
+        self._add_time(time.time() - start)
+        return self
+
+    def add_file(self, file_path: str, contents: str) -> str:
+        """
+        Queues writing `contents` to `file_path`, which is relative to the staging directory (or absolute), and
+        returns the absolute path of the file. The file is not written until `flush` is called.
+        """
+        file_path = os.path.join(self.path, file_path)
+        self._pending.append((file_path, contents))
+        return file_path
+
+    def flush(self) -> None:
+        start = time.time()
+        directories = set(os.path.dirname(file_path) for file_path, _ in self._pending)
+        for directory in sorted(directories):
+            os.makedirs(directory, exist_ok=True)
+        for file_path, contents in self._pending:
+            with open(file_path, 'w') as out:
+                out.write(contents)
+        self.num_files += len(self._pending)
+        self._pending = []
+        self._add_time(time.time() - start)
+
+    def __exit__(self, *args):
+        start = time.time()
+        if not self.persist:
+            shutil.rmtree(self.path)
+        self._add_time(time.time() - start)
+        logger.info(f'Staged {self.num_files} files for {self.name} in {self.path} in {self.seconds:.2f}s')
@@ -3,10 +3,12 @@ import os
 import pkgutil
 import sys
 import urllib
+import xml.etree.ElementTree as ET
 from contextlib import contextmanager
 from google_drive_downloader import GoogleDriveDownloader
 from pathlib import Path
 from shutil import which
+from subprocess import Popen, PIPE
 from typing import Generator, List, T, Union
 
 PathType = Union[os.PathLike, str]
@@ -17,6 +19,43 @@ def command_exists(command: str) -> bool:
     return which(command) is not None
 
 
+def get_maven_classpath(project_root: str) -> str:
+    """
+    Returns the classpath to run the main classes of the Maven project in `project_root` with "java" directly
+    instead of "mvn exec:java", which resolves the dependencies every time it runs. The dependencies are
+    resolved by Maven the first time and saved to "target/classpath.txt" in the project.
+    """
+    classpath_file = f'{project_root}/target/classpath.txt'
+    if not os.path.exists(classpath_file):
+        command = f'cd {project_root} && mvn -q dependency:build-classpath -Dmdep.outputFile={classpath_file}'
+        process = Popen(command, stdout=PIPE, stderr=PIPE, shell=True)
+        process.communicate()
+        if process.returncode != 0:
+            raise Exception(f'Failed to resolve the classpath of "{project_root}" with Maven')
+    with open(classpath_file, 'r') as f:
+        dependencies = f.read().strip()
+    return f'{project_root}/target/classes:{dependencies}'
+
+
+def get_maven_main_class(project_root: str, execution_id: str) -> str:
+    """
+    Returns the main class which is configured for the exec-maven-plugin execution `execution_id` in the
+    pom.xml of the Maven project in `project_root`, so it can be run with "java" directly.
+    """
+    pom_file = f'{project_root}/pom.xml'
+    for element in ET.parse(pom_file).getroot().iter():
+        # Compare the local names so the pom.xml may or may not declare the Maven namespace
+        if element.tag.split('}')[-1] != 'execution':
+            continue
+        children = {child.tag.split('}')[-1]: child for child in element}
+        if 'id' not in children or children['id'].text.strip() != execution_id or 'configuration' not in children:
+            continue
+        for child in children['configuration']:
+            if child.tag.split('}')[-1] == 'mainClass':
+                return child.text.strip()
+    raise Exception(f'Unable to find the main class of the "{execution_id}" execution in {pom_file}')
+
+
 def download_url_to_file(url: str, file_path: str, force: bool = False) -> None:
     """
     Downloads a url to a local file if it does not already exist. The directory
@@ -111,4 +150,5 @@ def import_module_and_submodules(package_name: str) -> None:
 def flatten(text: Union[str, List[str]]) -> str:
     if isinstance(text, list):
         return ' '.join(text)
-    return text
\ No newline at end of file
+    return text
+
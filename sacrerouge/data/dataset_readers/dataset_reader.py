@@ -1,9 +1,32 @@
-from typing import List
+from typing import Iterator, List
 
 from sacrerouge.common import Registrable
 from sacrerouge.data import EvalInstance
 
 
 class DatasetReader(Registrable):
-    def read(self, *args: List[str]) -> List[EvalInstance]:
-        raise NotImplementedError
+    def read(self, *args: str) -> List[EvalInstance]:
+        if type(self).read_iter is DatasetReader.read_iter:
+            raise NotImplementedError
+        return list(self.read_iter(*args))
+
+    def read_iter(self, *args: str) -> Iterator[EvalInstance]:
+        """
+        Lazily yields the instances one at a time so the whole dataset never has to be in memory. Readers
+        should implement either `read_iter` or `read`. If only `read` is implemented, this will yield the
+        instances from its list.
+        """
+        yield from self.read(*args)
+
+    def read_chunks(self, *args: str, chunk_size: int) -> Iterator[List[EvalInstance]]:
+        """
+        Yields the instances from `read_iter` in lists of at most `chunk_size` instances.
+        """
+        chunk = []
+        for instance in self.read_iter(*args):
+            chunk.append(instance)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
@@ -1,5 +1,5 @@
 import logging
-from typing import Any, List, Union
+from typing import Any, Iterator, List, Union
 
 from sacrerouge.data import EvalInstance
 from sacrerouge.data.dataset_readers import DatasetReader
@@ -31,9 +31,9 @@ def flatten_documents(documents: List[Any]) -> List[Union[List[str], str]]:
 
 @DatasetReader.register('document-based')
 class DocumentBasedDatasetReader(DatasetReader):
-    def read(self, input_jsonl: str) -> List[EvalInstance]:
+    def read_iter(self, input_jsonl: str) -> Iterator[EvalInstance]:
         logger.info(f'Loading evaluation instances from {input_jsonl}')
-        instances = []
+        num_instances = 0
         with JsonlReader(input_jsonl) as f:
             for data in f:
                 fields = {}
@@ -51,15 +51,15 @@ class DocumentBasedDatasetReader(DatasetReader):
                     data['summarizer_type'],
                     fields
                 )
-                instances.append(instance)
+                num_instances += 1
+                yield instance
 
-            logger.info(f'Loaded {len(instances)} instances')
-            return instances
+            logger.info(f'Loaded {num_instances} instances')
 
 
 @DatasetReader.register('split-document-based')
 class SplitDocumentBasedDatasetReader(DatasetReader):
-    def read(self, documents_jsonl: str, summaries_jsonl) -> List[EvalInstance]:
+    def read_iter(self, documents_jsonl: str, summaries_jsonl) -> Iterator[EvalInstance]:
         logger.info(f'Loading documents from {documents_jsonl}')
         documents_dict = {}
         with JsonlReader(documents_jsonl) as f:
@@ -74,7 +74,7 @@ class SplitDocumentBasedDatasetReader(DatasetReader):
         logger.info(f'Loaded {len(documents_dict)} document sets')
 
         logger.info(f'Loading summaries from {summaries_jsonl}')
-        instances = []
+        num_instances = 0
         with JsonlReader(summaries_jsonl) as f:
             for data in f:
                 fields = {}
@@ -90,6 +90,6 @@ class SplitDocumentBasedDatasetReader(DatasetReader):
                     data['summarizer_type'],
                     fields
                 )
-                instances.append(instance)
-        logger.info(f'Loaded {len(instances)} instances')
-        return instances
+                num_instances += 1
+                yield instance
+        logger.info(f'Loaded {num_instances} instances')
@@ -1,5 +1,5 @@
 import logging
-from typing import List
+from typing import Iterator
 
 from sacrerouge.data import EvalInstance, Pyramid, PyramidAnnotation
 from sacrerouge.data.dataset_readers import DatasetReader
@@ -21,9 +21,9 @@ class PyramidBasedDatasetReader(DatasetReader):
         super().__init__()
         self.include_reference_annotations = include_reference_annotations
 
-    def read(self,
-             pyramid_jsonl: str,
-             annotation_jsonl: str) -> List[EvalInstance]:
+    def read_iter(self,
+                  pyramid_jsonl: str,
+                  annotation_jsonl: str) -> Iterator[EvalInstance]:
         logger.info(f'Loading Pyramids from {pyramid_jsonl}')
         pyramids = {}
         with JsonlReader(pyramid_jsonl, Pyramid) as f:
@@ -32,7 +32,7 @@ class PyramidBasedDatasetReader(DatasetReader):
         logger.info(f'Loaded {len(pyramids)} pyramids')
 
         logger.info(f'Loading Pyramid annotations from {annotation_jsonl}')
-        instances = []
+        num_instances = 0
         instance_ids = set()
         with JsonlReader(annotation_jsonl, PyramidAnnotation) as f:
             for annotation in f:
@@ -47,15 +47,16 @@ class PyramidBasedDatasetReader(DatasetReader):
                     annotation.summarizer_type,
                     fields
                 )
-                instances.append(instance)
+                num_instances += 1
+                yield instance
 
                 instance_ids.add(annotation.instance_id)
 
-            logger.info(f'Loaded {len(instances)} Pyramid annotations')
+            logger.info(f'Loaded {num_instances} Pyramid annotations')
 
         if self.include_reference_annotations:
             logger.info(f'Generating Pyramid annotations for the reference summaries')
-            reference_instances = []
+            num_reference_instances = 0
             for instance_id in instance_ids:
                 pyramid = pyramids[instance_id]
 
@@ -74,9 +75,9 @@ class PyramidBasedDatasetReader(DatasetReader):
                             annotation.summarizer_type,
                             fields
                         )
-                        reference_instances.append(instance)
-            logger.info(f'Generated {len(reference_instances)} reference summary annotations')
-            instances.extend(reference_instances)
+                        num_reference_instances += 1
+                        yield instance
+            logger.info(f'Generated {num_reference_instances} reference summary annotations')
+            num_instances += num_reference_instances
 
-        logger.info(f'Loaded a total of {len(instances)} instances')
-        return instances
+        logger.info(f'Loaded a total of {num_instances} instances')
@@ -1,5 +1,5 @@
 import logging
-from typing import List
+from typing import Iterator
 
 from sacrerouge.data import EvalInstance
 from sacrerouge.data.dataset_readers import DatasetReader
@@ -11,9 +11,9 @@ logger = logging.getLogger(__name__)
 
 @DatasetReader.register('summary-only')
 class SummaryOnlyDatasetReader(DatasetReader):
-    def read(self, input_jsonl: str) -> List[EvalInstance]:
+    def read_iter(self, input_jsonl: str) -> Iterator[EvalInstance]:
         logger.info(f'Loading evaluation instances from {input_jsonl}')
-        instances = []
+        num_instances = 0
         with JsonlReader(input_jsonl) as f:
             for data in f:
                 fields = {}
@@ -26,7 +26,7 @@ class SummaryOnlyDatasetReader(DatasetReader):
                     data['summarizer_type'],
                     fields
                 )
-                instances.append(instance)
+                num_instances += 1
+                yield instance
 
-            logger.info(f'Loaded {len(instances)} instances')
-            return instances
+            logger.info(f'Loaded {num_instances} instances')
@@ -4,6 +4,7 @@ from jsons import JsonSerializable
 from typing import Dict, List, Optional, Union
 
 from sacrerouge.data.metrics_dict import MetricsDict
+from sacrerouge.io.serialization import set_fast_deserializer, set_fast_serializer
 
 
 class Metrics(object):
@@ -57,5 +58,13 @@ class Metrics(object):
             'metrics': metrics.metrics
         })
 
+    @staticmethod
+    def deserialize(obj: Dict) -> 'Metrics':
+        metrics = Metrics(obj['instance_id'], obj['summarizer_id'], obj['summarizer_type'])
+        metrics.metrics = MetricsDict.deserialize(obj['metrics'])
+        return metrics
+
 
 JsonSerializable.set_serializer(Metrics.serialize, Metrics)
+set_fast_serializer(Metrics.serialize, Metrics)
+set_fast_deserializer(Metrics.deserialize, Metrics)
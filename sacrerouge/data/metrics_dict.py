@@ -2,6 +2,8 @@ import copy
 import pytest
 from typing import Dict, List, Optional, Union
 
+from sacrerouge.io.serialization import set_fast_deserializer, set_fast_serializer
+
 ValueType = Union['MetricsDict', float, List[float]]
 
 
@@ -115,3 +117,16 @@ class MetricsDict(dict):
                 # Incompatible types
                 return False
         return True
+
+    @staticmethod
+    def deserialize(obj: Dict) -> 'MetricsDict':
+        # Unlike the constructor, this does not deep copy the input. __setitem__ will
+        # convert the nested dictionaries
+        metrics_dict = MetricsDict()
+        for key, value in obj.items():
+            metrics_dict[key] = value
+        return metrics_dict
+
+
+set_fast_serializer(dict, MetricsDict)
+set_fast_deserializer(MetricsDict.deserialize, MetricsDict)
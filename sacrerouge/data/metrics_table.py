@@ -0,0 +1,353 @@
+import numpy as np
+import os
+import zipfile
+from typing import Dict, Iterable, List, Optional, Union
+
+from sacrerouge.data.metrics import Metrics
+from sacrerouge.io import JsonlReader
+
+
+def _flatten(metrics: Dict, prefix: str = '') -> Iterable:
+    for key, value in metrics.items():
+        name = prefix + key
+        if isinstance(value, dict):
+            yield from _flatten(value, name + '_')
+        else:
+            yield name, value
+
+
+def _to_float(name: str, value, strict: bool) -> Optional[float]:
+    """
+    Converts a metric's value to a float, averaging lists of values. None is returned for an empty list and,
+    unless `strict` is True, for any non-numeric value.
+    """
+    items = value if isinstance(value, list) else [value]
+    if all(isinstance(item, (int, float, np.number)) and not isinstance(item, bool) for item in items):
+        if len(items) == 0:
+            return None
+        return float(sum(items) / len(items))
+    if strict:
+        raise Exception(f'Metric "{name}" has a non-numeric value: {value}')
+    return None
+
+
+def _memmap_npz_member(file_path: str, name: str) -> np.ndarray:
+    """
+    Memory maps the array `name` from an uncompressed npz file. `np.load` does not support memory mapping npz
+    files, but the members are stored contiguously in the zip file, so the array's data can be mapped directly
+    once the offsets of the zip and npy headers are known.
+    """
+    with zipfile.ZipFile(file_path) as zip_file:
+        info = zip_file.getinfo(name + '.npy')
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise Exception(f'Cannot memory map compressed npz member "{name}"')
+
+    with open(file_path, 'rb') as f:
+        # The local file header is 30 bytes followed by the file name and extra field, whose lengths are
+        # stored at bytes 26 and 28
+        f.seek(info.header_offset + 26)
+        name_length, extra_length = np.frombuffer(f.read(4), dtype='<u2')
+        f.seek(info.header_offset + 30 + int(name_length) + int(extra_length))
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+
+    if int(np.prod(shape)) == 0:
+        return np.empty(shape, dtype=dtype)
+    order = 'F' if fortran_order else 'C'
+    return np.memmap(file_path, dtype=dtype, mode='r', shape=shape, order=order, offset=offset)
+
+
+class MetricsTable(object):
+    """
+    A `MetricsTable` is a columnar version of a list of `Metrics` objects. Every (instance_id, summarizer_id) pair
+    is one row of the table, and the rows are represented by index vectors into the interned (sorted) lists of
+    instance, summarizer and summarizer type ids. Every flattened metric is a column of floats in which missing
+    values are NaN. Metrics which have a list of values are averaged when the table is built.
+
+    The table is built once and can then create the N x M matrix for any metric without going through the
+    individual `Metrics` objects, which is much faster than `convert_to_matrices` for large files.
+
+    `metric_groups` maps every column to the top-level metric it was flattened from (e.g., "rouge-1_recall" to
+    "rouge-1"), which `merge` uses to replace whole top-level metrics. If it is None, every column is its own group.
+    """
+    def __init__(self,
+                 instance_ids: List[str],
+                 summarizer_ids: List[str],
+                 summarizer_types: List[str],
+                 instance_index: np.ndarray,
+                 summarizer_index: np.ndarray,
+                 summarizer_type_index: np.ndarray,
+                 columns: Dict[str, np.ndarray],
+                 metric_groups: Optional[Dict[str, str]] = None) -> None:
+        self.instance_ids = instance_ids
+        self.summarizer_ids = summarizer_ids
+        self.summarizer_types = summarizer_types
+        self.instance_index = instance_index
+        self.summarizer_index = summarizer_index
+        self.summarizer_type_index = summarizer_type_index
+        self.columns = columns
+        self.metric_groups = {name: name for name in columns}
+        if metric_groups is not None:
+            self.metric_groups.update({name: group for name, group in metric_groups.items() if name in columns})
+
+    def __len__(self) -> int:
+        return len(self.instance_index)
+
+    @property
+    def metric_names(self) -> List[str]:
+        return list(self.columns.keys())
+
+    @staticmethod
+    def from_dicts(records: Iterable[Dict], metric_names: Optional[List[str]] = None) -> 'MetricsTable':
+        """
+        Builds the table from serialized `Metrics` dictionaries. Records for the same (instance_id, summarizer_id)
+        are merged into one row like `Metrics.merge`: each top-level metric in a later record replaces all of the
+        values under that metric from earlier records. If `metric_names` is not None, only those flattened metrics
+        are kept, which saves memory for files with many metrics, and a non-numeric value for one of them raises
+        an exception. Otherwise, non-numeric values are skipped. Empty lists of values are treated as missing.
+        """
+        selected = set(metric_names) if metric_names is not None else None
+        row_ids = {}
+        keys, types = [], []
+        values = {}
+        metric_groups = {}
+        # The flattened names which have been seen under every top-level metric, used to clear a row's
+        # previous values when a later record replaces the metric
+        top_level_names = {}
+        for record in records:
+            key = (record['instance_id'], record['summarizer_id'])
+            summarizer_type = record['summarizer_type']
+            is_new_row = key not in row_ids
+            if is_new_row:
+                row_ids[key] = len(keys)
+                keys.append(key)
+                types.append(summarizer_type)
+            elif types[row_ids[key]] != summarizer_type:
+                raise Exception(f'Cannot merge two Metrics if metadata is not the same.')
+
+            row = row_ids[key]
+            for top_level_key, top_level_value in record['metrics'].items():
+                names = top_level_names.setdefault(top_level_key, set())
+                if not is_new_row:
+                    for name in names:
+                        values[name].pop(row, None)
+
+                for name, value in _flatten({top_level_key: top_level_value}):
+                    if selected is not None and name not in selected:
+                        continue
+                    value = _to_float(name, value, strict=selected is not None)
+                    if value is None:
+                        continue
+                    if name not in values:
+                        values[name] = {}
+                    values[name][row] = value
+                    names.add(name)
+                    metric_groups[name] = top_level_key
+
+        num_rows = len(keys)
+        instance_ids = sorted(set(instance_id for instance_id, _ in keys))
+        summarizer_ids = sorted(set(summarizer_id for _, summarizer_id in keys))
+        summarizer_types = sorted(set(types))
+        instance_to_index = {instance_id: i for i, instance_id in enumerate(instance_ids)}
+        summarizer_to_index = {summarizer_id: i for i, summarizer_id in enumerate(summarizer_ids)}
+        type_to_index = {summarizer_type: i for i, summarizer_type in enumerate(summarizer_types)}
+
+        instance_index = np.array([instance_to_index[instance_id] for instance_id, _ in keys], dtype=np.int64)
+        summarizer_index = np.array([summarizer_to_index[summarizer_id] for _, summarizer_id in keys], dtype=np.int64)
+        summarizer_type_index = np.array([type_to_index[summarizer_type] for summarizer_type in types], dtype=np.int64)
+
+        columns = {}
+        for name, column_values in values.items():
+            column = np.full(num_rows, np.nan)
+            column[np.fromiter(column_values.keys(), dtype=np.int64, count=len(column_values))] = \
+                np.fromiter(column_values.values(), dtype=float, count=len(column_values))
+            columns[name] = column
+
+        return MetricsTable(instance_ids, summarizer_ids, summarizer_types,
+                            instance_index, summarizer_index, summarizer_type_index, columns, metric_groups)
+
+    @staticmethod
+    def from_metrics_list(metrics_list: List[Metrics], metric_names: Optional[List[str]] = None) -> 'MetricsTable':
+        records = (Metrics.serialize(metrics) for metrics in metrics_list)
+        return MetricsTable.from_dicts(records, metric_names=metric_names)
+
+    @staticmethod
+    def from_jsonl(file_paths: Union[str, List[str]], metric_names: Optional[List[str]] = None) -> 'MetricsTable':
+        if isinstance(file_paths, str):
+            file_paths = [file_paths]
+
+        def _read_records():
+            for file_path in file_paths:
+                with JsonlReader(file_path) as f:
+                    yield from f
+
+        return MetricsTable.from_dicts(_read_records(), metric_names=metric_names)
+
+    @staticmethod
+    def from_npz(file_path: str, metric_names: Optional[List[str]] = None, mmap: bool = True) -> 'MetricsTable':
+        """
+        Loads a table which was saved with `save_npz`. If `mmap` is True, the score matrix is memory mapped
+        instead of read into memory, so only the columns which are used are ever read from disk.
+        """
+        with np.load(file_path, allow_pickle=False) as data:
+            names = data['metric_names'].tolist()
+            tables = {key: data[key] for key in data.files if key != 'values'}
+            values = _memmap_npz_member(file_path, 'values') if mmap else data['values']
+
+        if metric_names is not None:
+            names = [name for name in names if name in set(metric_names)]
+        name_to_index = {name: i for i, name in enumerate(tables['metric_names'].tolist())}
+        columns = {name: values[name_to_index[name]] for name in names}
+        metric_groups = None
+        if 'metric_groups' in tables:
+            metric_groups = dict(zip(tables['metric_names'].tolist(), tables['metric_groups'].tolist()))
+        return MetricsTable(tables['instance_ids'].tolist(), tables['summarizer_ids'].tolist(),
+                            tables['summarizer_types'].tolist(), tables['instance_index'],
+                            tables['summarizer_index'], tables['summarizer_type_index'], columns, metric_groups)
+
+    @staticmethod
+    def from_files(file_paths: Union[str, List[str]], metric_names: Optional[List[str]] = None) -> 'MetricsTable':
+        """
+        Loads the table from any combination of jsonl and npz files. The npz files are identified by their
+        ".npz" extension. Multiple files are merged with `MetricsTable.merge`.
+        """
+        if isinstance(file_paths, str):
+            file_paths = [file_paths]
+        if not any(file_path.endswith('.npz') for file_path in file_paths):
+            return MetricsTable.from_jsonl(file_paths, metric_names=metric_names)
+
+        tables = []
+        for file_path in file_paths:
+            if file_path.endswith('.npz'):
+                tables.append(MetricsTable.from_npz(file_path, metric_names=metric_names))
+            else:
+                tables.append(MetricsTable.from_jsonl(file_path, metric_names=metric_names))
+        if len(tables) == 1:
+            return tables[0]
+        return MetricsTable.merge(tables)
+
+    @staticmethod
+    def merge(tables: List['MetricsTable']) -> 'MetricsTable':
+        """
+        Merges the rows of several tables, combining the rows for the same (instance_id, summarizer_id), like
+        `Metrics.merge` and `from_dicts`: if a row of a later table has any value for a top-level metric, it replaces
+        all of the values under that metric from the earlier tables.
+        """
+        instance_ids = sorted(set().union(*[table.instance_ids for table in tables]))
+        summarizer_ids = sorted(set().union(*[table.summarizer_ids for table in tables]))
+        summarizer_types = sorted(set().union(*[table.summarizer_types for table in tables]))
+
+        # Map every table's rows into the merged id vocabularies
+        instance_index, summarizer_index, summarizer_type_index = [], [], []
+        for table in tables:
+            instance_index.append(np.searchsorted(instance_ids, table.instance_ids).astype(np.int64)[table.instance_index])
+            summarizer_index.append(np.searchsorted(summarizer_ids, table.summarizer_ids).astype(np.int64)[table.summarizer_index])
+            summarizer_type_index.append(np.searchsorted(summarizer_types, table.summarizer_types).astype(np.int64)[table.summarizer_type_index])
+        instance_index = np.concatenate(instance_index)
+        summarizer_index = np.concatenate(summarizer_index)
+        summarizer_type_index = np.concatenate(summarizer_type_index)
+
+        keys = instance_index * len(summarizer_ids) + summarizer_index
+        unique_keys, first_rows, rows = np.unique(keys, return_index=True, return_inverse=True)
+        types = np.full(len(unique_keys), -1, dtype=np.int64)
+        types[rows] = summarizer_type_index
+        if np.any(types[rows] != summarizer_type_index):
+            raise Exception(f'Cannot merge two Metrics if metadata is not the same.')
+
+        columns = {}
+        metric_groups = {}
+        group_names = {}
+        start = 0
+        for table in tables:
+            table_rows = rows[start:start + len(table)]
+            table_groups = {}
+            for name, group in table.metric_groups.items():
+                table_groups.setdefault(group, []).append(name)
+
+            for group, names in table_groups.items():
+                # The rows of this table which have the metric replace all of its earlier values
+                present = np.zeros(len(table), dtype=bool)
+                for name in names:
+                    present |= ~np.isnan(table.columns[name])
+                for name in group_names.get(group, []):
+                    columns[name][table_rows[present]] = np.nan
+
+                for name in names:
+                    if name not in columns:
+                        columns[name] = np.full(len(unique_keys), np.nan)
+                        metric_groups[name] = group
+                        group_names.setdefault(group, []).append(name)
+                    column = table.columns[name]
+                    columns[name][table_rows[present]] = column[present]
+            start += len(table)
+
+        return MetricsTable(instance_ids, summarizer_ids, summarizer_types,
+                            instance_index[first_rows], summarizer_index[first_rows], types, columns, metric_groups)
+
+    def save_npz(self, file_path: str) -> None:
+        """
+        Saves the table to an uncompressed npz file with the id tables and a (number of metrics) x (number of rows)
+        float matrix of scores, which can be memory mapped by `from_npz`.
+        """
+        dirname = os.path.dirname(file_path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        names = self.metric_names
+        values = np.stack([self.columns[name] for name in names]) if names else np.empty((0, len(self)))
+        with open(file_path, 'wb') as f:
+            np.savez(f,
+                     instance_ids=np.array(self.instance_ids, dtype=str),
+                     summarizer_ids=np.array(self.summarizer_ids, dtype=str),
+                     summarizer_types=np.array(self.summarizer_types, dtype=str),
+                     instance_index=self.instance_index,
+                     summarizer_index=self.summarizer_index,
+                     summarizer_type_index=self.summarizer_type_index,
+                     metric_names=np.array(names, dtype=str),
+                     metric_groups=np.array([self.metric_groups[name] for name in names], dtype=str),
+                     values=values)
+
+    def filter(self, summarizer_type: str, *metric_names: str) -> 'MetricsTable':
+        """
+        Returns a new table with the rows that are for `summarizer_type` ("all" keeps every type) and have a value
+        for every metric in `metric_names`, like `filter_metrics`.
+        """
+        keep = np.ones(len(self), dtype=bool)
+        if summarizer_type != 'all':
+            if summarizer_type in self.summarizer_types:
+                keep &= self.summarizer_type_index == self.summarizer_types.index(summarizer_type)
+            else:
+                keep[:] = False
+        for name in metric_names:
+            if name in self.columns:
+                keep &= ~np.isnan(self.columns[name])
+            else:
+                keep[:] = False
+
+        return MetricsTable(self.instance_ids, self.summarizer_ids, self.summarizer_types,
+                            self.instance_index[keep], self.summarizer_index[keep], self.summarizer_type_index[keep],
+                            {name: column[keep] for name, column in self.columns.items()}, self.metric_groups)
+
+    def to_matrices(self, *metric_names: str) -> Union[np.ndarray, List[np.ndarray]]:
+        """
+        Creates the same N x M matrices as `convert_to_matrices`, where N is the number of summarizer_ids and M is
+        the number of instance_ids which appear in the table's rows, both in sorted order.
+        """
+        summarizers, rows = np.unique(self.summarizer_index, return_inverse=True)
+        instances, cols = np.unique(self.instance_index, return_inverse=True)
+        N, M = len(summarizers), len(instances)
+
+        matrices = []
+        for name in metric_names:
+            matrix = np.full((N, M), np.nan)
+            if name in self.columns:
+                matrix[rows, cols] = self.columns[name]
+            matrices.append(matrix)
+
+        if len(matrices) == 1:
+            return matrices[0]
+        return matrices
@@ -1,8 +1,8 @@
 import bz2
 import gzip
-import jsons
 from typing import Any, List, Optional, Type
 
+from sacrerouge.io.serialization import loads
 from sacrerouge.io.util import is_gz_file
 
 
@@ -56,7 +56,7 @@ class JsonlReader(object):
         for line in self.file_handler:
             if self.binary:
                 line = line.decode()
-            return jsons.loads(line, self.cls)
+            return loads(line, self.cls)
         raise StopIteration
 
     def __exit__(self, *args):
@@ -1,9 +1,10 @@
 import bz2
 import gzip
-import jsons
 import os
 from typing import Any
 
+from sacrerouge.io.serialization import dumps
+
 
 class JsonlWriter(object):
     """
@@ -52,7 +53,7 @@ class JsonlWriter(object):
         object: ``Any``
             The object to write to the file.
         """
-        string = jsons.dumps(object)
+        string = dumps(object)
         if self.binary:
             self.file_handler.write(string.encode() + b'\n')
         else:
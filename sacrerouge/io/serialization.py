@@ -0,0 +1,71 @@
+import json
+import jsons
+from typing import Any, Callable, Dict, Optional, Type
+
+try:
+    import orjson
+except ImportError:
+    ORJSON_INSTALLED = False
+else:
+    ORJSON_INSTALLED = True
+
+# The types which have a fast (de)serialization path that avoids `jsons`. `jsons` introspects the type of every
+# object it (de)serializes, which is many times slower than the standard `json` module for the simple
+# structures that we read and write most often, like `Metrics`
+_SERIALIZERS: Dict[Type, Callable[[Any], Any]] = {}
+_DESERIALIZERS: Dict[Type, Callable[[Any], Any]] = {}
+
+
+def set_fast_serializer(func: Callable[[Any], Any], cls: Type) -> None:
+    """
+    Registers `func` to convert objects of type `cls` into json-compatible Python objects for `dumps`.
+    """
+    _SERIALIZERS[cls] = func
+
+
+def set_fast_deserializer(func: Callable[[Any], Any], cls: Type) -> None:
+    """
+    Registers `func` to convert parsed json into an object of type `cls` for `loads`.
+    """
+    _DESERIALIZERS[cls] = func
+
+
+def _parse(string: str) -> Any:
+    if ORJSON_INSTALLED:
+        try:
+            return orjson.loads(string)
+        except orjson.JSONDecodeError:
+            # orjson does not accept NaN and Infinity, which the json module can write
+            pass
+    return json.loads(string)
+
+
+def loads(string: str, cls: Optional[Type] = None) -> Any:
+    """
+    Deserializes `string` into an object of type `cls`. Plain json types and the types registered with
+    `set_fast_deserializer` are parsed with orjson (if it is installed) or json. Everything else falls back
+    to `jsons`.
+    """
+    if cls is None or cls in (dict, list):
+        return _parse(string)
+    if cls in _DESERIALIZERS:
+        return _DESERIALIZERS[cls](_parse(string))
+    return jsons.loads(string, cls)
+
+
+def dumps(obj: Any) -> str:
+    """
+    Serializes `obj` into a json string which is identical to the output of `jsons.dumps`. Plain json types and
+    the types registered with `set_fast_serializer` are serialized directly with json. Everything else falls back
+    to `jsons`.
+    """
+    if type(obj) in _SERIALIZERS:
+        obj = _SERIALIZERS[type(obj)](obj)
+    elif not isinstance(obj, (dict, list, str, int, float, bool)) and obj is not None:
+        return jsons.dumps(obj)
+
+    try:
+        return json.dumps(obj)
+    except TypeError:
+        # The object contains a value json cannot serialize, for instance a numpy integer
+        return jsons.dumps(obj)
@@ -7,8 +7,8 @@ from subprocess import Popen, PIPE
 from typing import List
 
 from sacrerouge.commands import MetricSetupSubcommand
-from sacrerouge.common import DATA_ROOT, TemporaryDirectory
-from sacrerouge.common.util import command_exists
+from sacrerouge.common import DATA_ROOT, StagingDirectory
+from sacrerouge.common.util import command_exists, get_maven_classpath, get_maven_main_class
 from sacrerouge.data import MetricsDict
 from sacrerouge.data.types import ReferenceType, SummaryType
 from sacrerouge.metrics import Metric, ReferenceBasedMetric
@@ -18,6 +18,8 @@ logger = logging.getLogger(__name__)
 
 @Metric.register('autosummeng')
 class AutoSummENG(ReferenceBasedMetric):
+    execution_parameters = ['verbose', 'use_maven']
+
     def __init__(self,
                  min_n: int = 3,
                  max_n: int = 3,
@@ -25,7 +27,13 @@ class AutoSummENG(ReferenceBasedMetric):
                  min_score: float = 0.0,
                  max_score: float = 1.0,
                  autosummeng_root: str = f'{DATA_ROOT}/metrics/AutoSummENG',
-                 verbose: bool = False):
+                 verbose: bool = False,
+                 use_maven: bool = True):
+        """
+        Args:
+            use_maven: If true, AutoSummENG is run with "mvn exec:java". Otherwise, the classpath is resolved
+                by Maven once (and saved in the target directory) and AutoSummENG is run with "java" directly
+        """
         super().__init__()
         self.min_n = min_n
         self.max_n = max_n
@@ -34,20 +42,16 @@ class AutoSummENG(ReferenceBasedMetric):
         self.max_score = max_score
         self.autosummeng_root = autosummeng_root
         self.verbose = verbose
+        self.use_maven = use_maven
+        self._java_command = None
 
         if not os.path.exists(autosummeng_root):
             raise Exception(f'AutoSummENG path "{autosummeng_root}" does not exist. Have you setup AutoSummENG?')
 
-    def _save_summary(self, summary: SummaryType, file_path: str) -> None:
-        dirname = os.path.dirname(file_path)
-        if dirname:
-            os.makedirs(dirname, exist_ok=True)
-
-        with open(file_path, 'w') as out:
-            if isinstance(summary, list):
-                out.write('\n'.join(summary))
-            else:
-                out.write(summary)
+    def _format_summary(self, summary: SummaryType) -> str:
+        if isinstance(summary, list):
+            return '\n'.join(summary)
+        return summary
 
     def _parse_output_file(self, file_path: str) -> List[List[MetricsDict]]:
         metrics_dicts = defaultdict(dict)
@@ -75,29 +79,35 @@ class AutoSummENG(ReferenceBasedMetric):
                 metrics_lists[-1].append(metrics_dicts[i][j])
         return metrics_lists
 
+    def _get_java_command(self) -> List[str]:
+        if self._java_command is None:
+            main_class = get_maven_main_class(self.autosummeng_root, 'NPowERBatch')
+            self._java_command = ['java', '-cp', get_maven_classpath(self.autosummeng_root), main_class]
+        return self._java_command
+
     def _run(self,
              summaries_list: List[List[SummaryType]],
              references_list: List[List[SummaryType]]) -> List[List[MetricsDict]]:
-        with TemporaryDirectory() as temp_dir:
-            files_tsv_path = f'{temp_dir}/files.tsv'
-            with open(files_tsv_path, 'w') as out:
-                for i, (summaries, references) in enumerate(zip(summaries_list, references_list)):
-                    reference_filenames = []
-                    for j, reference in enumerate(references):
-                        filename = f'{temp_dir}/references/{i}/{j}.txt'
-                        self._save_summary(reference, filename)
-                        reference_filenames.append(filename)
-
-                    peer_filenames = []
-                    for j, summary in enumerate(summaries):
-                        filename = f'{temp_dir}/peers/{i}/{j}.txt'
-                        self._save_summary(summary, filename)
-                        peer_filenames.append(filename)
-
-                    out.write(f'{",".join(reference_filenames)}\t{",".join(peer_filenames)}\n')
+        with StagingDirectory('autosummeng') as staging:
+            temp_dir = staging.path
+            lines = []
+            for i, (summaries, references) in enumerate(zip(summaries_list, references_list)):
+                reference_filenames = []
+                for j, reference in enumerate(references):
+                    filename = staging.add_file(f'references/{i}/{j}.txt', self._format_summary(reference))
+                    reference_filenames.append(filename)
+
+                peer_filenames = []
+                for j, summary in enumerate(summaries):
+                    filename = staging.add_file(f'peers/{i}/{j}.txt', self._format_summary(summary))
+                    peer_filenames.append(filename)
+
+                lines.append(f'{",".join(reference_filenames)}\t{",".join(peer_filenames)}\n')
+            files_tsv_path = staging.add_file('files.tsv', ''.join(lines))
+            staging.flush()
 
             output_file = f'{temp_dir}/output.tsv'
-            args = ' '.join([
+            args = [
                 f'-files={files_tsv_path}',
                 f'-output={output_file}',
                 f'-minN={self.min_n}',
@@ -105,17 +115,22 @@ class AutoSummENG(ReferenceBasedMetric):
                 f'-dwin={self.d_window}',
                 f'-minScore={self.min_score}',
                 f'-maxScore={self.max_score}'
-            ])
-
-            commands = [
-                f'cd {self.autosummeng_root}',
-                f'mvn exec:java@NPowERBatch -Dexec.args=\'{args}\''
             ]
-            command = ' && '.join(commands)
+
+            if self.use_maven:
+                args = ' '.join(args)
+                commands = [
+                    f'cd {self.autosummeng_root}',
+                    f'mvn exec:java@NPowERBatch -Dexec.args=\'{args}\''
+                ]
+                command = ' && '.join(commands)
+            else:
+                command = self._get_java_command() + args
 
             logger.info(f'Running AutoSummENG command: "{command}"')
             redirect = None if self.verbose else PIPE
-            process = Popen(command, stdout=redirect, stderr=redirect, shell=True)
+            process = Popen(command, stdout=redirect, stderr=redirect, shell=self.use_maven,
+                            cwd=None if self.use_maven else self.autosummeng_root)
             stdout, stderr = process.communicate()
 
             return self._parse_output_file(output_file)
@@ -125,7 +140,6 @@ class AutoSummENG(ReferenceBasedMetric):
                         references_list: List[List[ReferenceType]]) -> List[List[MetricsDict]]:
         return self._run(summaries_list, references_list)
 
-
 @MetricSetupSubcommand.register('autosummeng')
 class AutoSummENGSetupSubcommand(MetricSetupSubcommand):
     @overrides
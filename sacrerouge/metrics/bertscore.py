@@ -25,6 +25,8 @@ else:
 
     @Metric.register('bertscore')
     class BertScore(ReferenceBasedMetric):
+        resource_hints = ['gpu']
+
         def __init__(self,
                      model_type: str = None,
                      num_layers: int = None,
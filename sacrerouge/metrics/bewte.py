@@ -8,8 +8,9 @@ from subprocess import Popen, PIPE
 from typing import List, Tuple
 
 from sacrerouge.commands import MetricSetupSubcommand
-from sacrerouge.common import DATA_ROOT, TemporaryDirectory
-from sacrerouge.common.util import command_exists, download_file_from_google_drive
+from sacrerouge.common import DATA_ROOT, StagingDirectory
+from sacrerouge.common.util import command_exists, download_file_from_google_drive, get_maven_classpath, \
+    get_maven_main_class
 from sacrerouge.data import MetricsDict
 from sacrerouge.data.types import ReferenceType, SummaryType
 from sacrerouge.metrics import Metric, ReferenceBasedMetric
@@ -19,9 +20,17 @@ logger = logging.getLogger(__name__)
 
 @Metric.register('bewte')
 class BEwTE(ReferenceBasedMetric):
+    execution_parameters = ['verbose', 'use_maven']
+
     def __init__(self,
                  bewte_root: str = f'{DATA_ROOT}/metrics/ROUGE-BEwTE',
-                 verbose: bool = False):
+                 verbose: bool = False,
+                 use_maven: bool = True):
+        """
+        Args:
+            use_maven: If true, every step is run with "mvn exec:java". Otherwise, the classpath is resolved
+                by Maven once (and saved in the target directory) and the steps are run with "java" directly
+        """
         super().__init__()
         self.bewte_root = bewte_root
         if not os.path.exists(bewte_root):
@@ -35,29 +44,57 @@ class BEwTE(ReferenceBasedMetric):
         self.transforms_coef_file = f'src/main/resources/conf/transformations/EN_transformCoeffs.txt'
         self.end_analysis_file = f'src/main/resources/conf/endanalysis/doNothingEndAnalysisConfig.txt'
         self.verbose = verbose
+        self.use_maven = use_maven
+        self._classpath = None
+        self._main_classes = {}
 
-    def _save_summary(self, summary: SummaryType, file_path: str) -> None:
-        dirname = os.path.dirname(file_path)
-        os.makedirs(dirname, exist_ok=True)
-        with open(file_path, 'w') as out:
-            if isinstance(summary, list):
-                out.write('\n'.join(summary))
-            else:
-                out.write(summary)
+    def _format_summary(self, summary: SummaryType) -> str:
+        if isinstance(summary, list):
+            return '\n'.join(summary)
+        return summary
 
     def _save_summaries(self,
-                        temp_dir: str,
+                        staging: StagingDirectory,
                         summaries_list: List[List[SummaryType]],
                         references_list: List[List[SummaryType]]) -> None:
         for i, (summaries, references) in enumerate(zip(summaries_list, references_list)):
             for j, summary in enumerate(summaries):
-                self._save_summary(summary, f'{temp_dir}/summaries/{i}.{j}')
+                staging.add_file(f'summaries/{i}.{j}', self._format_summary(summary))
             for j, reference in enumerate(references):
                 symbol = chr(j + 65)
-                self._save_summary(reference, f'{temp_dir}/summaries/{i}.{symbol}')
+                staging.add_file(f'summaries/{i}.{symbol}', self._format_summary(reference))
+        staging.flush()
+
+    def _get_classpath(self) -> str:
+        if self._classpath is None:
+            self._classpath = get_maven_classpath(self.bewte_root)
+        return self._classpath
+
+    def _get_main_class(self, execution_id: str) -> str:
+        if execution_id not in self._main_classes:
+            self._main_classes[execution_id] = get_maven_main_class(self.bewte_root, execution_id)
+        return self._main_classes[execution_id]
+
+    def _run_main(self, step: int, execution_id: str, args: List[str], verbose: bool) -> str:
+        if self.use_maven:
+            args = ' '.join(args)
+            commands = [
+                f'cd {self.bewte_root}',
+                f'mvn exec:java@{execution_id} -Dexec.args=\'{args}\''
+            ]
+            command = ' && '.join(commands)
+        else:
+            command = ['java', '-cp', self._get_classpath(), self._get_main_class(execution_id)] + args
+
+        logger.info(f'Running BEwTE step {step} command: "{command}"')
+        redirect = None if verbose else PIPE
+        process = Popen(command, stdout=redirect, stderr=redirect, shell=self.use_maven,
+                        cwd=None if self.use_maven else self.bewte_root)
+        stdout, _ = process.communicate()
+        return stdout.decode() if stdout is not None else ''
 
     def _run_step1(self, temp_dir: str) -> None:
-        args = ' '.join([
+        args = [
             '-corpusreader',
             'tratz.runpipe.impl.corpusreader.DirectoryCorpusReader',
             f'InputDirectories={temp_dir}/summaries',
@@ -80,21 +117,11 @@ class BEwTE(ReferenceBasedMetric):
             '-endpoint',
             'tratz.runpipe.impl.endpoints.GzippedDocumentWriter',
             f'OutputDir={temp_dir}/eval/temp/parsed'
-        ])
-
-        commands = [
-            f'cd {self.bewte_root}',
-            f'mvn exec:java@RunPipe -Dexec.args=\'{args}\''
         ]
-        command = ' && '.join(commands)
-
-        logger.info(f'Running BEwTE step 1 command: "{command}"')
-        redirect = None if self.verbose else PIPE
-        process = Popen(command, stdout=redirect, stderr=redirect, shell=True)
-        process.communicate()
+        self._run_main(1, 'RunPipe', args, self.verbose)
 
     def _run_step2(self, temp_dir: str) -> None:
-        args = ' '.join([
+        args = [
             '-corpusreader',
             'tratz.runpipe.impl.corpusreader.GzippedCorpusReader',
             f'InputDirectories={temp_dir}/eval/temp/parsed',
@@ -116,21 +143,11 @@ class BEwTE(ReferenceBasedMetric):
             '-endpoint',
             'bewte.beextraction.BasicElementExtractor',
             f'OutputDir={temp_dir}/eval/temp/BEs'
-        ])
-
-        commands = [
-            f'cd {self.bewte_root}',
-            f'mvn exec:java@RunPipe -Dexec.args=\'{args}\''
         ]
-        command = ' && '.join(commands)
-
-        logger.info(f'Running BEwTE step 2 command: "{command}"')
-        redirect = None if self.verbose else PIPE
-        process = Popen(command, stdout=redirect, stderr=redirect, shell=True)
-        process.communicate()
+        self._run_main(2, 'RunPipe', args, self.verbose)
 
     def _run_step3(self, temp_dir: str) -> None:
-        args = ' '.join([
+        args = [
             f'{temp_dir}/eval/temp/BEs',
             f'{temp_dir}/eval/temp/BEXs',
             self.wordnet_dir,
@@ -139,21 +156,11 @@ class BEwTE(ReferenceBasedMetric):
             '.*[A-Z_\\-]+',
             self.transforms_file,
             'bewte.names.DUCStyleNameExtractor'
-        ])
-
-        commands = [
-            f'cd {self.bewte_root}',
-            f'mvn exec:java@BEXpander -Dexec.args=\'{args}\''
         ]
-        command = ' && '.join(commands)
-
-        logger.info(f'Running BEwTE step 3 command: "{command}"')
-        redirect = None if self.verbose else PIPE
-        process = Popen(command, stdout=redirect, stderr=redirect, shell=True)
-        process.communicate()
+        self._run_main(3, 'BEXpander', args, self.verbose)
 
-    def _run_step4(self, temp_dir: str) -> None:
-        args = ' '.join([
+    def _run_step4(self, temp_dir: str) -> str:
+        args = [
             f'{temp_dir}/eval/temp/BEXs',
             f'{temp_dir}/systemLevelOutput.txt',
             f'{temp_dir}/summaryLevelOutput.txt',
@@ -166,18 +173,8 @@ class BEwTE(ReferenceBasedMetric):
             self.end_analysis_file,
             'bewte.names.DUCStyleNameExtractor',
             '.*'
-        ])
-
-        commands = [
-            f'cd {self.bewte_root}',
-            f'mvn exec:java@BEwT_E -Dexec.args=\'{args}\''
         ]
-        command = ' && '.join(commands)
-
-        logger.info(f'Running BEwTE step 4 command: "{command}"')
-        process = Popen(command, stdout=PIPE, stderr=PIPE, shell=True)
-        stdout, _ = process.communicate()
-        return stdout.decode()
+        return self._run_main(4, 'BEwT_E', args, False)
 
     def _get_topic_and_system(self, line: str) -> Tuple[int, str]:
         last_slash = line.rfind('/')
@@ -235,9 +232,9 @@ class BEwTE(ReferenceBasedMetric):
     def score_multi_all(self,
                         summaries_list: List[List[SummaryType]],
                         references_list: List[List[ReferenceType]]) -> List[List[MetricsDict]]:
-        with TemporaryDirectory() as temp_dir:
-            self._save_summaries(temp_dir, summaries_list, references_list)
-
+        with StagingDirectory('bewte') as staging:
+            temp_dir = staging.path
+            self._save_summaries(staging, summaries_list, references_list)
             self._run_step1(temp_dir)
             self._run_step2(temp_dir)
             self._run_step3(temp_dir)
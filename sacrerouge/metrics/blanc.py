@@ -26,6 +26,8 @@ else:
 
     @Metric.register('blanc')
     class Blanc(DocumentBasedMetric):
+        resource_hints = ['gpu']
+
         def __init__(self,
                      blanc_type: str = 'blanc_help',
                      device: str = 'cuda',
@@ -6,7 +6,7 @@ from subprocess import Popen, PIPE
 from typing import List
 
 from sacrerouge.commands import MetricSetupSubcommand
-from sacrerouge.common import DATA_ROOT, TemporaryDirectory
+from sacrerouge.common import DATA_ROOT, StagingDirectory
 from sacrerouge.data import MetricsDict
 from sacrerouge.data.types import ReferenceType, SummaryType
 from sacrerouge.metrics import Metric, ReferenceBasedMetric
@@ -16,6 +16,8 @@ logger = logging.getLogger(__name__)
 
 @Metric.register('bleurt')
 class Bleurt(ReferenceBasedMetric):
+    resource_hints = ['gpu']
+
     def __init__(self,
                  environment_name: str = None,
                  checkpoint: str = 'bleurt-base-128',
@@ -57,28 +59,28 @@ class Bleurt(ReferenceBasedMetric):
     def score_multi_all(self,
                         summaries_list: List[List[SummaryType]],
                         references_list: List[List[ReferenceType]]) -> List[List[MetricsDict]]:
-        with TemporaryDirectory() as temp_dir:
+        with StagingDirectory('bleurt') as staging:
             # Save the summaries to a file. Each file has one summary per line.
             # For multiple references, each reference is used to evaluate the same
             # summary independently, so the system summary is repeated.
-            candidate_file = f'{temp_dir}/candidates.txt'
-            reference_file = f'{temp_dir}/references.txt'
-            score_file = f'{temp_dir}/scores.txt'
-
-            with open(candidate_file, 'w') as out_candidates:
-                with open(reference_file, 'w') as out_references:
-                    for summaries, references in zip(summaries_list, references_list):
-                        for summary in summaries:
-                            for reference in references:
-                                if isinstance(summary, list):
-                                    out_candidates.write(' '.join(summary) + '\n')
-                                else:
-                                    out_candidates.write(summary + '\n')
-
-                                if isinstance(reference, list):
-                                    out_references.write(' '.join(reference) + '\n')
-                                else:
-                                    out_references.write(reference + '\n')
+            score_file = f'{staging.path}/scores.txt'
+
+            candidate_lines, reference_lines = [], []
+            for summaries, references in zip(summaries_list, references_list):
+                for summary in summaries:
+                    for reference in references:
+                        if isinstance(summary, list):
+                            candidate_lines.append(' '.join(summary) + '\n')
+                        else:
+                            candidate_lines.append(summary + '\n')
+
+                        if isinstance(reference, list):
+                            reference_lines.append(' '.join(reference) + '\n')
+                        else:
+                            reference_lines.append(reference + '\n')
+            candidate_file = staging.add_file('candidates.txt', ''.join(candidate_lines))
+            reference_file = staging.add_file('references.txt', ''.join(reference_lines))
+            staging.flush()
 
             # Run through BLEURT
             commands = [f'cd {self.bleurt_root}']
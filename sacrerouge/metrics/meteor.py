@@ -1,13 +1,14 @@
 import argparse
 import logging
 import os
+import threading
 from collections import defaultdict
 from overrides import overrides
-from subprocess import Popen, PIPE
+from subprocess import Popen, PIPE, TimeoutExpired
 from typing import List, Dict, Tuple
 
 from sacrerouge.commands import MetricSetupSubcommand
-from sacrerouge.common import DATA_ROOT, TemporaryDirectory
+from sacrerouge.common import DATA_ROOT, StagingDirectory
 from sacrerouge.data import MetricsDict
 from sacrerouge.data.types import ReferenceType, SummaryType
 from sacrerouge.metrics import Metric, ReferenceBasedMetric
@@ -15,13 +16,104 @@ from sacrerouge.metrics import Metric, ReferenceBasedMetric
 logger = logging.getLogger(__name__)
 
 
+class _MeteorWorker(object):
+    """
+    A METEOR process which is run in its "-stdio" mode, so the JVM is started and the paraphrase tables are
+    loaded only once. A "SCORE ||| reference ||| hypothesis" request returns the sufficient statistics for
+    the pair, and an "EVAL ||| statistics ||| ..." request returns the score of every set of statistics
+    followed by the score of their aggregate, the same as the segment and final scores of the file-based mode.
+    """
+    def __init__(self, meteor_jar: str) -> None:
+        command = ['java', '-jar', meteor_jar, '-', '-', '-stdio', '-l', 'en', '-norm']
+        logger.info(f'Starting a METEOR worker: "{command}"')
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.process = Popen(command, stdin=PIPE, stdout=PIPE)
+
+    @staticmethod
+    def _clean(text: str) -> str:
+        # The fields of a request are separated by "|||" and the requests by newlines
+        return text.replace('|||', '').replace('\n', ' ')
+
+    def _write_lines(self, lines: List[str]) -> None:
+        for line in lines:
+            self.process.stdin.write((line + '\n').encode('utf-8'))
+        self.process.stdin.flush()
+
+    def _readline(self) -> str:
+        line = self.process.stdout.readline()
+        if len(line) == 0:
+            raise Exception(f'The METEOR worker exited unexpectedly')
+        return line.decode('utf-8').strip()
+
+    def score(self, hypotheses: List[str], references: List[str]) -> Tuple[float, List[float]]:
+        """
+        Scores every hypothesis against the corresponding reference and returns the final score
+        and the segment scores.
+        """
+        score_lines = [f'SCORE ||| {self._clean(reference)} ||| {self._clean(hypothesis)}'
+                       for hypothesis, reference in zip(hypotheses, references)]
+        with self.lock:
+            # All of the requests are written by a separate thread so neither process blocks on a full pipe
+            # while the other one is waiting for it
+            writer = threading.Thread(target=self._write_lines, args=(score_lines,))
+            writer.start()
+            stats = [self._readline() for _ in score_lines]
+            writer.join()
+
+            self._write_lines([' ||| '.join(['EVAL'] + stats)])
+            individual_scores = [float(self._readline()) for _ in stats]
+            final_score = float(self._readline())
+        return final_score, individual_scores
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def close(self) -> None:
+        # METEOR exits once its input is closed
+        self.process.stdin.close()
+        try:
+            self.process.wait(timeout=10)
+        except TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
 @Metric.register('meteor')
 class Meteor(ReferenceBasedMetric):
-    def __init__(self, meteor_root: str = f'{DATA_ROOT}/metrics/METEOR'):
+    execution_parameters = ['use_persistent_worker']
+
+    def __init__(self,
+                 meteor_root: str = f'{DATA_ROOT}/metrics/METEOR',
+                 use_persistent_worker: bool = False):
+        """
+        Args:
+            use_persistent_worker: If true, the pairs are scored by a METEOR process which is started once
+                by this instance and kept alive until `close` is called instead of starting Java on every call
+        """
         super().__init__()
         self.meteor_root = meteor_root
+        self.use_persistent_worker = use_persistent_worker
         if not os.path.exists(meteor_root):
             raise Exception(f'Path "{meteor_root}" does not exist. Have you setup METEOR?')
+        self._worker = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_worker'] = None
+        return state
+
+    def _get_worker(self) -> _MeteorWorker:
+        # A worker which was inherited from the parent of a forked process cannot be used since the
+        # parent is also writing to it
+        if self._worker is None or self._worker.pid != os.getpid() or not self._worker.is_alive():
+            self._worker = _MeteorWorker(f'{self.meteor_root}/meteor-1.5/meteor-1.5.jar')
+        return self._worker
+
+    def close(self) -> None:
+        if self._worker is not None and self._worker.pid == os.getpid():
+            self._worker.close()
+        self._worker = None
 
     def _flatten_summaries(self, summaries_list: List[List[SummaryType]]) -> List[List[str]]:
         flattened_list = []
@@ -65,29 +157,11 @@ class Meteor(ReferenceBasedMetric):
                 }))
         return metrics_lists
 
-    def _run(self,
-             summaries_list: List[List[SummaryType]],
-             references_list: List[List[SummaryType]]) -> Tuple[MetricsDict, List[List[MetricsDict]]]:
-        summaries_list = self._flatten_summaries(summaries_list)
-        references_list = self._flatten_summaries(references_list)
-
-        with TemporaryDirectory() as temp_dir:
-            # As far as I can tell, the input only allows for one reference
-            # per input, so we need to write an instance for every pair and then
-            # aggregate the output
-            summaries_file = f'{temp_dir}/summaries.txt'
-            references_file = f'{temp_dir}/references.txt'
-            index = 0
-            tuple_to_indices = defaultdict(list)
-            with open(summaries_file, 'w') as out_summaries:
-                with open(references_file, 'w') as out_references:
-                    for i, (summaries, references) in enumerate(zip(summaries_list, references_list)):
-                        for j, summary in enumerate(summaries):
-                            for reference in references:
-                                out_summaries.write(summary + '\n')
-                                out_references.write(reference + '\n')
-                                tuple_to_indices[(i, j)].append(index)
-                                index += 1
+    def _run_files(self, hypotheses: List[str], references: List[str]) -> Tuple[float, List[float]]:
+        with StagingDirectory('meteor') as staging:
+            summaries_file = staging.add_file('summaries.txt', ''.join(hypothesis + '\n' for hypothesis in hypotheses))
+            references_file = staging.add_file('references.txt', ''.join(reference + '\n' for reference in references))
+            staging.flush()
 
             # Run meteor
             command = [
@@ -100,12 +174,36 @@ class Meteor(ReferenceBasedMetric):
             logger.info(f'Running METEOR command: "{command}"')
             process = Popen(command, stdout=PIPE, stderr=PIPE)
             stdout, _ = process.communicate()
+            return self._parse_meteor_stdout(stdout.decode())
 
-            final_score, individual_scores = self._parse_meteor_stdout(stdout.decode())
+    def _run(self,
+             summaries_list: List[List[SummaryType]],
+             references_list: List[List[SummaryType]]) -> Tuple[MetricsDict, List[List[MetricsDict]]]:
+        summaries_list = self._flatten_summaries(summaries_list)
+        references_list = self._flatten_summaries(references_list)
 
-            macro_metrics = MetricsDict({'METEOR': final_score})
-            micro_metrics_list = self._aggregate_summary_scores(summaries_list, references_list, tuple_to_indices, individual_scores)
-            return macro_metrics, micro_metrics_list
+        # As far as I can tell, the input only allows for one reference
+        # per input, so we need to write an instance for every pair and then
+        # aggregate the output
+        index = 0
+        tuple_to_indices = defaultdict(list)
+        hypotheses, references = [], []
+        for i, (summaries, summary_references) in enumerate(zip(summaries_list, references_list)):
+            for j, summary in enumerate(summaries):
+                for reference in summary_references:
+                    hypotheses.append(summary)
+                    references.append(reference)
+                    tuple_to_indices[(i, j)].append(index)
+                    index += 1
+
+        if self.use_persistent_worker:
+            final_score, individual_scores = self._get_worker().score(hypotheses, references)
+        else:
+            final_score, individual_scores = self._run_files(hypotheses, references)
+
+        macro_metrics = MetricsDict({'METEOR': final_score})
+        micro_metrics_list = self._aggregate_summary_scores(summaries_list, references_list, tuple_to_indices, individual_scores)
+        return macro_metrics, micro_metrics_list
 
     def score_multi_all(self,
                         summaries_list: List[List[SummaryType]],
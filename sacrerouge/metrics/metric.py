@@ -7,6 +7,19 @@ from sacrerouge.data.types import DocumentType, ReferenceType, SummaryType
 
 
 class Metric(Registrable):
+    # The shared resources the metric needs exclusive access to, e.g. "gpu". When several metrics are scored in
+    # parallel, metrics with a resource in common are never run at the same time
+    resource_hints: List[str] = []
+    # The constructor parameters which only change how the scores are calculated (e.g., the number of processes)
+    # and not the scores themselves. They are not part of the metric's fingerprint (see `get_metric_fingerprint`)
+    execution_parameters: List[str] = []
+
+    def __new__(cls, *args, **kwargs):
+        # Saves the constructor arguments, which identify the metric's configuration
+        metric = super().__new__(cls)
+        metric._constructor_args = (args, kwargs)
+        return metric
+
     def __init__(self,
                  required_summary_fields: List[str],
                  required_context_fields: List[str],
@@ -36,6 +49,28 @@ class Metric(Registrable):
     def requires_jackknifing(self) -> bool:
         return self.jackknifer is not None
 
+    def supports_reference_statistics(self) -> bool:
+        """
+        Returns True if the metric's score against a set of references can be calculated from statistics which
+        are computed against each reference independently. These metrics implement
+        `score_reference_statistics_multi_all` and `combine_reference_statistics`, which allows jackknifing to
+        score every summary against each reference once instead of once per leave-one-out subset.
+        """
+        return False
+
+    def score_reference_statistics_multi_all(self, *args: List[Any], **kwargs) -> List[List[List[Any]]]:
+        """
+        Takes the same arguments as `score_multi_all` and returns the statistics for every summary against each
+        of the references in its context (indexed by context, summary, then reference).
+        """
+        raise NotImplementedError
+
+    def combine_reference_statistics(self, statistics_list: List[Any]) -> MetricsDict:
+        """
+        Calculates the metric for a summary from its statistics against a subset of its references.
+        """
+        raise NotImplementedError
+
 
 class SummaryBasedMetric(Metric):
     """
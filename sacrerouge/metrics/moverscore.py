@@ -21,6 +21,8 @@ try:
 
     @Metric.register('moverscore')
     class MoverScore(ReferenceBasedMetric):
+        resource_hints = ['gpu']
+
         def __init__(self, moverscore_root: str = f'{DATA_ROOT}/metrics/MoverScore'):
             super().__init__()
             if not os.path.exists(moverscore_root):
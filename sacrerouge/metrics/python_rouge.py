@@ -1,10 +1,12 @@
 import argparse
+import numpy as np
 import os
 import re
 from collections import Counter
+from functools import lru_cache
 from nltk.stem import PorterStemmer
 from overrides import overrides
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
 
 from sacrerouge.commands import MetricSetupSubcommand
 from sacrerouge.common import DATA_ROOT
@@ -13,6 +15,74 @@ from sacrerouge.data.types import ReferenceType, SummaryType
 from sacrerouge.metrics import Metric, ReferenceBasedMetric
 
 
+_STEMMER = PorterStemmer(PorterStemmer.ORIGINAL_ALGORITHM)
+_NON_ALPHANUMERIC_REGEX = re.compile('[^A-Za-z0-9]')
+
+# The maximum number of stems which are cached for all of the `PythonRouge` instances in this process
+_STEM_CACHE_SIZE = 2 ** 18
+
+# Bounded caches of `_tokenize_sentence`, keyed by their maximum size. They are shared by all of the `PythonRouge`
+# instances in this process with the same `tokenization_cache_size`
+_TOKENIZATION_CACHES: Dict[int, Callable[[str, str, bool, bool], Tuple[str, ...]]] = {}
+
+
+@lru_cache(maxsize=None)
+def _load_stemmer_exceptions(root: str) -> Dict[str, str]:
+    exceptions = {}
+    for filename in ['adj.exc', 'adv.exc', 'noun.exc', 'verb.exc']:
+        file_path = os.path.join(root, 'WordNet-2.0-Exceptions', filename)
+        with open(file_path, 'r') as f:
+            for line in f:
+                # I think there is a bug in the original perl script
+                # to construct the exceptions database. Some of the lines
+                # have more than 2 words on them, but the script only
+                # maps the first to the second, ignoring the third.
+                columns = line.strip().split()
+                exceptions[columns[0]] = columns[1]
+    return exceptions
+
+
+@lru_cache(maxsize=None)
+def _load_stopwords(root: str) -> FrozenSet[str]:
+    file_path = os.path.join(root, 'smart_common_words.txt')
+    with open(file_path, 'r') as f:
+        return frozenset(f.read().splitlines())
+
+
+@lru_cache(maxsize=_STEM_CACHE_SIZE)
+def _stem(token: str, rouge_data_dir: str) -> str:
+    exceptions = _load_stemmer_exceptions(rouge_data_dir)
+    if token in exceptions:
+        return exceptions[token]
+    return _STEMMER.stem(token)
+
+
+def _tokenize_sentence(sentence: str,
+                       rouge_data_dir: str,
+                       use_porter_stemmer: bool,
+                       remove_stopwords: bool) -> Tuple[str, ...]:
+    # The tokens are returned as a tuple so that the callers cannot modify the cached values
+    stopwords = _load_stopwords(rouge_data_dir) if remove_stopwords else None
+    sentence = _NON_ALPHANUMERIC_REGEX.sub(' ', sentence)
+    sentence = sentence.lower()
+    tokens = []
+    for token in sentence.split():
+        if remove_stopwords and token in stopwords:
+            continue
+        if use_porter_stemmer and len(token) > 3:
+            tokens.append(_stem(token, rouge_data_dir))
+        else:
+            tokens.append(token)
+    return tuple(tokens)
+
+
+def _get_tokenization_cache(size: int) -> Callable[[str, str, bool, bool], Tuple[str, ...]]:
+    tokenize = _TOKENIZATION_CACHES.get(size)
+    if tokenize is None:
+        tokenize = _TOKENIZATION_CACHES.setdefault(size, lru_cache(maxsize=size)(_tokenize_sentence))
+    return tokenize
+
+
 def shorten_summary(summary: SummaryType,
                     max_sentences: Optional[int] = None,
                     max_words: Optional[int] = None,
@@ -50,9 +120,125 @@ def shorten_summary(summary: SummaryType,
     return shortened_summary
 
 
+def _encode_tokens(texts: List[List[List[str]]]) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Interns the tokens of the tokenized texts into integer ids. Returns the ids of all of the texts concatenated
+    together, the number of tokens in each text, and the size of the vocabulary.
+    """
+    vocab = {}
+    ids = []
+    lengths = []
+    for text in texts:
+        tokens = [token for sentence in text for token in sentence]
+        ids.extend([vocab.setdefault(token, len(vocab)) for token in tokens])
+        lengths.append(len(tokens))
+    return np.array(ids, dtype=np.int64), np.array(lengths, dtype=np.int64), len(vocab)
+
+
+def _count_intersections(text_indices: np.ndarray,
+                         codes: np.ndarray,
+                         num_summaries: int,
+                         num_references: int) -> np.ndarray:
+    """
+    Calculates the clipped intersections between the items of every summary and every reference, where
+    `codes` are the non-negative integer codes of the items and `text_indices` are the indices of the texts
+    which contain them (the summaries first). Returns a (number of summaries) x (number of references) matrix.
+    """
+    intersections = np.zeros((num_summaries, num_references), dtype=np.int64)
+    if len(codes) == 0:
+        return intersections
+
+    num_codes = int(codes.max()) + 1
+    keys = text_indices * num_codes + codes
+    keys, counts = np.unique(keys, return_counts=True)
+    entry_texts, entry_codes = keys // num_codes, keys % num_codes
+
+    is_summary = entry_texts < num_summaries
+    reference_counts = np.zeros((num_references, num_codes), dtype=np.int64)
+    reference_counts[entry_texts[~is_summary] - num_summaries, entry_codes[~is_summary]] = counts[~is_summary]
+
+    summary_texts = entry_texts[is_summary]
+    clipped = np.minimum(counts[is_summary][None, :], reference_counts[:, entry_codes[is_summary]])
+    for j in range(num_references):
+        intersections[:, j] = np.bincount(summary_texts, weights=clipped[j], minlength=num_summaries)
+    return intersections
+
+
+def _count_ngram_intersections(texts: List[List[List[str]]],
+                               num_summaries: int,
+                               ngram_orders: List[int]) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Calculates the clipped n-gram intersections between every summary (the first `num_summaries` texts) and
+    every reference (the rest of the texts) for each n-gram order. The n-grams are represented by integer codes:
+    the code of an n-gram is derived from the code of its (n-1)-gram prefix and its last token id, and then
+    the codes are compacted back into a small range so they never overflow.
+
+    Returns a dictionary from the n-gram order to the number of n-grams in each text and a
+    (number of summaries) x (number of references) matrix of intersection counts.
+    """
+    ids, lengths, vocab_size = _encode_tokens(texts)
+    num_texts = len(texts)
+    num_references = num_texts - num_summaries
+    text_indices = np.repeat(np.arange(num_texts), lengths)
+
+    results = {}
+    codes = ids
+    for n in range(1, max(ngram_orders) + 1):
+        if n > 1:
+            # Extend the (n-1)-gram codes by the next token and compact them
+            pairs = codes[:-1] * vocab_size + ids[n - 1:]
+            codes = np.unique(pairs, return_inverse=True)[1].reshape(-1) if len(pairs) > 0 else pairs
+        if n not in ngram_orders:
+            continue
+
+        num_ngrams = np.maximum(lengths - n + 1, 0)
+        # Only the n-grams which do not cross the boundary between two texts are counted
+        valid = text_indices[:len(codes)] == text_indices[n - 1:]
+        intersections = _count_intersections(text_indices[:len(codes)][valid], codes[valid], num_summaries, num_references)
+        results[n] = (num_ngrams, intersections)
+    return results
+
+
+def _count_skip_bigram_intersections(texts: List[List[List[str]]],
+                                     num_summaries: int,
+                                     gap_length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates the clipped skip-bigram with unigram (ROUGE-SU) intersections between every summary (the first
+    `num_summaries` texts) and every reference like the Perl script with the "-2 `gap_length` -u" options.
+    A skip bigram is any pair of tokens with at most `gap_length` tokens between them (any pair if it is
+    negative). Like the Perl script, the unigram of the last token in each text is not counted.
+
+    Returns the number of skip bigrams and unigrams in each text and a (number of summaries) x
+    (number of references) matrix of intersection counts.
+    """
+    ids, lengths, vocab_size = _encode_tokens(texts)
+    num_texts = len(texts)
+    text_indices = np.repeat(np.arange(num_texts), lengths)
+
+    # The unigrams have the codes [0, vocab_size) and the skip bigrams start at vocab_size
+    max_distance = int(lengths.max()) - 1 if len(lengths) > 0 else 0
+    if gap_length >= 0:
+        max_distance = min(max_distance, gap_length + 1)
+    unigram_valid = text_indices[:-1] == text_indices[1:]
+    all_text_indices = [text_indices[:-1][unigram_valid]]
+    all_codes = [ids[:-1][unigram_valid]]
+    for distance in range(1, max_distance + 1):
+        valid = text_indices[:-distance] == text_indices[distance:]
+        all_text_indices.append(text_indices[:-distance][valid])
+        all_codes.append(vocab_size + ids[:-distance][valid] * vocab_size + ids[distance:][valid])
+
+    all_text_indices = np.concatenate(all_text_indices)
+    codes = np.concatenate(all_codes)
+    codes = np.unique(codes, return_inverse=True)[1].reshape(-1) if len(codes) > 0 else codes
+    num_skip_bigrams = np.bincount(all_text_indices, minlength=num_texts)
+    intersections = _count_intersections(all_text_indices, codes, num_summaries, num_texts - num_summaries)
+    return num_skip_bigrams, intersections
+
+
 @Metric.register('python-rouge')
 class PythonRouge(ReferenceBasedMetric):
-    _non_alphanumeric_regex = re.compile('[^A-Za-z0-9]')
+    _non_alphanumeric_regex = _NON_ALPHANUMERIC_REGEX
+    execution_parameters = ['tokenization_cache_size']
 
     def __init__(self,
                  ngram_orders: List[int] = [1, 2],
@@ -62,7 +248,18 @@ class PythonRouge(ReferenceBasedMetric):
                  use_porter_stemmer: bool = True,
                  remove_stopwords: bool = False,
                  compute_rouge_l: bool = False,
+                 skip_bigram_gap_length: Optional[int] = None,
+                 wlcs_weight: Optional[float] = None,
+                 tokenization_cache_size: int = 100000,
                  rouge_data_dir: str = f'{DATA_ROOT}/metrics/ROUGE-1.5.5/data'):
+        """
+        Args:
+            skip_bigram_gap_length: If set, ROUGE-SU is calculated with this maximum gap between the tokens of
+                a skip bigram (any gap if negative), like the Perl script's "-2 gap -u" options
+            wlcs_weight: If set, ROUGE-W is calculated with this weight, like the Perl script's "-w" option
+            tokenization_cache_size: The maximum number of tokenized sentences which are cached. The cache is
+                shared by all of the instances with the same preprocessing parameters. 0 disables the cache
+        """
         super().__init__()
         self.ngram_orders = ngram_orders
         self.max_sentences = max_sentences
@@ -71,48 +268,25 @@ class PythonRouge(ReferenceBasedMetric):
         self.use_porter_stemmer = use_porter_stemmer
         self.remove_stopwords = remove_stopwords
         self.compute_rouge_l = compute_rouge_l
+        self.skip_bigram_gap_length = skip_bigram_gap_length
+        self.wlcs_weight = wlcs_weight
+        self._tokenization_cache_size = tokenization_cache_size
+        rouge_data_dir = os.path.abspath(rouge_data_dir)
+        self._rouge_data_dir = rouge_data_dir
 
         if not os.path.exists(rouge_data_dir):
             raise Exception(f'Path "{rouge_data_dir}" does not exist. PythonRouge requires data files from ROUGE. '
                             f'Have you setup ROUGE?')
 
-        self.stemmer = PorterStemmer(PorterStemmer.ORIGINAL_ALGORITHM)
-        self.stemmer_exceptions = self._load_stemmer_exceptions(rouge_data_dir)
-        self.stopwords = self._load_stopwords(rouge_data_dir)
-
-    def _load_stemmer_exceptions(self, root: str) -> Dict[str, str]:
-        exceptions = {}
-        for filename in ['adj.exc', 'adv.exc', 'noun.exc', 'verb.exc']:
-            file_path = os.path.join(root, 'WordNet-2.0-Exceptions', filename)
-            with open(file_path, 'r') as f:
-                for line in f:
-                    # I think there is a bug in the original perl script
-                    # to construct the exceptions database. Some of the lines
-                    # have more than 2 words on them, but the script only
-                    # maps the first to the second, ignoring the third.
-                    columns = line.strip().split()
-                    exceptions[columns[0]] = columns[1]
-        return exceptions
-
-    def _load_stopwords(self, root: str) -> Set[str]:
-        file_path = os.path.join(root, 'smart_common_words.txt')
-        return set(open(file_path, 'r').read().splitlines())
+        self.stemmer = _STEMMER
+        self.stemmer_exceptions = _load_stemmer_exceptions(rouge_data_dir)
+        self.stopwords = _load_stopwords(rouge_data_dir)
 
     def normalize_and_tokenize_sentence(self, sentence: str) -> List[str]:
-        sentence = PythonRouge._non_alphanumeric_regex.sub(' ', sentence)
-        sentence = sentence.lower()
-        tokens = []
-        for token in sentence.split():
-            if self.remove_stopwords and token in self.stopwords:
-                continue
-            if self.use_porter_stemmer and len(token) > 3:
-                if token in self.stemmer_exceptions:
-                    tokens.append(self.stemmer_exceptions[token])
-                else:
-                    tokens.append(self.stemmer.stem(token))
-            else:
-                tokens.append(token)
-        return tokens
+        args = (sentence, self._rouge_data_dir, self.use_porter_stemmer, self.remove_stopwords)
+        if self._tokenization_cache_size == 0:
+            return list(_tokenize_sentence(*args))
+        return list(_get_tokenization_cache(self._tokenization_cache_size)(*args))
 
     def _normalize_and_tokenize_summary(self, summary: List[str]) -> List[str]:
         return [self.normalize_and_tokenize_sentence(sentence) for sentence in summary]
@@ -153,38 +327,94 @@ class PythonRouge(ReferenceBasedMetric):
             f1 = 2 * (precision * recall) / (precision + recall)
         return precision, recall, f1
 
-    def _longest_common_substring(self,
-                                  tokens1: List[str],
-                                  tokens2: List[str],
-                                  hit_mask: List[int]) -> int:
+    @staticmethod
+    def _get_match_masks(tokens: List[str]) -> Dict[str, int]:
+        # Maps each token to a bitmask of the positions where it appears in `tokens`
+        masks = {}
+        for j, token in enumerate(tokens):
+            masks[token] = masks.get(token, 0) | (1 << j)
+        return masks
+
+    def _bit_parallel_lcs(self,
+                          tokens1: List[str],
+                          tokens2: List[str],
+                          match_masks: Dict[str, int],
+                          hit_mask: List[int]) -> None:
+        """
+        Marks the tokens of `tokens1` which are part of the LCS with `tokens2` in `hit_mask`, exactly like
+        the original dynamic programming LCS (kept as `longest_common_substring` in
+        "sacrerouge/scripts/benchmark_python_rouge.py"), with a bit-parallel LCS (Crochemore et al., 2001). Each row of the
+        dynamic programming table is encoded as the bits of one integer where a 0 bit in position j marks
+        that the LCS length increases at column j, so the table only needs one integer per row and the LCS
+        lengths needed by the backtracking are recovered by counting the bits. `match_masks` must be the
+        output of `_get_match_masks(tokens2)`.
+        """
         m, n = len(tokens1), len(tokens2)
-        counter = [[0] * (n + 1) for x in range(m + 1)]
-        pointers = [[None] * (n + 1) for x in range(m + 1)]
-        for i in range(1, m + 1):
-            for j in range(1, n + 1):
-                if tokens1[i - 1] == tokens2[j - 1]:
-                    counter[i][j] = counter[i - 1][j - 1] + 1
-                    pointers[i][j] = '\\'
-                elif counter[i - 1][j] >= counter[i][j - 1]:
-                    counter[i][j] = counter[i - 1][j]
-                    pointers[i][j] = '^'
-                else:
-                    counter[i][j] = counter[i][j - 1]
-                    pointers[i][j] = '<'
-
-        # Mark the hit_mask
+        if m == 0 or n == 0 or not any(token in match_masks for token in tokens1):
+            return
+
+        full = (1 << n) - 1
+        rows = [full]
+        row = full
+        for token in tokens1:
+            matches = row & match_masks.get(token, 0)
+            row = ((row + matches) | (row - matches)) & full
+            rows.append(row)
+
+        # Follow the same path as the backtracking of the dynamic programming LCS, which needs
+        # the LCS lengths of the prefixes, i.e., the number of 0 bits before column j in row i
         i, j = m, n
         while i != 0 and j != 0:
-            if pointers[i][j] == '\\':
+            if tokens1[i - 1] == tokens2[j - 1]:
                 i -= 1
                 j -= 1
                 hit_mask[i] = 1
-            elif pointers[i][j] == '^':
-                i -= 1
-            elif pointers[i][j] == '<':
-                j -= 1
             else:
-                raise Exception(f'Unknown pointer: {pointers[i][j]}')
+                up = j - bin(rows[i - 1] & ((1 << j) - 1)).count('1')
+                left = j - 1 - bin(rows[i] & ((1 << (j - 1)) - 1)).count('1')
+                if up >= left:
+                    i -= 1
+                else:
+                    j -= 1
+
+    def _calculate_rouge_l_hits(self,
+                                reference: SummaryType,
+                                summary: SummaryType,
+                                model_unigrams: Counter) -> Tuple[int, int]:
+        # Calculates the number of LCS hits and the number of reference tokens for one reference
+        temp_model_unigrams = Counter(model_unigrams)
+        gold_unigrams = self._count_ngrams(reference, 1)
+        match_masks_list = [self._get_match_masks(model_sentence) for model_sentence in summary]
+        hit, base = 0, 0
+        for ref_sentence in reference:
+            hit_mask = [0] * len(ref_sentence)
+            base += len(ref_sentence)
+            for model_sentence, match_masks in zip(summary, match_masks_list):
+                self._bit_parallel_lcs(ref_sentence, model_sentence, match_masks, hit_mask)
+
+            for i, token in enumerate(ref_sentence):
+                if hit_mask[i] == 1:
+                    try:
+                        if temp_model_unigrams[token] > 0 and gold_unigrams[token] > 0:
+                            hit += 1
+                            temp_model_unigrams[token] -= 1
+                            gold_unigrams[token] -= 1
+                    except KeyError:
+                        pass
+        return hit, base
+
+    def _calculate_rouge_l_pr_f1(self, total_hit: int, total_base: int, total_model: int) -> Tuple[float, float, float]:
+        precision = 0.0
+        if total_model != 0.0:
+            precision = total_hit / total_model * 100
+        recall = 0.0
+        if total_base != 0.0:
+            recall = total_hit / total_base * 100
+        if (precision + recall) != 0.0:
+            f1 = 2 * (precision * recall) / (precision + recall)
+        else:
+            f1 = 0.0
+        return precision, recall, f1
 
     def _calculate_rouge_l(self,
                            references: List[SummaryType],
@@ -199,83 +429,205 @@ class PythonRouge(ReferenceBasedMetric):
         total_hit = 0
         total_base = 0
         for reference in references:
-            temp_model_unigrams = Counter(model_unigrams)
-            gold_unigrams = self._count_ngrams(reference, 1)
-            hit, base = 0, 0
-            for ref_sentence in reference:
-                hit_mask = [0] * len(ref_sentence)
-                base += len(ref_sentence)
-                for model_sentence in summary:
-                    self._longest_common_substring(ref_sentence, model_sentence, hit_mask)
-
-                for i, token in enumerate(ref_sentence):
-                    if hit_mask[i] == 1:
-                        try:
-                            if temp_model_unigrams[token] > 0 and gold_unigrams[token] > 0:
-                                hit += 1
-                                temp_model_unigrams[token] -= 1
-                                gold_unigrams[token] -= 1
-                        except KeyError:
-                            pass
+            hit, base = self._calculate_rouge_l_hits(reference, summary, model_unigrams)
             total_hit += hit
             total_base += base
+        return self._calculate_rouge_l_pr_f1(total_hit, total_base, num_model_unigrams * len(references))
+
+    def _weighted_lcs(self, tokens1: List[str], tokens2: List[str], hit_mask: List[int]) -> None:
+        # Marks the tokens of `tokens1` which are part of the weighted LCS with `tokens2` in `hit_mask`. Consecutive
+        # matches are rewarded by adding (k + 1)^w - k^w for the (k + 1)-th match in a row, like the Perl script
+        m, n = len(tokens1), len(tokens2)
+        if m == 0 or n == 0 or set(tokens1).isdisjoint(tokens2):
+            return
 
+        weight = self.wlcs_weight
+        counter = [[0] * (n + 1) for _ in range(m + 1)]
+        lengths = [[0] * (n + 1) for _ in range(m + 1)]
+        pointers = [[None] * (n + 1) for _ in range(m + 1)]
+        for i in range(1, m + 1):
+            for j in range(1, n + 1):
+                if tokens1[i - 1] == tokens2[j - 1]:
+                    k = lengths[i - 1][j - 1]
+                    counter[i][j] = counter[i - 1][j - 1] + (k + 1) ** weight - k ** weight
+                    lengths[i][j] = k + 1
+                    pointers[i][j] = '\\'
+                elif counter[i - 1][j] >= counter[i][j - 1]:
+                    counter[i][j] = counter[i - 1][j]
+                    pointers[i][j] = '^'
+                else:
+                    counter[i][j] = counter[i][j - 1]
+                    pointers[i][j] = '<'
+
+        i, j = m, n
+        while i != 0 and j != 0:
+            if pointers[i][j] == '\\':
+                i -= 1
+                j -= 1
+                hit_mask[i] = 1
+            elif pointers[i][j] == '^':
+                i -= 1
+            else:
+                j -= 1
+
+    def _calculate_rouge_w_hits(self,
+                                reference: SummaryType,
+                                summary: SummaryType,
+                                model_unigrams: Counter) -> Tuple[float, float]:
+        """
+        Calculates the weighted LCS hits and the weighted number of reference tokens for one reference. Every
+        run of consecutive hits of length k adds k^w to the hits. This replicates the Perl script, including
+        that a run is only ended by a token which is not in the LCS or the end of the sentence, so tokens in
+        the LCS which are skipped because their counts were already used up do not end a run.
+        """
+        weight = self.wlcs_weight
+        temp_model_unigrams = Counter(model_unigrams)
+        gold_unigrams = self._count_ngrams(reference, 1)
+        hit, base = 0, 0
+        for ref_sentence in reference:
+            hit_mask = [0] * len(ref_sentence)
+            base += len(ref_sentence) ** weight
+            for model_sentence in summary:
+                self._weighted_lcs(ref_sentence, model_sentence, hit_mask)
+
+            hit_length = 0
+            for i, token in enumerate(ref_sentence):
+                if hit_mask[i] == 1 and temp_model_unigrams[token] > 0 and gold_unigrams[token] > 0:
+                    hit_length += 1
+                    if i + 1 == len(ref_sentence) or hit_mask[i + 1] == 0:
+                        hit += hit_length ** weight
+                        hit_length = 0
+                    temp_model_unigrams[token] -= 1
+                    gold_unigrams[token] -= 1
+        return hit, base
+
+    def _calculate_rouge_w_pr_f1(self, total_hit: float, total_base: float, total_model: float) -> Tuple[float, float, float]:
         precision = 0.0
-        if (num_model_unigrams * len(references)) != 0.0:
-            precision = total_hit / (num_model_unigrams * len(references)) * 100
+        if total_model != 0.0:
+            precision = (total_hit / total_model) ** (1 / self.wlcs_weight) * 100
         recall = 0.0
         if total_base != 0.0:
-            recall = total_hit / total_base * 100
+            recall = (total_hit / total_base) ** (1 / self.wlcs_weight) * 100
         if (precision + recall) != 0.0:
             f1 = 2 * (precision * recall) / (precision + recall)
         else:
             f1 = 0.0
         return precision, recall, f1
 
-    def score_multi_all(self,
-                        summaries_list: List[List[SummaryType]],
-                        references_list: List[List[ReferenceType]]) -> List[List[MetricsDict]]:
+    @overrides
+    def supports_reference_statistics(self) -> bool:
+        return True
+
+    @overrides
+    def score_reference_statistics_multi_all(self,
+                                             summaries_list: List[List[SummaryType]],
+                                             references_list: List[List[ReferenceType]]) -> List[List[List[Tuple]]]:
+        """
+        Calculates the statistics of every summary against each of its references separately. The statistics
+        for one reference are a tuple of (reference count, summary count, intersection) for every n-gram order
+        plus (hits, reference tokens, summary tokens) for ROUGE-L, the weighted versions of those for ROUGE-W
+        and the skip-bigram counts for ROUGE-SU, all of which can be summed over references.
+        """
         summaries_list = [[self.preprocess_summary(summary) for summary in summaries] for summaries in summaries_list]
         references_list = [[self.preprocess_summary(reference) for reference in references] for references in references_list]
 
-        metrics_lists = []
+        statistics_lists = []
         for summaries, references in zip(summaries_list, references_list):
-            metrics_list = [MetricsDict() for _ in summaries]
-
-            for n in self.ngram_orders:
-                reference_ngrams_list = [self._count_ngrams(reference, n) for reference in references]
-
-                for i, summary in enumerate(summaries):
-                    total_reference_count = 0
-                    total_summary_count = 0
-                    total_intersection = 0
-
-                    summary_ngrams = self._count_ngrams(summary, n)
-                    for reference_ngrams in reference_ngrams_list:
-                        reference_total, summary_total, intersection = self._calculate_intersection(reference_ngrams, summary_ngrams)
-
-                        total_reference_count += reference_total
-                        total_summary_count += summary_total
-                        total_intersection += intersection
-
-                    precision, recall, f1 = self._calculate_pr_f1(total_reference_count, total_summary_count, total_intersection)
-                    metrics_list[i][f'python-rouge-{n}'] = {
-                        'precision': precision,
-                        'recall': recall,
-                        'f1': f1,
-                    }
-
-            if self.compute_rouge_l:
-                for i, summary in enumerate(summaries):
-                    precision, recall, f1 = self._calculate_rouge_l(references, summary)
-                    metrics_list[i]['python-rouge-l'] = {
-                        'precision': precision,
-                        'recall': recall,
-                        'f1': f1
-                    }
-
-            metrics_lists.append(metrics_list)
-        return metrics_lists
+            ngram_counts = {}
+            if len(summaries) > 0 and len(references) > 0 and len(self.ngram_orders) > 0:
+                ngram_counts = _count_ngram_intersections(summaries + references, len(summaries), self.ngram_orders)
+                ngram_counts = {
+                    n: (num_ngrams.tolist(), intersections.tolist())
+                    for n, (num_ngrams, intersections) in ngram_counts.items()
+                }
+            if len(summaries) > 0 and len(references) > 0 and self.skip_bigram_gap_length is not None:
+                num_skip_bigrams, skip_bigram_intersections = _count_skip_bigram_intersections(
+                    summaries + references, len(summaries), self.skip_bigram_gap_length
+                )
+                num_skip_bigrams, skip_bigram_intersections = num_skip_bigrams.tolist(), skip_bigram_intersections.tolist()
+
+            statistics_list = []
+            for i, summary in enumerate(summaries):
+                if self.compute_rouge_l or self.wlcs_weight is not None:
+                    model_unigrams = self._count_ngrams(summary, 1)
+                    num_model_unigrams = sum(count for count in model_unigrams.values())
+
+                summary_statistics = []
+                for j, reference in enumerate(references):
+                    statistics = []
+                    for n in self.ngram_orders:
+                        num_ngrams, intersections = ngram_counts[n]
+                        statistics.append((num_ngrams[len(summaries) + j], num_ngrams[i], intersections[i][j]))
+                    if self.compute_rouge_l:
+                        hit, base = self._calculate_rouge_l_hits(reference, summary, model_unigrams)
+                        statistics.append((hit, base, num_model_unigrams))
+                    if self.wlcs_weight is not None:
+                        # The Perl script weights the weighted reference length a second time
+                        hit, base = self._calculate_rouge_w_hits(reference, summary, model_unigrams)
+                        statistics.append((hit, base ** self.wlcs_weight, num_model_unigrams ** self.wlcs_weight))
+                    if self.skip_bigram_gap_length is not None:
+                        statistics.append((num_skip_bigrams[len(summaries) + j], num_skip_bigrams[i],
+                                           skip_bigram_intersections[i][j]))
+                    summary_statistics.append(tuple(statistics))
+                statistics_list.append(summary_statistics)
+            statistics_lists.append(statistics_list)
+        return statistics_lists
+
+    @overrides
+    def combine_reference_statistics(self, statistics_list: List[Tuple]) -> MetricsDict:
+        num_statistics = len(self.ngram_orders) + (1 if self.compute_rouge_l else 0) + \
+            (1 if self.wlcs_weight is not None else 0) + (1 if self.skip_bigram_gap_length is not None else 0)
+        if len(statistics_list) == 0:
+            totals = [(0, 0, 0)] * num_statistics
+        else:
+            totals = [[sum(values) for values in zip(*counts)] for counts in zip(*statistics_list)]
+        metrics = MetricsDict()
+        for n, (total_reference_count, total_summary_count, total_intersection) in zip(self.ngram_orders, totals):
+            precision, recall, f1 = self._calculate_pr_f1(total_reference_count, total_summary_count, total_intersection)
+            metrics[f'python-rouge-{n}'] = {
+                'precision': precision,
+                'recall': recall,
+                'f1': f1,
+            }
+
+        index = len(self.ngram_orders)
+        if self.compute_rouge_l:
+            precision, recall, f1 = self._calculate_rouge_l_pr_f1(*totals[index])
+            metrics['python-rouge-l'] = {
+                'precision': precision,
+                'recall': recall,
+                'f1': f1
+            }
+            index += 1
+
+        if self.wlcs_weight is not None:
+            precision, recall, f1 = self._calculate_rouge_w_pr_f1(*totals[index])
+            metrics[f'python-rouge-w-{self.wlcs_weight}'] = {
+                'precision': precision,
+                'recall': recall,
+                'f1': f1
+            }
+            index += 1
+
+        if self.skip_bigram_gap_length is not None:
+            total_reference_count, total_summary_count, total_intersection = totals[index]
+            precision, recall, f1 = self._calculate_pr_f1(total_reference_count, total_summary_count, total_intersection)
+            gap_length = self.skip_bigram_gap_length if self.skip_bigram_gap_length >= 0 else '*'
+            metrics[f'python-rouge-su{gap_length}'] = {
+                'precision': precision,
+                'recall': recall,
+                'f1': f1
+            }
+        return metrics
+
+    def score_multi_all(self,
+                        summaries_list: List[List[SummaryType]],
+                        references_list: List[List[ReferenceType]]) -> List[List[MetricsDict]]:
+        statistics_lists = self.score_reference_statistics_multi_all(summaries_list, references_list)
+        return [
+            [self.combine_reference_statistics(statistics) for statistics in statistics_list]
+            for statistics_list in statistics_lists
+        ]
 
 
 @MetricSetupSubcommand.register('python-rouge')
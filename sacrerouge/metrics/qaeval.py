@@ -45,6 +45,8 @@ else:
 
     @Metric.register('qa-eval')
     class QAEval(ReferenceBasedMetric):
+        resource_hints = ['gpu']
+
         def __init__(self,
                      answer_selection_strategy: str = NP_CHUNKS_STRATEGY,
                      generation_model_path: str = f'{DATA_ROOT}/metrics/qaeval/models/generation/model.tar.gz',
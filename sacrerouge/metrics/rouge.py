@@ -2,24 +2,151 @@ import argparse
 import logging
 import os
 import sys
+import threading
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from overrides import overrides
 from subprocess import Popen, PIPE
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from sacrerouge.commands import MetricSetupSubcommand
-from sacrerouge.common import DATA_ROOT, TemporaryDirectory
+from sacrerouge.common import DATA_ROOT, StagingDirectory
 from sacrerouge.common.util import download_file_from_google_drive
 from sacrerouge.data import MetricsDict
 from sacrerouge.data.types import ReferenceType
 from sacrerouge.data.types import SummaryType
 from sacrerouge.metrics import Metric, ReferenceBasedMetric
+from sacrerouge.metrics.sharded_metric import _get_shard_boundaries
 
 logger = logging.getLogger(__name__)
 
+# A Perl program which compiles the ROUGE script (and loads its modules) once and then runs it in a forked
+# child for every request. Once the script is compiled, the worker writes a line with the number of lines that
+# it rewrote (see below). A request is a line with the tab-separated command line arguments, and the response
+# is a "<exit status> <stdout bytes> <stderr bytes>" header line followed by the script's stdout and stderr.
+#
+# This depends on the layout of ROUGE-1.5.5.pl and is not expected to work with other versions of the script:
+#   - The top-level code is compiled as the body of an anonymous function, so the named functions which it
+#     declares are compiled once, and the "use" statements are run once by the worker.
+#   - The file-scoped lexical variables ($usageFull, $usage, $systemID, $parser and $doc) are declared with
+#     "my " at the very start of a line, and no function declares a variable at the start of a line. Those
+#     declarations are rewritten to "our " so the named functions see the same variables as the top-level
+#     code (a named function would not share the lexical variables of the anonymous function). If no line
+#     is rewritten, the script does not have this layout and `_RougeWorker` raises an error.
+#   - The script keeps all of its other state in package variables (e.g., %ROUGEParam and the $opt_*
+#     options) which it initializes on every run. Every request is run in a child forked from the worker
+#     before the script ever ran, so no state is carried between requests either way.
+#   - The script finds its modules relative to __FILE__, which the "#line" directive sets to its path.
+#   - The only switch on the script's "#!" line is -w, which the worker sets with $^W for every request.
+_ROUGE_WORKER_SOURCE = r'''
+my $script = shift @ARGV;
+open(my $fh, '<', $script) or die "Cannot open $script: $!\n";
+my $source = do { local $/; <$fh> };
+close($fh);
+my $num_rewritten = ($source =~ s/^my /our /mg) || 0;
+my $main = eval "sub {\n#line 1 \"$script\"\n$source\n}";
+die $@ unless defined($main);
+
+binmode(STDOUT);
+$| = 1;
+print "$num_rewritten\n";
+while (defined(my $request = <STDIN>)) {
+  chomp($request);
+  my $pid = open(my $child, '-|');
+  die "Cannot fork: $!\n" unless defined($pid);
+  if ($pid == 0) {
+    my ($stdout, $stderr) = ('', '');
+    open(my $response, '>&', \*STDOUT) or die "Cannot duplicate stdout: $!\n";
+    close(STDOUT);
+    close(STDERR);
+    open(STDOUT, '>', \$stdout);
+    open(STDERR, '>', \$stderr);
+    @ARGV = split(/\t/, $request);
+    # The script's "#!/usr/bin/perl -w" line is not read when it is compiled by the worker
+    $^W = 1;
+    my $status = eval { $main->(); 1 } ? 0 : 1;
+    print STDERR $@ if $status;
+    close(STDOUT);
+    close(STDERR);
+    print $response "$status " . length($stdout) . ' ' . length($stderr) . "\n$stdout$stderr";
+    close($response);
+    require POSIX;
+    POSIX::_exit(0);
+  }
+  my $output = do { local $/; <$child> };
+  close($child);
+  print(length($output) > 0 ? $output : "1 0 0\n");
+}
+'''
+
+
+class _RougeWorker(object):
+    """
+    A long-lived Perl process which runs the ROUGE script without paying the Perl startup, the compilation
+    of the script, and loading its modules for every call.
+    """
+    def __init__(self, rouge_script_location: str) -> None:
+        logger.info(f'Starting a ROUGE worker for {rouge_script_location}')
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.process = Popen(['perl', '-e', _ROUGE_WORKER_SOURCE, rouge_script_location], stdin=PIPE, stdout=PIPE)
+        header = self.process.stdout.readline().strip()
+        if not header.isdigit():
+            self.close()
+            raise Exception(f'The ROUGE worker failed to compile {rouge_script_location}')
+        # The number of file-scoped "my" declarations which were rewritten to "our"
+        self.num_rewritten_lines = int(header)
+        if self.num_rewritten_lines == 0:
+            self.close()
+            raise Exception(f'The ROUGE worker did not find any file-scoped variables to rewrite in '
+                            f'{rouge_script_location}. It only supports the layout of ROUGE-1.5.5.pl')
+
+    def run(self, args: List[str]) -> Tuple[int, str, str]:
+        """
+        Runs the ROUGE script with the command line arguments `args` and returns its exit status, stdout
+        and stderr.
+        """
+        with self.lock:
+            self.process.stdin.write(('\t'.join(args) + '\n').encode())
+            self.process.stdin.flush()
+            header = self.process.stdout.readline().split()
+            if len(header) != 3:
+                raise Exception(f'The ROUGE worker exited unexpectedly')
+            status, stdout_size, stderr_size = map(int, header)
+            stdout = self.process.stdout.read(stdout_size)
+            stderr = self.process.stdout.read(stderr_size)
+        return status, stdout.decode(), stderr.decode()
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def close(self) -> None:
+        self.process.stdin.close()
+        self.process.wait()
+
+
+# The workers which are shared by all of the `Rouge` instances in this process, keyed by the script location
+# and the index of the worker (there is one worker per concurrent ROUGE process)
+_ROUGE_WORKERS: Dict[Tuple[str, int], _RougeWorker] = {}
+_ROUGE_WORKERS_LOCK = threading.Lock()
+
+
+def _get_rouge_worker(rouge_script_location: str, index: int = 0) -> _RougeWorker:
+    with _ROUGE_WORKERS_LOCK:
+        key = (rouge_script_location, index)
+        worker = _ROUGE_WORKERS.get(key)
+        # A worker which was inherited from the parent of a forked process cannot be used since the
+        # parent is also writing to it
+        if worker is None or worker.pid != os.getpid() or not worker.is_alive():
+            worker = _RougeWorker(rouge_script_location)
+            _ROUGE_WORKERS[key] = worker
+        return worker
+
 
 @Metric.register('rouge')
 class Rouge(ReferenceBasedMetric):
+    execution_parameters = ['use_persistent_worker', 'num_processes']
+
     def __init__(self,
                  max_ngram: int = 4,
                  use_porter_stemmer: bool = True,
@@ -30,7 +157,17 @@ class Rouge(ReferenceBasedMetric):
                  skip_bigram_gap_length: Optional[int] = None,
                  wlcs_weight: Optional[float] = None,
                  rouge_root: str = f'{DATA_ROOT}/metrics/ROUGE-1.5.5',
-                 scoring_function: str = 'average'):
+                 scoring_function: str = 'average',
+                 use_persistent_worker: bool = False,
+                 num_processes: int = 1):
+        """
+        Args:
+            use_persistent_worker: If true, the ROUGE script is run by a long-lived Perl process which is
+                shared by all of the `Rouge` instances with the same `rouge_root` instead of starting Perl
+                on every call
+            num_processes: The number of ROUGE processes which `score_multi_all` runs concurrently, each on
+                a contiguous chunk of the instances
+        """
         super().__init__()
         self.max_ngram = max_ngram
         self.use_porter_stemmer = use_porter_stemmer
@@ -43,43 +180,39 @@ class Rouge(ReferenceBasedMetric):
         self.rouge_script_location = f'{rouge_root}/ROUGE-1.5.5.pl'
         self.rouge_eval_home = f'{rouge_root}/data'
         self.scoring_function = scoring_function
+        self.use_persistent_worker = use_persistent_worker
+        self.num_processes = num_processes
 
         if not os.path.exists(rouge_root):
             raise Exception(f'Path "{rouge_root}" does not exist. Have you setup ROUGE?')
 
-    def _save_summary(self, summary: SummaryType, file_path: str) -> None:
-        dirname = os.path.dirname(file_path)
-        os.makedirs(dirname, exist_ok=True)
-        with open(file_path, 'w') as out:
-            if isinstance(summary, list):
-                for sentence in summary:
-                    out.write(sentence + '\n')
-            else:
-                out.write(summary)
-
-    def _save_config_file(self,
-                          config_filename: str,
-                          summary_filenames_list: List[List[str]],
-                          reference_filenames_list: List[List[str]]):
-        output_dir = os.path.dirname(config_filename)
-        with open(config_filename, 'w') as out:
-            out.write(f'<ROUGE_EVAL version="1.0">\n')
-            for i, (reference_filenames, summary_filenames) in enumerate(zip(reference_filenames_list, summary_filenames_list)):
-                out.write(f'<EVAL ID="{i + 1}">\n')
-                out.write(f'<INPUT-FORMAT TYPE="SPL"></INPUT-FORMAT>\n')
-                out.write(f'<PEER-ROOT>{output_dir}</PEER-ROOT>\n')
-                out.write(f'<MODEL-ROOT>{output_dir}</MODEL-ROOT>\n')
-                out.write(f'<PEERS>\n')
-                for j, summary_filename in enumerate(summary_filenames):
-                    out.write(f'<P ID="{j + 1}">{summary_filename}</P>\n')
-                out.write(f'</PEERS>\n')
-                out.write(f'<MODELS>\n')
-                for j, reference_filename in enumerate(reference_filenames):
-                    symbol = chr(j + 65)
-                    out.write(f'<M ID="{symbol}">{reference_filename}</M>\n')
-                out.write(f'</MODELS>\n')
-                out.write(f'</EVAL>\n')
-            out.write(f'</ROUGE_EVAL>\n')
+    def _format_summary(self, summary: SummaryType) -> str:
+        if isinstance(summary, list):
+            return ''.join(sentence + '\n' for sentence in summary)
+        return summary
+
+    def _format_config_file(self,
+                            output_dir: str,
+                            summary_filenames_list: List[List[str]],
+                            reference_filenames_list: List[List[str]]) -> str:
+        lines = [f'<ROUGE_EVAL version="1.0">']
+        for i, (reference_filenames, summary_filenames) in enumerate(zip(reference_filenames_list, summary_filenames_list)):
+            lines.append(f'<EVAL ID="{i + 1}">')
+            lines.append(f'<INPUT-FORMAT TYPE="SPL"></INPUT-FORMAT>')
+            lines.append(f'<PEER-ROOT>{output_dir}</PEER-ROOT>')
+            lines.append(f'<MODEL-ROOT>{output_dir}</MODEL-ROOT>')
+            lines.append(f'<PEERS>')
+            for j, summary_filename in enumerate(summary_filenames):
+                lines.append(f'<P ID="{j + 1}">{summary_filename}</P>')
+            lines.append(f'</PEERS>')
+            lines.append(f'<MODELS>')
+            for j, reference_filename in enumerate(reference_filenames):
+                symbol = chr(j + 65)
+                lines.append(f'<M ID="{symbol}">{reference_filename}</M>')
+            lines.append(f'</MODELS>')
+            lines.append(f'</EVAL>')
+        lines.append(f'</ROUGE_EVAL>')
+        return ''.join(line + '\n' for line in lines)
 
     def _parse_average_line(self, columns: List[str]) -> Tuple[str, str, float, float, float]:
         assert len(columns) == 8
@@ -108,7 +241,12 @@ class Rouge(ReferenceBasedMetric):
         f1 = float(columns[6][2:]) * 100
         return instance_id, summarizer_id, recall, precision, f1
 
-    def _parse_rouge_stdout(self, stdout: str):
+    def _parse_rouge_stdout(self, stdout: str, num_instances: Optional[int] = None):
+        """
+        Parses the system-level and summary-level scores from the output of the ROUGE script. If
+        `num_instances` is not None, the summary-level scores will have exactly that many instances, and the
+        instances without any summaries (for which ROUGE does not output anything) will have an empty list.
+        """
         lines = stdout.splitlines()
         macro_metrics_dict = defaultdict(lambda: defaultdict(MetricsDict))
         micro_metrics_dicts = defaultdict(lambda: defaultdict(MetricsDict))
@@ -133,17 +271,83 @@ class Rouge(ReferenceBasedMetric):
         for summarizer_id, metrics in macro_metrics_dict.items():
             macro_metrics_list[summarizer_id] = metrics
 
-        micro_metrics_lists = [None] * len(micro_metrics_dicts)
+        if num_instances is None:
+            num_instances = len(micro_metrics_dicts)
+        micro_metrics_lists = [[] for _ in range(num_instances)]
         for instance_id, metrics_dict in micro_metrics_dicts.items():
+            if instance_id >= num_instances:
+                raise Exception(f'ROUGE output has scores for instance {instance_id + 1}, but there are only '
+                                f'{num_instances} instances')
             micro_metrics_lists[instance_id] = [None] * len(metrics_dict)
             for summarizer_id, metrics in metrics_dict.items():
                 micro_metrics_lists[instance_id][summarizer_id] = metrics
         return macro_metrics_list, micro_metrics_lists
 
+    def _get_command(self, config_filename: str, score_only: bool) -> List[str]:
+        # The script always runs the bootstrap resampling for the confidence intervals of the system-level
+        # scores. If only the summary-level scores are needed, one resample is the fewest which it allows.
+        # The summary-level scores do not depend on the resampling.
+        command = [
+            self.rouge_script_location,
+            '-e', self.rouge_eval_home,
+            '-n', str(self.max_ngram),
+            '-a',
+            '-c', '95',
+            '-r', '1' if score_only else '1000',
+            '-p', '0.5',
+            '-t', '0',
+            '-d'
+        ]
+        if self.use_porter_stemmer:
+            command += ['-m']
+        if self.remove_stopwords:
+            command += ['-s']
+        if self.max_bytes is not None:
+            command += ['-b', str(self.max_bytes)]
+        if self.max_words is not None:
+            command += ['-l', str(self.max_words)]
+        if not self.compute_rouge_l:
+            command += ['-x']
+        if self.skip_bigram_gap_length is not None:
+            command += ['-2', str(self.skip_bigram_gap_length), '-u']
+        if self.wlcs_weight is not None:
+            command += ['-w', str(self.wlcs_weight)]
+        if self.scoring_function == 'average':
+            command += ['-f', 'A']
+        elif self.scoring_function == 'max':
+            command += ['-f', 'B']
+        else:
+            raise Exception(f'Unrecognized scoring function: "{self.scoring_function}"')
+        command += [config_filename]
+        return command
+
+    def _run_command(self, command: List[str], worker_index: int = 0) -> str:
+        # We used to fail if anything was written to stderr, but ROUGE writes
+        # a warning if the number of peers per reference set is different, which
+        # is expected in some situations for us (if we just have more summaries
+        # to score for some reference sets than others). Therefore, we no longer fail
+        # if stderr is not empty.
+        logger.info(f'Running ROUGE command: "{" ".join(command)}"')
+        if self.use_persistent_worker:
+            status, stdout, stderr = _get_rouge_worker(self.rouge_script_location, worker_index).run(command[1:])
+            if status != 0:
+                logger.warning(f'ROUGE failed: {stderr}')
+            return stdout
+        process = Popen(command, stdout=PIPE, stderr=PIPE)
+        stdout, stderr = process.communicate()
+        return stdout.decode()
+
     def _run(self,
              summaries_list: List[List[SummaryType]],
-             references_list: List[List[SummaryType]]) -> Tuple[List[MetricsDict], List[List[MetricsDict]]]:
-        with TemporaryDirectory() as temp_dir:
+             references_list: List[List[SummaryType]],
+             score_only: bool = False) -> Tuple[Optional[List[MetricsDict]], List[List[MetricsDict]]]:
+        """
+        Runs ROUGE and returns the system-level and summary-level scores. If `score_only` is true, the
+        system-level scores are not calculated (``None`` is returned instead), and the instances are split
+        into `num_processes` chunks which are scored by concurrent ROUGE processes.
+        """
+        with StagingDirectory('rouge') as staging:
+            temp_dir = staging.path
             summary_filenames_list = []
             reference_filenames_list = []
 
@@ -153,66 +357,50 @@ class Rouge(ReferenceBasedMetric):
                 for j, summary in enumerate(summaries):
                     summary_filename = f'{i}/model.{j}.txt'
                     summary_filenames_list[-1].append(summary_filename)
-                    self._save_summary(summary, f'{temp_dir}/{summary_filename}')
+                    staging.add_file(summary_filename, self._format_summary(summary))
 
                 for j, reference in enumerate(references):
                     symbol = chr(j + 65)
                     reference_filename = f'{i}/gold.{symbol}.txt'
                     reference_filenames_list[-1].append(reference_filename)
-                    self._save_summary(reference, f'{temp_dir}/{reference_filename}')
-
-            config_filename = f'{temp_dir}/config.xml'
-            self._save_config_file(config_filename, summary_filenames_list, reference_filenames_list)
-
-            command = [
-                self.rouge_script_location,
-                '-e', self.rouge_eval_home,
-                '-n', str(self.max_ngram),
-                '-a',
-                '-c', '95',
-                '-r', '1000',
-                '-p', '0.5',
-                '-t', '0',
-                '-d'
-            ]
-            if self.use_porter_stemmer:
-                command += ['-m']
-            if self.remove_stopwords:
-                command += ['-s']
-            if self.max_bytes is not None:
-                command += ['-b', str(self.max_bytes)]
-            if self.max_words is not None:
-                command += ['-l', str(self.max_words)]
-            if not self.compute_rouge_l:
-                command += ['-x']
-            if self.skip_bigram_gap_length is not None:
-                command += ['-2', str(self.skip_bigram_gap_length), '-u']
-            if self.wlcs_weight is not None:
-                command += ['-w', str(self.wlcs_weight)]
-            if self.scoring_function == 'average':
-                command += ['-f', 'A']
-            elif self.scoring_function == 'max':
-                command += ['-f', 'B']
-            else:
-                raise Exception(f'Unrecognized scoring function: "{self.scoring_function}"')
-            command += [config_filename]
+                    staging.add_file(reference_filename, self._format_summary(reference))
+
+            if not score_only:
+                config = self._format_config_file(temp_dir, summary_filenames_list, reference_filenames_list)
+                config_filename = staging.add_file('config.xml', config)
+                staging.flush()
+                stdout = self._run_command(self._get_command(config_filename, False))
+                return self._parse_rouge_stdout(stdout)
 
-            # We used to fail if anything was written to stderr, but ROUGE writes
-            # a warning if the number of peers per reference set is different, which
-            # is expected in some situations for us (if we just have more summaries
-            # to score for some reference sets than others). Therefore, we no longer fail
-            # if stderr is not empty.
-            logger.info(f'Running ROUGE command: "{" ".join(command)}"')
-            process = Popen(command, stdout=PIPE, stderr=PIPE)
-            stdout, stderr = process.communicate()
+            # Each chunk has its own config file with the EVAL IDs starting from 1, so the summary-level scores
+            # of the chunks can be concatenated in order
+            sizes = [max(len(summaries), 1) for summaries in summaries_list]
+            boundaries = _get_shard_boundaries(sizes, self.num_processes)
+            commands = []
+            for k, (start, end) in enumerate(boundaries):
+                config = self._format_config_file(temp_dir, summary_filenames_list[start:end], reference_filenames_list[start:end])
+                config_filename = staging.add_file(f'config.{k}.xml', config)
+                commands.append(self._get_command(config_filename, True))
+            staging.flush()
+
+            if len(commands) <= 1:
+                stdouts = [self._run_command(command) for command in commands]
+            else:
+                with ThreadPoolExecutor(max_workers=len(commands)) as executor:
+                    stdouts = list(executor.map(self._run_command, commands, range(len(commands))))
 
-            macro_metrics_list, micro_metrics_lists = self._parse_rouge_stdout(stdout.decode())
-            return macro_metrics_list, micro_metrics_lists
+            # A chunk can end with instances which have no summaries and therefore no output, so every chunk
+            # is padded to its number of instances to keep the later chunks aligned
+            micro_metrics_lists = []
+            for stdout, (start, end) in zip(stdouts, boundaries):
+                micro_metrics_lists.extend(self._parse_rouge_stdout(stdout, num_instances=end - start)[1])
+            assert len(micro_metrics_lists) == len(summaries_list)
+            return None, micro_metrics_lists
 
     def score_multi_all(self,
                         summaries_list: List[List[SummaryType]],
                         references_list: List[List[ReferenceType]]) -> List[List[MetricsDict]]:
-        _, micro_metrics_lists = self._run(summaries_list, references_list)
+        _, micro_metrics_lists = self._run(summaries_list, references_list, score_only=True)
         return micro_metrics_lists
 
     def evaluate(self,
@@ -0,0 +1,247 @@
+import hashlib
+import inspect
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sacrerouge.data import MetricsDict
+from sacrerouge.io.serialization import dumps
+from sacrerouge.metrics.metric import Metric
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreCache(object):
+    """
+    A persistent cache of metric scores (or any other json-serializable results) stored in a SQLite database.
+    The entries are keyed by a content hash of the metric's parameters and the summary and context that were
+    scored. Once the total size of the cached values exceeds `max_size_bytes`, the least recently used entries
+    are evicted. The total size is maintained by triggers, so it does not have to be recalculated.
+    """
+    def __init__(self, file_path: str, max_size_bytes: Optional[int] = None) -> None:
+        dirname = os.path.dirname(file_path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self.file_path = file_path
+        self.max_size_bytes = max_size_bytes
+        self._connect()
+
+    def _connect(self) -> None:
+        # The cache may be shared by metrics which are scored in different threads
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.file_path, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS scores ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS scores_last_used ON scores (last_used)')
+        # "INSERT OR REPLACE" only fires the delete trigger for the replaced row with recursive triggers
+        self.connection.execute('PRAGMA recursive_triggers = ON')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS total_size (id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER NOT NULL)'
+        )
+        self.connection.execute(
+            'INSERT OR IGNORE INTO total_size (id, size) SELECT 0, COALESCE(SUM(size), 0) FROM scores'
+        )
+        self.connection.execute(
+            'CREATE TRIGGER IF NOT EXISTS scores_insert AFTER INSERT ON scores BEGIN '
+            'UPDATE total_size SET size = size + new.size WHERE id = 0; END'
+        )
+        self.connection.execute(
+            'CREATE TRIGGER IF NOT EXISTS scores_delete AFTER DELETE ON scores BEGIN '
+            'UPDATE total_size SET size = size - old.size WHERE id = 0; END'
+        )
+        self.connection.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        results = {}
+        now = time.time()
+        with self.lock:
+            # SQLite limits the number of parameters in one query
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ', '.join('?' * len(batch))
+                rows = self.connection.execute(
+                    f'SELECT key, value FROM scores WHERE key IN ({placeholders})', batch
+                ).fetchall()
+                for key, value in rows:
+                    results[key] = json.loads(value)
+                self.connection.execute(
+                    f'UPDATE scores SET last_used = ? WHERE key IN ({placeholders})', [now] + batch
+                )
+            self.connection.commit()
+        return results
+
+    def put_many(self, items: Dict[str, Any]) -> None:
+        now = time.time()
+        rows = []
+        for key, metrics in items.items():
+            value = dumps(metrics)
+            rows.append((key, value, len(value), now))
+
+        with self.lock:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO scores (key, value, size, last_used) VALUES (?, ?, ?, ?)', rows
+            )
+            self._evict()
+            self.connection.commit()
+
+    def _get_total_size(self) -> int:
+        return self.connection.execute('SELECT size FROM total_size WHERE id = 0').fetchone()[0]
+
+    def _evict(self) -> None:
+        if self.max_size_bytes is None:
+            return
+        total = self._get_total_size()
+        if total <= self.max_size_bytes:
+            return
+
+        # Delete the least recently used entries until the cache fits, reading them in batches from the index
+        num_evicted = 0
+        while total > self.max_size_bytes:
+            rows = self.connection.execute('SELECT key, size FROM scores ORDER BY last_used LIMIT 1000').fetchall()
+            if len(rows) == 0:
+                break
+            evicted = []
+            for key, size in rows:
+                if total <= self.max_size_bytes:
+                    break
+                evicted.append((key,))
+                total -= size
+            self.connection.executemany('DELETE FROM scores WHERE key = ?', evicted)
+            num_evicted += len(evicted)
+            total = self._get_total_size()
+        logger.info(f'Evicted {num_evicted} entries from the score cache {self.file_path}')
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM scores').fetchone()[0]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The lock and the connection cannot be pickled, so a copy of the cache in another process (e.g., with
+        # the "process" parallel backend) opens its own connection to the same file. SQLite's file locking
+        # makes it safe for the processes to write to it at the same time
+        state = self.__dict__.copy()
+        del state['lock']
+        del state['connection']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._connect()
+
+
+def get_metric_fingerprint(metric: Metric) -> str:
+    """
+    Creates a string which identifies the metric's class and configuration from the arguments that its
+    constructor was called with, including the default values of the arguments which were not passed. The
+    metric's `execution_parameters` are not included. An exception is raised if any of the other arguments
+    cannot be serialized to json, because the fingerprint would not identify the configuration.
+    """
+    cls = type(metric)
+    args, kwargs = getattr(metric, '_constructor_args', ((), {}))
+    try:
+        arguments = inspect.signature(cls.__init__).bind(metric, *args, **kwargs)
+    except TypeError:
+        raise Exception(f'Cannot create the fingerprint of {cls.__name__} because its constructor arguments are unknown')
+    arguments.apply_defaults()
+
+    params = {}
+    for name, value in list(arguments.arguments.items())[1:]:
+        if name in metric.execution_parameters:
+            continue
+        try:
+            params[name] = json.loads(json.dumps(value))
+        except (TypeError, ValueError):
+            raise Exception(f'Cannot create the fingerprint of {cls.__name__} because its "{name}" argument '
+                            f'is not json-serializable')
+    return json.dumps({'class': f'{cls.__module__}.{cls.__qualname__}', 'params': params}, sort_keys=True)
+
+
+class CachedMetric(Metric):
+    """
+    Wraps `metric` so that `score_multi_all` only passes the summaries which are not in `cache` to the
+    underlying metric. The cache key of a summary is a hash of `fingerprint` (by default, from
+    `get_metric_fingerprint`), the serialized summary fields and the serialized context fields, so any change
+    in the metric's configuration or input will result in a cache miss. If the metric supports per-reference
+    statistics, the statistics from `score_reference_statistics_multi_all` are cached in the same way, so they
+    must be json-serializable. They are returned after a round trip through json whether they were cached or not
+    (e.g., tuples become lists), so `combine_reference_statistics` always gets the same input.
+    """
+    def __init__(self, metric: Metric, cache: ScoreCache, fingerprint: Optional[str] = None) -> None:
+        super().__init__(metric.required_summary_fields, metric.required_context_fields, metric.jackknifer)
+        self.metric = metric
+        self.cache = cache
+        self.resource_hints = metric.resource_hints
+        self.fingerprint = fingerprint or get_metric_fingerprint(metric)
+
+    def _get_key(self, kind: str, summary_args: List[Any], context_args: List[Any]) -> str:
+        hasher = hashlib.sha256()
+        hasher.update(self.fingerprint.encode())
+        hasher.update(b'\0')
+        hasher.update(kind.encode())
+        for arg in summary_args + context_args:
+            hasher.update(b'\0')
+            hasher.update(dumps(arg).encode())
+        return hasher.hexdigest()
+
+    def _score_with_cache(self, kind: str, score_func: Callable, args: List[List[Any]], kwargs: Dict) -> List[List[Any]]:
+        """
+        Returns the results of `score_func` (one of the metric's `*_multi_all` methods) on `args`, only calling it
+        for the summaries which are not cached. `kind` identifies the type of results in the cache keys.
+        """
+        num_summary_args = len(self.required_summary_fields)
+        summary_args, context_args = args[:num_summary_args], args[num_summary_args:]
+
+        keys = []
+        for i in range(len(args[0])):
+            context = [arg[i] for arg in context_args]
+            keys.append([self._get_key(kind, [arg[i][j] for arg in summary_args], context)
+                         for j in range(len(summary_args[0][i]))])
+        cached = self.cache.get_many(list(set(key for group in keys for key in group)))
+
+        # Only score the summaries which were not in the cache, keeping them grouped by context
+        miss_groups, miss_indices = [], []
+        for i, group in enumerate(keys):
+            missing = [j for j, key in enumerate(group) if key not in cached]
+            if missing:
+                miss_groups.append(i)
+                miss_indices.append(missing)
+        num_misses = sum(len(missing) for missing in miss_indices)
+        logger.info(f'Score cache hits: {sum(len(group) for group in keys) - num_misses}, misses: {num_misses}')
+
+        if miss_groups:
+            miss_args = [[[arg[i][j] for j in missing] for i, missing in zip(miss_groups, miss_indices)]
+                         for arg in summary_args]
+            miss_args += [[arg[i] for i in miss_groups] for arg in context_args]
+            results_lists = score_func(*miss_args, **kwargs)
+
+            new_items = {}
+            for i, missing, results_list in zip(miss_groups, miss_indices, results_lists):
+                for j, results in zip(missing, results_list):
+                    new_items[keys[i][j]] = json.loads(dumps(results))
+            self.cache.put_many(new_items)
+            cached.update(new_items)
+
+        return [[cached[key] for key in group] for group in keys]
+
+    def score_multi_all(self, *args: List[Any], **kwargs) -> List[List[MetricsDict]]:
+        results_lists = self._score_with_cache('scores', self.metric.score_multi_all, args, kwargs)
+        return [[MetricsDict(results) for results in results_list] for results_list in results_lists]
+
+    def supports_reference_statistics(self) -> bool:
+        return self.metric.supports_reference_statistics()
+
+    def score_reference_statistics_multi_all(self, *args: List[Any], **kwargs) -> List[List[List[Any]]]:
+        return self._score_with_cache('reference-statistics', self.metric.score_reference_statistics_multi_all,
+                                      args, kwargs)
+
+    def combine_reference_statistics(self, statistics_list: List[Any]) -> MetricsDict:
+        return self.metric.combine_reference_statistics(statistics_list)
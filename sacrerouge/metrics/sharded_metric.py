@@ -0,0 +1,123 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Tuple
+
+from sacrerouge.data import MetricsDict
+from sacrerouge.metrics.metric import Metric
+
+logger = logging.getLogger(__name__)
+
+# The copy of the metric which is used by the current worker process
+_worker_metric = None
+
+
+def _init_worker(metric: Metric) -> None:
+    global _worker_metric
+    _worker_metric = metric
+
+
+def _score_shard(method: str, args: List[List[Any]]) -> List[Any]:
+    return getattr(_worker_metric, method)(*args)
+
+
+def _get_shard_boundaries(sizes: List[int], num_shards: int) -> List[Tuple[int, int]]:
+    """
+    Splits the items into at most `num_shards` contiguous shards with approximately the same total size and
+    returns the (start, end) indices of each shard.
+    """
+    if len(sizes) == 0:
+        return []
+    total = sum(sizes)
+    boundaries = []
+    start, current = 0, 0
+    for i, size in enumerate(sizes):
+        current += size
+        if current * num_shards >= total * (len(boundaries) + 1) or i == len(sizes) - 1:
+            boundaries.append((start, i + 1))
+            start = i + 1
+    return boundaries
+
+
+class ShardedMetric(Metric):
+    """
+    Wraps `metric` so that the inputs to `score_multi_all` and `score_all` are split into contiguous shards
+    which are scored by a pool of `num_workers` processes. Every worker receives a copy of the metric once,
+    when the pool is started, and the results of the shards are concatenated in the original order. This
+    speeds up CPU-bound metrics which otherwise score everything on one core.
+
+    `score_multi_all` shards by context group, so all of the summaries which share a context are always scored
+    by the same worker. The pool is kept alive between calls until `close` is called.
+    """
+    def __init__(self, metric: Metric, num_workers: int, shards_per_worker: int = 4) -> None:
+        super().__init__(metric.required_summary_fields, metric.required_context_fields, metric.jackknifer)
+        self.metric = metric
+        self.num_workers = num_workers
+        self.shards_per_worker = shards_per_worker
+        self.resource_hints = metric.resource_hints
+        self._executor = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_executor'] = None
+        return state
+
+    def _score_sharded(self, method: str, args: List[List[Any]], sizes: List[int]) -> List[Any]:
+        boundaries = _get_shard_boundaries(sizes, self.num_workers * self.shards_per_worker)
+        if len(boundaries) <= 1:
+            return getattr(self.metric, method)(*args)
+
+        if self._executor is None:
+            logger.info(f'Starting {self.num_workers} workers for {type(self.metric).__name__}')
+            self._executor = ProcessPoolExecutor(max_workers=self.num_workers,
+                                                 initializer=_init_worker,
+                                                 initargs=(self.metric,))
+
+        futures = [
+            self._executor.submit(_score_shard, method, [arg[start:end] for arg in args])
+            for start, end in boundaries
+        ]
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+
+    def score_multi_all(self, *args: List[Any], **kwargs) -> List[List[MetricsDict]]:
+        if kwargs:
+            return self.metric.score_multi_all(*args, **kwargs)
+        num_summary_args = len(self.required_summary_fields)
+        sizes = [len(summaries) for summaries in args[0]] if num_summary_args > 0 else [1] * len(args[0])
+        return self._score_sharded('score_multi_all', args, sizes)
+
+    def score_all(self, *args: List[Any], **kwargs) -> List[MetricsDict]:
+        if kwargs:
+            return self.metric.score_all(*args, **kwargs)
+        return self._score_sharded('score_all', args, [1] * len(args[0]))
+
+    def supports_reference_statistics(self) -> bool:
+        return self.metric.supports_reference_statistics()
+
+    def score_reference_statistics_multi_all(self, *args: List[Any], **kwargs) -> List[List[List[Any]]]:
+        if kwargs:
+            return self.metric.score_reference_statistics_multi_all(*args, **kwargs)
+        sizes = [len(summaries) for summaries in args[0]]
+        return self._score_sharded('score_reference_statistics_multi_all', args, sizes)
+
+    def combine_reference_statistics(self, statistics_list: List[Any]) -> MetricsDict:
+        return self.metric.combine_reference_statistics(statistics_list)
+
+    def evaluate(self, *args: List[Any]) -> Tuple[MetricsDict, List[MetricsDict]]:
+        # Metrics which override `evaluate` may calculate the system-level scores differently than by
+        # aggregating the summary-level scores, so they are run in this process
+        if type(self.metric).evaluate.__module__ != Metric.__module__:
+            return self.metric.evaluate(*args)
+        micro_metrics_list = self.score_all(*args)
+        macro_metrics = self.metric.aggregate(micro_metrics_list)
+        return macro_metrics, micro_metrics_list
+
+    def aggregate(self, metrics_list: List[MetricsDict]) -> MetricsDict:
+        return self.metric.aggregate(metrics_list)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
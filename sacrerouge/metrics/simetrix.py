@@ -7,7 +7,7 @@ from subprocess import Popen, PIPE
 from typing import List, Tuple
 
 from sacrerouge.commands import MetricSetupSubcommand
-from sacrerouge.common import DATA_ROOT, TemporaryDirectory
+from sacrerouge.common import DATA_ROOT, StagingDirectory
 from sacrerouge.data import MetricsDict
 from sacrerouge.data.types import DocumentType, SummaryType
 from sacrerouge.metrics import DocumentBasedMetric, Metric
@@ -29,15 +29,10 @@ class SIMetrix(DocumentBasedMetric):
         self.jar_path = f'{simetrix_root}/simetrix.jar'
         self.data_dir = f'{simetrix_root}/data'
 
-    def _save_summary_like(self, summary: SummaryType, file_path: str) -> None:
-        dirname = os.path.dirname(file_path)
-        if dirname:
-            os.makedirs(dirname, exist_ok=True)
-        with open(file_path, 'w') as out:
-            if isinstance(summary, list):
-                out.write('\n'.join(summary))
-            else:
-                out.write(summary)
+    def _format_summary_like(self, summary: SummaryType) -> str:
+        if isinstance(summary, list):
+            return '\n'.join(summary)
+        return summary
 
     def _parse_macro_file(self, file_path: str) -> List[MetricsDict]:
         metrics_dict = {}
@@ -89,37 +84,34 @@ class SIMetrix(DocumentBasedMetric):
     def _run(self,
              summaries_list: List[List[SummaryType]],
              documents_list: List[List[str]]) -> Tuple[List[MetricsDict], List[List[MetricsDict]]]:
-        with TemporaryDirectory() as temp_dir:
-            mappings_file_path = f'{temp_dir}/mappings.txt'
-            with open(mappings_file_path, 'w') as out:
-                for i, (summaries, documents) in enumerate(zip(summaries_list, documents_list)):
-                    document_dir = f'{temp_dir}/documents/{i}'
-                    for j, document in enumerate(documents):
-                        document_file_path = f'{document_dir}/{j}.txt'
-                        self._save_summary_like(document, document_file_path)
-
-                    for j, summary in enumerate(summaries):
-                        summary_file_path = f'{temp_dir}/summaries/{i}-{j}.txt'
-                        self._save_summary_like(summary, summary_file_path)
-
-                        out.write(f'{i} {j} {document_dir} {summary_file_path}\n')
-
-            config_file_path = f'{temp_dir}/config'
-            with open(config_file_path, 'w') as out:
-                perform_stemming = 'Y' if self.use_stemmer else 'N'
-                out.write(f'performStemming = {perform_stemming}\n')
-
-                remove_stopwords = 'Y' if self.remove_stopwords else 'N'
-                out.write(f'removeStopWords = {remove_stopwords}\n')
-                out.write(f'stopFilePath = {self.data_dir}/smart_common_words.txt\n')
-
-                out.write(f'divergence = Y\n')
-                out.write(f'frequencyFeatures = Y\n')
-                out.write(f'cosineOverlap = Y\n')
-                out.write(f'topicWordFeatures = Y\n')
-                out.write(f'backgroundCorpusFreqCounts = {self.data_dir}/bgFreqCounts.unstemmed.txt\n')
-                out.write(f'backgroundIdfUnstemmed = {self.data_dir}/bgIdfValues.unstemmed.txt\n')
-                out.write(f'backgroundIdfStemmed = {self.data_dir}/bgIdfValues.stemmed.txt\n')
+        with StagingDirectory('simetrix') as staging:
+            temp_dir = staging.path
+            mappings = []
+            for i, (summaries, documents) in enumerate(zip(summaries_list, documents_list)):
+                document_dir = f'{temp_dir}/documents/{i}'
+                for j, document in enumerate(documents):
+                    staging.add_file(f'{document_dir}/{j}.txt', self._format_summary_like(document))
+
+                for j, summary in enumerate(summaries):
+                    summary_file_path = staging.add_file(f'summaries/{i}-{j}.txt', self._format_summary_like(summary))
+                    mappings.append(f'{i} {j} {document_dir} {summary_file_path}\n')
+            mappings_file_path = staging.add_file('mappings.txt', ''.join(mappings))
+
+            perform_stemming = 'Y' if self.use_stemmer else 'N'
+            remove_stopwords = 'Y' if self.remove_stopwords else 'N'
+            config_file_path = staging.add_file('config', ''.join([
+                f'performStemming = {perform_stemming}\n',
+                f'removeStopWords = {remove_stopwords}\n',
+                f'stopFilePath = {self.data_dir}/smart_common_words.txt\n',
+                f'divergence = Y\n',
+                f'frequencyFeatures = Y\n',
+                f'cosineOverlap = Y\n',
+                f'topicWordFeatures = Y\n',
+                f'backgroundCorpusFreqCounts = {self.data_dir}/bgFreqCounts.unstemmed.txt\n',
+                f'backgroundIdfUnstemmed = {self.data_dir}/bgIdfValues.unstemmed.txt\n',
+                f'backgroundIdfStemmed = {self.data_dir}/bgIdfValues.stemmed.txt\n',
+            ]))
+            staging.flush()
 
             command = [
                 'java',
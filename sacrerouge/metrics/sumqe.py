@@ -18,6 +18,8 @@ logger = logging.getLogger(__name__)
 
 @Metric.register('sum-qe')
 class SumQE(ReferenceFreeMetric):
+    resource_hints = ['gpu']
+
     def __init__(self,
                  model_file: str = f'{DATA_ROOT}/metrics/SumQE/models/multitask_5-duc2006_duc2007.npy',
                  sum_qe_root: str = f'{DATA_ROOT}/metrics/SumQE',
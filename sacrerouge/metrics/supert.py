@@ -7,7 +7,7 @@ from subprocess import Popen, PIPE
 from typing import List
 
 from sacrerouge.commands import MetricSetupSubcommand
-from sacrerouge.common import DATA_ROOT, TemporaryDirectory
+from sacrerouge.common import DATA_ROOT, StagingDirectory
 from sacrerouge.data import MetricsDict
 from sacrerouge.data.types import DocumentType, SummaryType
 from sacrerouge.metrics import DocumentBasedMetric, Metric
@@ -17,6 +17,8 @@ logger = logging.getLogger(__name__)
 
 @Metric.register('supert')
 class SUPERT(DocumentBasedMetric):
+    resource_hints = ['gpu']
+
     def __init__(self,
                  environment_name: str = None,
                  supert_root: str = f'{DATA_ROOT}/metrics/SUPERT',
@@ -30,29 +32,24 @@ class SUPERT(DocumentBasedMetric):
             if 'CONDA_INIT' not in os.environ:
                 raise Exception('If `environment_name` is not none, environment variable "CONDA_INIT" must be set to the path to "conda.sh"')
 
-    def _save_documents(self, documents: List[List[DocumentType]], output_dir: str) -> None:
-        os.makedirs(output_dir)
+    def _save_documents(self, staging: StagingDirectory, documents: List[List[DocumentType]], output_dir: str) -> None:
         for i, document in enumerate(documents):
-            with open(f'{output_dir}/{i}.txt', 'w') as out:
-                if isinstance(document, list):
-                    document = ' '.join(document)
-                out.write('<TEXT>\n')
-                out.write(document + '\n')
-                out.write('</TEXT>\n')
-
-    def _save_summaries(self, summaries: List[List[SummaryType]], output_dir: str) -> None:
-        os.makedirs(output_dir)
+            if isinstance(document, list):
+                document = ' '.join(document)
+            staging.add_file(f'{output_dir}/{i}.txt', '<TEXT>\n' + document + '\n' + '</TEXT>\n')
+
+    def _save_summaries(self, staging: StagingDirectory, summaries: List[List[SummaryType]], output_dir: str) -> None:
         for i, summary in enumerate(summaries):
-            with open(f'{output_dir}/{i}', 'w') as out:
-                if isinstance(summary, list):
-                    summary = ' '.join(summary)
-                out.write(summary)
+            if isinstance(summary, list):
+                summary = ' '.join(summary)
+            staging.add_file(f'{output_dir}/{i}', summary)
 
     def score_multi_all(self,
                         summaries_list: List[List[SummaryType]],
                         documents_list: List[List[DocumentType]],
                         **kwargs) -> List[List[MetricsDict]]:
-        with TemporaryDirectory() as temp_dir:
+        with StagingDirectory('supert') as staging:
+            temp_dir = staging.path
             input_dir = f'{temp_dir}/input'
             output_file = f'{temp_dir}/output.json'
 
@@ -63,8 +60,11 @@ class SUPERT(DocumentBasedMetric):
                 documents_dir = f'{instance_dir}/input_docs'
                 summaries_dir = f'{instance_dir}/summaries'
 
-                self._save_documents(documents, documents_dir)
-                self._save_summaries(summaries, summaries_dir)
+                os.makedirs(documents_dir)
+                os.makedirs(summaries_dir)
+                self._save_documents(staging, documents, documents_dir)
+                self._save_summaries(staging, summaries, summaries_dir)
+            staging.flush()
 
             commands = [f'cd {self.supert_root}']
             if self.environment_name is not None:
@@ -0,0 +1,55 @@
+import argparse
+import jsons
+import time
+from itertools import islice
+from typing import List
+
+from sacrerouge.data import Metrics
+from sacrerouge.io import JsonlReader, JsonlWriter
+from sacrerouge.io.serialization import ORJSON_INSTALLED
+
+
+def _time(func) -> float:
+    start = time.time()
+    func()
+    return time.time() - start
+
+
+def _read_with_jsons(file_path: str, max_lines: int) -> List[Metrics]:
+    with open(file_path, 'r') as f:
+        return [jsons.loads(line, Metrics) for line in islice(f, max_lines)]
+
+
+def _read_with_jsonl_reader(file_path: str, max_lines: int) -> List[Metrics]:
+    with JsonlReader(file_path, Metrics) as f:
+        return list(islice(f, max_lines))
+
+
+def main(args):
+    # Both readers parse the same first `max_lines` lines from the file
+    with open(args.input_file, 'r') as f:
+        num_lines = sum(1 for _ in islice(f, args.max_lines))
+    print(f'Benchmarking {num_lines} lines (orjson installed: {ORJSON_INSTALLED})')
+
+    metrics_list = []
+    jsons_read = _time(lambda: _read_with_jsons(args.input_file, num_lines))
+    fast_read = _time(lambda: metrics_list.extend(_read_with_jsonl_reader(args.input_file, num_lines)))
+    print(f'Read:  jsons {jsons_read:.2f}s, JsonlReader {fast_read:.2f}s ({jsons_read / fast_read:.1f}x)')
+
+    def _write():
+        with JsonlWriter(args.output_file) as out:
+            for metrics in metrics_list:
+                out.write(metrics)
+
+    jsons_write = _time(lambda: [jsons.dumps(metrics) for metrics in metrics_list])
+    fast_write = _time(_write)
+    print(f'Write: jsons {jsons_write:.2f}s, JsonlWriter {fast_write:.2f}s ({jsons_write / fast_write:.1f}x)')
+
+
+if __name__ == '__main__':
+    argp = argparse.ArgumentParser()
+    argp.add_argument('input_file', help='A metrics jsonl file, for instance the output of "score"')
+    argp.add_argument('output_file', help='Where the metrics will be rewritten')
+    argp.add_argument('--max-lines', type=int, help='Only use the first lines of the file')
+    args = argp.parse_args()
+    main(args)
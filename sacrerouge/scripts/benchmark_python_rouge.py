@@ -0,0 +1,73 @@
+import argparse
+import time
+from typing import List
+
+from sacrerouge.commands.score import score_instances
+from sacrerouge.data.dataset_readers import ReferenceBasedDatasetReader
+from sacrerouge.metrics import PythonRouge
+
+
+def longest_common_substring(tokens1: List[str], tokens2: List[str], hit_mask: List[int]) -> None:
+    # The original dynamic programming implementation of the ROUGE-L hits, which `PythonRouge._bit_parallel_lcs`
+    # replaced. It is the reference that the bit-parallel version is tested and benchmarked against
+    m, n = len(tokens1), len(tokens2)
+    counter = [[0] * (n + 1) for x in range(m + 1)]
+    pointers = [[None] * (n + 1) for x in range(m + 1)]
+    for i in range(1, m + 1):
+        for j in range(1, n + 1):
+            if tokens1[i - 1] == tokens2[j - 1]:
+                counter[i][j] = counter[i - 1][j - 1] + 1
+                pointers[i][j] = '\\'
+            elif counter[i - 1][j] >= counter[i][j - 1]:
+                counter[i][j] = counter[i - 1][j]
+                pointers[i][j] = '^'
+            else:
+                counter[i][j] = counter[i][j - 1]
+                pointers[i][j] = '<'
+
+    # Mark the hit_mask
+    i, j = m, n
+    while i != 0 and j != 0:
+        if pointers[i][j] == '\\':
+            i -= 1
+            j -= 1
+            hit_mask[i] = 1
+        elif pointers[i][j] == '^':
+            i -= 1
+        elif pointers[i][j] == '<':
+            j -= 1
+        else:
+            raise Exception(f'Unknown pointer: {pointers[i][j]}')
+
+
+class _DynamicProgrammingRouge(PythonRouge):
+    # Calculates the ROUGE-L hits with the original dynamic programming LCS
+    def _bit_parallel_lcs(self, tokens1, tokens2, match_masks, hit_mask):
+        longest_common_substring(tokens1, tokens2, hit_mask)
+
+
+def _time(metric, instances):
+    start = time.time()
+    metrics_dicts = score_instances(instances, [metric])
+    return time.time() - start, metrics_dicts
+
+
+def main(args):
+    instances = ReferenceBasedDatasetReader().read(args.input_file)
+    if args.max_instances is not None:
+        instances = instances[:args.max_instances]
+    print(f'Benchmarking ROUGE-L on {len(instances)} instances')
+
+    kwargs = {'ngram_orders': [], 'compute_rouge_l': True, 'tokenization_cache_size': 0}
+    dp_time, expected = _time(_DynamicProgrammingRouge(**kwargs), instances)
+    fast_time, actual = _time(PythonRouge(**kwargs), instances)
+    print(f'Dynamic programming {dp_time:.2f}s, bit-parallel {fast_time:.2f}s ({dp_time / fast_time:.1f}x)')
+    print(f'Identical scores: {expected == actual}')
+
+
+if __name__ == '__main__':
+    argp = argparse.ArgumentParser()
+    argp.add_argument('input_file', help='A jsonl file with "summary" and "references" fields')
+    argp.add_argument('--max-instances', type=int, help='Only use the first instances of the file')
+    args = argp.parse_args()
+    main(args)
@@ -1,7 +1,10 @@
+import functools
 import logging
 import numpy as np
 import scipy.stats
+import threading
 import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from scipy.stats import kendalltau, pearsonr, spearmanr
 from typing import Callable, Dict, List, Optional, Tuple, Union
 
@@ -16,6 +19,39 @@ SummaryCorrFunc = Callable[[ArrayLike, ArrayLike], Union[float, Tuple[float, flo
 logger = logging.getLogger(__name__)
 
 
+def fast_kendalltau(x: ArrayLike, y: ArrayLike) -> Tuple[float, float]:
+    """
+    Calculates Kendall's tau-b between `x` and `y` with an O(n log n) merge sort that handles ties. This can be
+    used as a drop-in replacement for `scipy.stats.kendalltau` as the `corr_func` of the summary-, system- and
+    global-level correlations. The summary-level correlation will compute the correlations for all of the inputs
+    with a single call. Unlike scipy, the p-value is always calculated with the asymptotic normal approximation.
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    tau = _kendall_rows(x[None], y[None])[0]
+    if np.isnan(tau):
+        return np.nan, np.nan
+
+    # The variance of the difference between the number of concordant and discordant pairs with ties [3]
+    # from the scipy documentation
+    n = len(x)
+    _, x_counts = np.unique(x, return_counts=True)
+    _, y_counts = np.unique(y, return_counts=True)
+    x_tie, y_tie = (x_counts * (x_counts - 1) // 2).sum(), (y_counts * (y_counts - 1) // 2).sum()
+    x0, y0 = (x_counts * (x_counts - 1.) * (x_counts - 2)).sum(), (y_counts * (y_counts - 1.) * (y_counts - 2)).sum()
+    x1, y1 = (x_counts * (x_counts - 1.) * (2 * x_counts + 5)).sum(), \
+        (y_counts * (y_counts - 1.) * (2 * y_counts + 5)).sum()
+    total = n * (n - 1) // 2
+    con_minus_dis = tau * np.sqrt(total - x_tie) * np.sqrt(total - y_tie)
+
+    m = n * (n - 1.)
+    var = (m * (2 * n + 5) - x1 - y1) / 18 + (2 * x_tie * y_tie) / m
+    if n > 2:
+        var += x0 * y0 / (9 * m * (n - 2))
+    z = con_minus_dis / np.sqrt(var)
+    pvalue = 2 * scipy.stats.norm.sf(abs(z))
+    return tau, pvalue
+
+
 def convert_to_matrices(metrics_list: List[Metrics], *metric_names: str) -> Union[np.ndarray, List[np.ndarray]]:
     """
     Creates an N x M matrix of scores for each metric in `metric_names`, where N is the number of summarizer_ids
@@ -70,6 +106,10 @@ def summary_level_corr(corr_func: CorrFunc,
     np.testing.assert_array_equal(np.isnan(X), np.isnan(Y))
 
     M = X.shape[1]
+    if corr_func == fast_kendalltau:
+        # All of the columns can be correlated with a single call
+        column_correlations = _kendall_rows(X.T.astype(float), Y.T.astype(float))
+
     correlations = []
     num_inputs = []
     num_nan = 0
@@ -83,7 +123,10 @@ def summary_level_corr(corr_func: CorrFunc,
             # this will still leave comparable parallel data
             x = x[~np.isnan(x)]
             y = y[~np.isnan(y)]
-            r, _ = corr_func(x, y)
+            if corr_func == fast_kendalltau:
+                r = column_correlations[j]
+            else:
+                r, _ = corr_func(x, y)
             if np.isnan(r):
                 num_nan += 1
             else:
@@ -210,6 +253,340 @@ def bootstrap_both_sample(*matrices: np.ndarray) -> Union[np.ndarray, List[np.nd
     return samples
 
 
+def _bootstrap_indices(sample_func: Callable,
+                       N: int,
+                       M: int,
+                       num_samples: int,
+                       rng: Optional[np.random.Generator] = None) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    Draws the row and column indices for `num_samples` bootstrap samples at once. If `rng` is None, the random
+    numbers are drawn from the global numpy random state in exactly the same order as calling `sample_func`
+    `num_samples` times, so the samples are identical to the non-vectorized implementation for a fixed seed.
+    Otherwise, they are drawn from `rng`. The rows (num_samples x N) or columns (num_samples x M) will be
+    None if the respective dimension is not resampled.
+    """
+    if sample_func not in [bootstrap_system_sample, bootstrap_input_sample, bootstrap_both_sample]:
+        raise Exception(f'Unknown bootstrap sample function: {sample_func}')
+
+    if rng is not None:
+        rows, cols = None, None
+        if sample_func in [bootstrap_system_sample, bootstrap_both_sample]:
+            rows = rng.integers(0, N, (num_samples, N))
+        if sample_func in [bootstrap_input_sample, bootstrap_both_sample]:
+            cols = rng.integers(0, M, (num_samples, M))
+        return rows, cols
+
+    if sample_func == bootstrap_system_sample:
+        return np.random.choice(N, (num_samples, N), replace=True), None
+    elif sample_func == bootstrap_input_sample:
+        return None, np.random.choice(M, (num_samples, M), replace=True)
+    else:
+        # The rows and columns are sampled in alternating order, so they cannot be drawn with one call
+        rows, cols = np.empty((num_samples, N), dtype=int), np.empty((num_samples, M), dtype=int)
+        for i in range(num_samples):
+            rows[i] = np.random.choice(N, N, replace=True)
+            cols[i] = np.random.choice(M, M, replace=True)
+        return rows, cols
+
+
+def _take_samples(matrix: np.ndarray, rows: Optional[np.ndarray], cols: Optional[np.ndarray]) -> np.ndarray:
+    """
+    Indexes `matrix` with the sampled `rows` and `cols` to create a (num_samples, N, M) tensor of samples.
+    """
+    if rows is not None and cols is not None:
+        return matrix[rows[:, :, None], cols[:, None, :]]
+    elif rows is not None:
+        return matrix[rows]
+    else:
+        return matrix[:, cols].transpose(1, 0, 2)
+
+
+def _rank_rows(A: np.ndarray) -> np.ndarray:
+    """
+    Ranks the values in every row of `A` independently, assigning tied values their average rank (the same as
+    `scipy.stats.rankdata`). NaNs are not ranked and remain NaN.
+    """
+    R, L = A.shape
+    order = np.argsort(A, axis=1, kind='mergesort')
+    A_sorted = np.take_along_axis(A, order, axis=1)
+
+    # Every group of tied values gets the average of its positions. NaNs are sorted to the end of the row
+    # and never equal to each other, so they do not affect the ranks of the other values.
+    is_start = np.ones((R, L), dtype=bool)
+    is_start[:, 1:] = A_sorted[:, 1:] != A_sorted[:, :-1]
+    is_start = is_start.ravel()
+    group_ids = np.cumsum(is_start) - 1
+    first = np.tile(np.arange(L), R)[is_start]
+    counts = np.bincount(group_ids)
+    ranks_sorted = (first + (counts - 1) / 2 + 1)[group_ids].reshape(R, L)
+
+    ranks = np.empty((R, L))
+    np.put_along_axis(ranks, order, ranks_sorted, axis=1)
+    ranks[np.isnan(A)] = np.nan
+    return ranks
+
+
+def _pearson_rows(X: np.ndarray, Y: np.ndarray) -> np.ndarray:
+    """
+    Calculates the Pearson correlation between every pair of rows in X and Y, ignoring NaNs (which must be in
+    parallel positions). Rows with fewer than 2 values or constant values have a NaN correlation, matching
+    `scipy.stats.pearsonr`.
+    """
+    mask = ~np.isnan(X)
+    n = mask.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        X_c = np.where(mask, X - (np.where(mask, X, 0).sum(axis=1) / n)[:, None], 0)
+        Y_c = np.where(mask, Y - (np.where(mask, Y, 0).sum(axis=1) / n)[:, None], 0)
+        r = (X_c * Y_c).sum(axis=1) / np.sqrt((X_c ** 2).sum(axis=1) * (Y_c ** 2).sum(axis=1))
+    r = np.clip(r, -1.0, 1.0)
+
+    # The centered values of a constant row may not be exactly 0 because of floating point error, so the
+    # constant rows are explicitly detected
+    constant = (np.where(mask, X, np.inf).min(axis=1) == np.where(mask, X, -np.inf).max(axis=1)) | \
+               (np.where(mask, Y, np.inf).min(axis=1) == np.where(mask, Y, -np.inf).max(axis=1))
+    r[constant | (n < 2)] = np.nan
+    return r
+
+
+def _dense_rank_rows(A: np.ndarray) -> np.ndarray:
+    """
+    Converts the values in every row of `A` to dense integer ranks 0, 1, 2, ... in which tied values have the
+    same rank. NaNs are assigned the rank L, which is larger than every other rank.
+    """
+    R, L = A.shape
+    order = np.argsort(A, axis=1, kind='mergesort')
+    A_sorted = np.take_along_axis(A, order, axis=1)
+    is_start = np.ones((R, L), dtype=bool)
+    is_start[:, 1:] = A_sorted[:, 1:] != A_sorted[:, :-1]
+
+    ranks = np.empty((R, L), dtype=np.int64)
+    np.put_along_axis(ranks, order, np.cumsum(is_start, axis=1) - 1, axis=1)
+    ranks[np.isnan(A)] = L
+    return ranks
+
+
+def _tied_pairs_rows(keys: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """
+    Counts the number of pairs of non-negative integer `keys` in every row which are equal, ignoring the
+    entries which are not in `mask`.
+    """
+    R, L = keys.shape
+    rows = np.broadcast_to(np.arange(R)[:, None], (R, L))[mask]
+    # Offset the keys by row so that a single call to unique can count the group sizes of every row
+    unique_keys, counts = np.unique(rows * (keys.max() + 1) + keys[mask], return_counts=True)
+    return np.bincount(unique_keys // (keys.max() + 1), weights=counts * (counts - 1) // 2, minlength=R)
+
+
+def _count_inversions_rows(A: np.ndarray) -> np.ndarray:
+    """
+    Counts the number of pairs i < j with A[i] > A[j] in every row of the non-negative integer matrix `A` using a
+    bottom-up merge sort which processes every row at the same time.
+    """
+    R, L = A.shape
+    size = 1 << max(0, (L - 1).bit_length())
+    # The padding is larger than every value and comes at the end of the row, so it does not add any inversions
+    pad = int(A.max()) + 1 if A.size > 0 else 1
+    A = np.pad(A, ((0, 0), (0, size - L)), constant_values=pad)
+
+    inversions = np.zeros(R, dtype=np.int64)
+    width = 1
+    while width < size:
+        num_runs = size // (2 * width)
+        runs = A.reshape(R, num_runs, 2, width)
+        # Every run of `width` values is sorted. Offsetting the left runs by their index makes all of them one
+        # sorted array, so the number of values in the left run which are <= each value in the right run can be
+        # found with one searchsorted call
+        offsets = np.arange(R * num_runs).reshape(R, num_runs, 1)
+        left = (runs[:, :, 0, :] + offsets * (pad + 1)).ravel()
+        right = (runs[:, :, 1, :] + offsets * (pad + 1)).ravel()
+        num_less_equal = np.searchsorted(left, right, side='right').reshape(R, num_runs, width) - offsets * width
+        inversions += (width - num_less_equal).sum(axis=(1, 2))
+
+        A = np.sort(runs.reshape(R, num_runs, 2 * width), axis=2).reshape(R, size)
+        width *= 2
+    return inversions
+
+
+def _kendall_rows(X: np.ndarray, Y: np.ndarray) -> np.ndarray:
+    """
+    Calculates Kendall's tau-b between every pair of rows in X and Y, ignoring NaNs (which must be in parallel
+    positions), with the same tie handling as `scipy.stats.kendalltau`. The discordant pairs are counted with an
+    O(n log n) merge sort. Rows with fewer than 2 values or constant values have a NaN correlation.
+    """
+    R, L = X.shape
+    mask = ~np.isnan(X)
+    n = mask.sum(axis=1)
+    X_ranks, Y_ranks = _dense_rank_rows(X), _dense_rank_rows(Y)
+
+    # After sorting by X and then Y, the discordant pairs are exactly the inversions of Y. NaNs have the largest
+    # ranks, so they are sorted to the end and do not create any inversions
+    order = np.lexsort((Y_ranks, X_ranks), axis=-1)
+    discordant = _count_inversions_rows(np.take_along_axis(Y_ranks, order, axis=1))
+
+    x_ties = _tied_pairs_rows(X_ranks, mask)
+    y_ties = _tied_pairs_rows(Y_ranks, mask)
+    joint_ties = _tied_pairs_rows(X_ranks * (L + 1) + Y_ranks, mask)
+    total = n * (n - 1) // 2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        con_minus_dis = total - x_ties - y_ties + joint_ties - 2 * discordant
+        tau = con_minus_dis / np.sqrt(total - x_ties) / np.sqrt(total - y_ties)
+    tau = np.clip(tau, -1.0, 1.0)
+    tau[(x_ties == total) | (y_ties == total) | (n < 2)] = np.nan
+    return tau
+
+
+def _corr_rows(corr_func: CorrFunc, X: np.ndarray, Y: np.ndarray) -> np.ndarray:
+    if corr_func in [kendalltau, fast_kendalltau]:
+        return _kendall_rows(X, Y)
+    if corr_func == spearmanr:
+        X, Y = _rank_rows(X), _rank_rows(Y)
+    return _pearson_rows(X, Y)
+
+
+_VECTORIZED_CORR_FUNCS = [pearsonr, spearmanr, kendalltau, fast_kendalltau]
+
+
+def _is_vectorizable(corr_func: SummaryCorrFunc) -> bool:
+    """
+    Checks whether `corr_func` is one of the system-, summary- or global-level correlations with a correlation
+    function that the vectorized implementation supports.
+    """
+    return isinstance(corr_func, functools.partial) and \
+        corr_func.func in [summary_level_corr, system_level_corr, global_corr] and \
+        len(corr_func.args) == 1 and \
+        corr_func.args[0] in _VECTORIZED_CORR_FUNCS and \
+        set(corr_func.keywords.keys()) <= {'silent'}
+
+
+def _vectorized_corr(corr_func: SummaryCorrFunc, X_s: np.ndarray, Y_s: np.ndarray) -> np.ndarray:
+    """
+    Calculates the correlation for every sample in the (num_samples, N, M) tensors `X_s` and `Y_s`. The correlation
+    for a sample will be NaN in the same cases that `corr_func` returns None.
+    """
+    S, N, M = X_s.shape
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore')
+
+        if corr_func.func == global_corr:
+            return _corr_rows(corr_func.args[0], X_s.reshape(S, N * M), Y_s.reshape(S, N * M))
+        elif corr_func.func == system_level_corr:
+            x, y = np.nanmean(X_s, axis=2), np.nanmean(Y_s, axis=2)
+            r = _corr_rows(corr_func.args[0], x, y)
+            # A system without any scores would make the system-level correlation NaN
+            r[np.isnan(x).any(axis=1) | np.isnan(y).any(axis=1)] = np.nan
+            return r
+        elif corr_func.func == summary_level_corr:
+            x = X_s.transpose(0, 2, 1).reshape(S * M, N)
+            y = Y_s.transpose(0, 2, 1).reshape(S * M, N)
+            r = _corr_rows(corr_func.args[0], x, y).reshape(S, M)
+            return np.nanmean(r, axis=1)
+        else:
+            raise Exception(f'Unknown summary correlation function {corr_func.func}')
+
+
+def _none_to_nan(r: Optional[float]) -> float:
+    return np.nan if r is None else r
+
+
+def _sample_correlations(corr_func: SummaryCorrFunc,
+                         X: np.ndarray,
+                         Y: np.ndarray,
+                         rows: Optional[np.ndarray],
+                         cols: Optional[np.ndarray],
+                         vectorized: bool,
+                         batch_size: int) -> np.ndarray:
+    """
+    Calculates the correlation for every bootstrap sample defined by `rows` and `cols` (see `_bootstrap_indices`).
+    The correlation will be NaN for the samples for which `corr_func` returns None. If `vectorized` is True and
+    `corr_func` is supported, the correlations are computed with array operations, `batch_size` samples at a time.
+    """
+    X, Y = X.astype(float), Y.astype(float)
+    num_samples = len(rows) if rows is not None else len(cols)
+    if vectorized and _is_vectorizable(corr_func):
+        correlations = []
+        for start in range(0, num_samples, batch_size):
+            batch_rows = rows[start:start + batch_size] if rows is not None else None
+            batch_cols = cols[start:start + batch_size] if cols is not None else None
+            X_s = _take_samples(X, batch_rows, batch_cols)
+            Y_s = _take_samples(Y, batch_rows, batch_cols)
+            correlations.append(_vectorized_corr(corr_func, X_s, Y_s))
+        return np.concatenate(correlations)
+
+    correlations = np.empty(num_samples)
+    for i in range(num_samples):
+        sample_rows = rows[i:i + 1] if rows is not None else None
+        sample_cols = cols[i:i + 1] if cols is not None else None
+        r = corr_func(_take_samples(X, sample_rows, sample_cols)[0], _take_samples(Y, sample_rows, sample_cols)[0])
+        correlations[i] = _none_to_nan(r)
+    return correlations
+
+
+def _split_into_blocks(num_samples: int, batch_size: int) -> List[Tuple[int, np.random.SeedSequence]]:
+    """
+    Splits `num_samples` resamples into blocks of at most `batch_size` for parallel processing. Each block gets its
+    own independent random stream spawned from a root `SeedSequence`. The root entropy is drawn from the global
+    numpy random state, so the blocks are reproducible with `np.random.seed` and independent of the number of jobs.
+    """
+    root = np.random.SeedSequence(np.random.randint(2 ** 32))
+    sizes = [min(batch_size, num_samples - start) for start in range(0, num_samples, batch_size)]
+    return list(zip(sizes, root.spawn(len(sizes))))
+
+
+# Custom sample and permutation functions draw from the global numpy random state, which is shared by all of
+# the threads of a pool, so only one block can use it at a time
+_GLOBAL_RANDOM_STATE_LOCK = threading.Lock()
+
+
+def _call_with_seed(func: Callable, args: Tuple, num_calls: int, seed_sequence: np.random.SeedSequence) -> List:
+    """
+    Calls `func(*args)` `num_calls` times with the global numpy random state seeded from `seed_sequence`, so that
+    a custom sample or permutation function draws from the block's own random stream. The global random state is
+    restored afterward.
+    """
+    with _GLOBAL_RANDOM_STATE_LOCK:
+        state = np.random.get_state()
+        np.random.seed(seed_sequence.generate_state(4))
+        try:
+            return [func(*args) for _ in range(num_calls)]
+        finally:
+            np.random.set_state(state)
+
+
+def _parallel_map(func: Callable, args_list: List[Tuple], n_jobs: int, backend: str) -> List:
+    """
+    Runs `func` on every tuple of arguments in `args_list` across a pool of `n_jobs` workers and returns
+    the results in order. `backend` can be "process" or "thread".
+    """
+    if backend == 'process':
+        executor = ProcessPoolExecutor(max_workers=n_jobs)
+    elif backend == 'thread':
+        executor = ThreadPoolExecutor(max_workers=n_jobs)
+    else:
+        raise Exception(f'Unknown parallel backend: {backend}')
+
+    with executor:
+        futures = [executor.submit(func, *args) for args in args_list]
+        return [future.result() for future in futures]
+
+
+def _bootstrap_ci_block(corr_func: SummaryCorrFunc,
+                        X: np.ndarray,
+                        Y: np.ndarray,
+                        sample_func: Callable,
+                        num_samples: int,
+                        seed_sequence: np.random.SeedSequence,
+                        vectorized: bool,
+                        batch_size: int) -> np.ndarray:
+    if sample_func not in [bootstrap_system_sample, bootstrap_input_sample, bootstrap_both_sample]:
+        samples = _call_with_seed(sample_func, (X, Y), num_samples, seed_sequence)
+        return np.array([_none_to_nan(corr_func(x, y)) for x, y in samples], dtype=float)
+
+    rng = np.random.default_rng(seed_sequence)
+    rows, cols = _bootstrap_indices(sample_func, X.shape[0], X.shape[1], num_samples, rng=rng)
+    return _sample_correlations(corr_func, X, Y, rows, cols, vectorized, batch_size)
+
+
 def bootstrap_ci(corr_func: SummaryCorrFunc,
                  X: np.ndarray,
                  Y: np.ndarray,
@@ -217,21 +594,47 @@ def bootstrap_ci(corr_func: SummaryCorrFunc,
                  alpha: float = 0.05,
                  num_samples: int = 1000,
                  return_sample_correlations: bool = False,
+                 vectorized: bool = True,
+                 batch_size: int = 100,
+                 n_jobs: int = 1,
+                 backend: str = 'process',
                  ) -> Tuple[float, float]:
     """
     Calculates a bootstrap-based confidence interval using the correlation function and X and Y. The `corr_func` should
     be the system-, summary- or global level correlations with a Pearson, Spearman, or Kendall function passed as its
     first argument. `sample_func` is the bootstrapping sample function that should be used to take the subsamples.
     The lower and upper bounds for the (1-alpha)*100% confidence interval will be returned (i.e., alpha / 2 in each tail).
+
+    If `vectorized` is True and the correlation and sample functions are supported, all of the bootstrap samples
+    are drawn at once and their correlations are computed with array operations, `batch_size` samples at a time.
+    The result is the same as the non-vectorized version for a fixed random seed.
+
+    If `n_jobs` is greater than 1, the samples are split into blocks of `batch_size` which are processed by
+    a pool of `n_jobs` workers (see `_parallel_map`), each block with its own random stream. The result is then
+    reproducible for a fixed random seed, but it will not be the same as with `n_jobs=1`. A custom `sample_func`
+    draws from the global numpy random state, so it is called once per sample with the global state reseeded from
+    the block's random stream. Only one block of a thread pool can draw its samples at a time.
     """
     assert X.shape == Y.shape
-    samples = []
-    for _ in range(num_samples):
-        x, y = sample_func(X, Y)
-        r = corr_func(x, y)
-        if r is not None:
-            # Value is ignored if it is NaN
-            samples.append(r)
+    if n_jobs > 1:
+        blocks = _split_into_blocks(num_samples, batch_size)
+        args_list = [(corr_func, X, Y, sample_func, size, seed_sequence, vectorized, batch_size)
+                     for size, seed_sequence in blocks]
+        correlations = np.concatenate(_parallel_map(_bootstrap_ci_block, args_list, n_jobs, backend))
+        samples = correlations[~np.isnan(correlations)].tolist()
+    elif vectorized and _is_vectorizable(corr_func) and \
+            sample_func in [bootstrap_system_sample, bootstrap_input_sample, bootstrap_both_sample]:
+        rows, cols = _bootstrap_indices(sample_func, X.shape[0], X.shape[1], num_samples)
+        correlations = _sample_correlations(corr_func, X, Y, rows, cols, vectorized, batch_size)
+        samples = correlations[~np.isnan(correlations)].tolist()
+    else:
+        samples = []
+        for _ in range(num_samples):
+            x, y = sample_func(X, Y)
+            r = corr_func(x, y)
+            if r is not None:
+                # Value is ignored if it is NaN
+                samples.append(r)
     lower = np.percentile(samples, alpha / 2 * 100)
     upper = np.percentile(samples, (1.0 - alpha / 2) * 100)
     output = (lower, upper)
@@ -270,14 +673,14 @@ def fisher_ci(corr_func: SummaryCorrFunc,
     # The Fisher transformation has constants that depend on the correlation coefficient being used. Inspecting
     # the correlation function is kind of hacky, but it works.
     assert len(corr_func.args) == 1
-    assert corr_func.args[0] in [pearsonr, spearmanr, kendalltau]
+    assert corr_func.args[0] in [pearsonr, spearmanr, kendalltau, fast_kendalltau]
 
     r = corr_func(X, Y)
     if corr_func.args[0] == pearsonr:
         b, c = 3, 1
     elif corr_func.args[0] == spearmanr:
         b, c = 3, np.sqrt(1 + r ** 2 / 2)
-    elif corr_func.args[0] == kendalltau:
+    elif corr_func.args[0] in [kendalltau, fast_kendalltau]:
         b, c = 4, np.sqrt(.437)
     else:
         raise Exception(f'Unexpected correlation function: {corr_func.args[0]}')
@@ -379,6 +782,26 @@ def permute_both(X: np.ndarray, Y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
     return X_p, Y_p
 
 
+def _bootstrap_diff_block(corr_func: SummaryCorrFunc,
+                          X: np.ndarray,
+                          Y: np.ndarray,
+                          Z: np.ndarray,
+                          sample_func: Callable,
+                          num_samples: int,
+                          seed_sequence: np.random.SeedSequence,
+                          vectorized: bool,
+                          batch_size: int) -> np.ndarray:
+    if sample_func not in [bootstrap_system_sample, bootstrap_input_sample, bootstrap_both_sample]:
+        samples = _call_with_seed(sample_func, (X, Y, Z), num_samples, seed_sequence)
+        return np.array([_none_to_nan(corr_func(X_i, Z_i)) - _none_to_nan(corr_func(Y_i, Z_i))
+                         for X_i, Y_i, Z_i in samples], dtype=float)
+
+    rng = np.random.default_rng(seed_sequence)
+    rows, cols = _bootstrap_indices(sample_func, X.shape[0], X.shape[1], num_samples, rng=rng)
+    return _sample_correlations(corr_func, X, Z, rows, cols, vectorized, batch_size) - \
+        _sample_correlations(corr_func, Y, Z, rows, cols, vectorized, batch_size)
+
+
 def bootstrap_diff_test(corr_func: SummaryCorrFunc,
                         X: np.ndarray,
                         Y: np.ndarray,
@@ -387,11 +810,19 @@ def bootstrap_diff_test(corr_func: SummaryCorrFunc,
                         two_tailed: bool,
                         num_samples: int = 1000,
                         return_test_statistic: bool = False,
-                        return_deltas: bool = False) -> float:
+                        return_deltas: bool = False,
+                        vectorized: bool = True,
+                        batch_size: int = 100,
+                        n_jobs: int = 1,
+                        backend: str = 'process') -> float:
     """
     Calculates a p-value using a paired bootstrap test. If `return_test_statistic` is True, the original delta
     is returned. If `return_deltas` is True, all of the non-NaN bootstrap sample deltas are returned. A one-tailed
     test will calculate a p-value for corr(X, Z) > corr(Y, Z)
+
+    `vectorized`, `batch_size`, `n_jobs` and `backend` control how the samples are computed. See `bootstrap_ci`.
+    The vectorized version counts a delta within 1e-12 of twice the original delta as a tie (see
+    `permutation_diff_test`).
     """
     delta_orig = corr_func(X, Z) - corr_func(Y, Z)
     if two_tailed:
@@ -400,28 +831,60 @@ def bootstrap_diff_test(corr_func: SummaryCorrFunc,
         # of the deltas
         delta_orig = abs(delta_orig)
 
-    deltas = []
-    count = 0
-    successful_trials = 0
-    for _ in range(num_samples):
-        X_i, Y_i, Z_i = sample_func(X, Y, Z)
-        try:
-            delta = corr_func(X_i, Z_i) - corr_func(Y_i, Z_i)
-            if two_tailed:
-                delta = abs(delta)
+    is_vectorized = vectorized and _is_vectorizable(corr_func)
+    if n_jobs > 1 or (is_vectorized and
+                      sample_func in [bootstrap_system_sample, bootstrap_input_sample, bootstrap_both_sample]):
+        if n_jobs > 1:
+            blocks = _split_into_blocks(num_samples, batch_size)
+            args_list = [(corr_func, X, Y, Z, sample_func, size, seed_sequence, vectorized, batch_size)
+                         for size, seed_sequence in blocks]
+            deltas = np.concatenate(_parallel_map(_bootstrap_diff_block, args_list, n_jobs, backend))
+        else:
+            rows, cols = _bootstrap_indices(sample_func, X.shape[0], X.shape[1], num_samples)
+            deltas = _sample_correlations(corr_func, X, Z, rows, cols, vectorized, batch_size) - \
+                _sample_correlations(corr_func, Y, Z, rows, cols, vectorized, batch_size)
 
-            # The pseudocode for this in "An Empirical Investigation of Statistical Significance in NLP" in
-            # Berg-Kirkpatrick et al. (2012) shows delta > 2 * delta_orig. I think the only time it really matters
-            # if it's > or >= is if the two score matrices are identical. If they are the same, delta_orig is 0
-            # and every delta would be 0. Using > would mean the count never gets incremented, resulting in a p-value
-            # of 0, which is not correct. Using >= would mean the count gets incremented every time, resulting in a
-            # p-value of 1, which is correct.
-            if delta >= 2 * delta_orig:
-                count += 1
-            successful_trials += 1
-            deltas.append(delta)
-        except TypeError:
-            pass
+        # Samples with a NaN correlation are skipped
+        deltas = deltas[~np.isnan(deltas)]
+        if two_tailed:
+            deltas = np.abs(deltas)
+        # See the note about >= versus > below. The vectorized deltas are computed with a different implementation
+        # than `corr_func`, so the original delta is recomputed with the same implementation and the deltas which
+        # tie with it up to floating point error are counted, like in `permutation_diff_test`
+        if is_vectorized:
+            X_f, Y_f, Z_f = X.astype(float), Y.astype(float), Z.astype(float)
+            threshold = _vectorized_corr(corr_func, X_f[None], Z_f[None])[0] - \
+                _vectorized_corr(corr_func, Y_f[None], Z_f[None])[0]
+            if two_tailed:
+                threshold = abs(threshold)
+            count = int(((deltas >= 2 * threshold) | np.isclose(deltas, 2 * threshold, rtol=0, atol=1e-12)).sum())
+        else:
+            count = int((deltas >= 2 * delta_orig).sum())
+        successful_trials = len(deltas)
+        deltas = deltas.tolist()
+    else:
+        deltas = []
+        count = 0
+        successful_trials = 0
+        for _ in range(num_samples):
+            X_i, Y_i, Z_i = sample_func(X, Y, Z)
+            try:
+                delta = corr_func(X_i, Z_i) - corr_func(Y_i, Z_i)
+                if two_tailed:
+                    delta = abs(delta)
+
+                # The pseudocode for this in "An Empirical Investigation of Statistical Significance in NLP" in
+                # Berg-Kirkpatrick et al. (2012) shows delta > 2 * delta_orig. I think the only time it really matters
+                # if it's > or >= is if the two score matrices are identical. If they are the same, delta_orig is 0
+                # and every delta would be 0. Using > would mean the count never gets incremented, resulting in a
+                # p-value of 0, which is not correct. Using >= would mean the count gets incremented every time,
+                # resulting in a p-value of 1, which is correct.
+                if delta >= 2 * delta_orig:
+                    count += 1
+                successful_trials += 1
+                deltas.append(delta)
+            except TypeError:
+                pass
     pvalue = count / successful_trials
 
     output = (pvalue,)
@@ -439,6 +902,73 @@ def standardize(X: np.ndarray) -> np.ndarray:
     return (X - np.nanmean(X)) / np.nanstd(X)
 
 
+def _permutation_mask(permute_func: Callable,
+                      num_permutations: int,
+                      N: int,
+                      M: int,
+                      rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Draws the swap masks for `num_permutations` permutations at once. If `rng` is None, the random numbers are
+    drawn from the global numpy random state in exactly the same order as calling `permute_func`
+    `num_permutations` times. Otherwise, they are drawn from `rng`. The mask will be broadcastable to
+    (num_permutations, N, M).
+    """
+    if permute_func == permute_both:
+        dims = (num_permutations, N, M)
+    elif permute_func == permute_systems:
+        dims = (num_permutations, N, 1)
+    elif permute_func == permute_inputs:
+        dims = (num_permutations, 1, M)
+    else:
+        raise Exception(f'Unknown permutation function: {permute_func}')
+
+    if rng is None:
+        return random_bool_mask(*dims)
+    return rng.random(dims) > 0.5
+
+
+def _permutation_deltas(corr_func: SummaryCorrFunc,
+                        X: np.ndarray,
+                        Y: np.ndarray,
+                        Z: np.ndarray,
+                        mask: np.ndarray,
+                        vectorized: bool) -> np.ndarray:
+    """
+    Calculates corr(X_p, Z) - corr(Y_p, Z) for every permutation in `mask` (see `_permutation_mask`). If
+    `vectorized` is True and `corr_func` is supported, all of the permutations are evaluated with array operations.
+    """
+    if vectorized and _is_vectorizable(corr_func):
+        X_p = np.where(mask, Y, X)
+        Y_p = np.where(mask, X, Y)
+        Z_p = np.broadcast_to(Z, X_p.shape)
+        return _vectorized_corr(corr_func, X_p, Z_p) - _vectorized_corr(corr_func, Y_p, Z_p)
+
+    deltas = np.empty(len(mask))
+    for i in range(len(mask)):
+        X_p = np.where(mask[i], Y, X)
+        Y_p = np.where(mask[i], X, Y)
+        deltas[i] = corr_func(X_p, Z) - corr_func(Y_p, Z)
+    return deltas
+
+
+def _permutation_block(corr_func: SummaryCorrFunc,
+                       X: np.ndarray,
+                       Y: np.ndarray,
+                       Z: np.ndarray,
+                       permute_func: Callable,
+                       num_permutations: int,
+                       seed_sequence: np.random.SeedSequence,
+                       vectorized: bool) -> np.ndarray:
+    if permute_func not in [permute_both, permute_systems, permute_inputs]:
+        permutations = _call_with_seed(permute_func, (X, Y), num_permutations, seed_sequence)
+        return np.array([_none_to_nan(corr_func(X_p, Z)) - _none_to_nan(corr_func(Y_p, Z))
+                         for X_p, Y_p in permutations], dtype=float)
+
+    rng = np.random.default_rng(seed_sequence)
+    mask = _permutation_mask(permute_func, num_permutations, X.shape[0], X.shape[1], rng=rng)
+    return _permutation_deltas(corr_func, X, Y, Z, mask, vectorized)
+
+
 def permutation_diff_test(corr_func: SummaryCorrFunc,
                           X: np.ndarray,
                           Y: np.ndarray,
@@ -447,11 +977,26 @@ def permutation_diff_test(corr_func: SummaryCorrFunc,
                           two_tailed: bool,
                           num_permutations: int = 1000,
                           return_test_statistic: bool = False,
-                          return_deltas: bool = False) -> float:
+                          return_deltas: bool = False,
+                          vectorized: bool = False,
+                          batch_size: int = 100,
+                          n_jobs: int = 1,
+                          backend: str = 'process') -> float:
     """
     Calculates a p-value based on a permutation test. If `return_test_statistic` is True, the original detal will
     be returned. If `return_deltas` is True, all of the resampled deltas will be returned. A one-tailed test will
     calculate a p-value for corr(X, Z) > corr(Y, Z)
+
+    If `vectorized` is True and the correlation and permutation functions are supported, the permutation masks
+    are generated as one boolean tensor and the deltas are computed with array operations, `batch_size`
+    permutations at a time. The permutations are the same as the non-vectorized version for a fixed random seed,
+    but the deltas are only equal up to floating point error. Rank-based correlations often tie with the original
+    delta, so the vectorized version counts a delta within 1e-12 of the original delta as a tie. The
+    non-vectorized version compares the deltas exactly, so its p-value can be slightly smaller when there are
+    ties. For this reason, the vectorized version is not enabled by default.
+
+    If `n_jobs` is greater than 1, the permutations are split into blocks of `batch_size` which are processed
+    by a pool of `n_jobs` workers. See `bootstrap_ci`.
     """
     # The data needs to be standardized so the metrics are on the same scale. It doesn't matter
     # if we standardize Z because Pearson will first standardize it, Spearman/Kendall will rank it
@@ -465,18 +1010,55 @@ def permutation_diff_test(corr_func: SummaryCorrFunc,
         # of the deltas
         delta_orig = abs(delta_orig)
 
-    deltas = []
-    count = 0
-    for _ in range(num_permutations):
-        X_p, Y_p = permute_func(X, Y)
-        delta = corr_func(X_p, Z) - corr_func(Y_p, Z)
+    is_vectorized = vectorized and _is_vectorizable(corr_func)
+    if n_jobs > 1 or (is_vectorized and permute_func in [permute_both, permute_systems, permute_inputs]):
+        X, Y, Z = X.astype(float), Y.astype(float), Z.astype(float)
+        if n_jobs > 1:
+            blocks = _split_into_blocks(num_permutations, batch_size)
+            args_list = [(corr_func, X, Y, Z, permute_func, size, seed_sequence, vectorized)
+                         for size, seed_sequence in blocks]
+            deltas = np.concatenate(_parallel_map(_permutation_block, args_list, n_jobs, backend))
+        else:
+            N, M = X.shape
+            deltas = []
+            for start in range(0, num_permutations, batch_size):
+                size = min(batch_size, num_permutations - start)
+                mask = _permutation_mask(permute_func, size, N, M)
+                deltas.append(_permutation_deltas(corr_func, X, Y, Z, mask, vectorized))
+            deltas = np.concatenate(deltas)
+
+        # The original delta is recomputed with the same implementation as the permutations so that a
+        # permutation which does not swap anything has exactly the same delta
+        if is_vectorized:
+            threshold = _vectorized_corr(corr_func, X[None], Z[None])[0] - \
+                _vectorized_corr(corr_func, Y[None], Z[None])[0]
+        else:
+            threshold = corr_func(X, Z) - corr_func(Y, Z)
         if two_tailed:
-            delta = abs(delta)
+            threshold = abs(threshold)
+            deltas = np.abs(deltas)
+
+        # See note about >= versus > in bootstrap_diff_test. Rank-based correlations take a small number of
+        # distinct values, so permutations often tie with the original delta. The vectorized ties are only equal
+        # up to floating point error, so they are explicitly counted (see the docstring)
+        if is_vectorized:
+            count = int(((deltas >= threshold) | np.isclose(deltas, threshold, rtol=0, atol=1e-12)).sum())
+        else:
+            count = int((deltas >= threshold).sum())
+        deltas = deltas.tolist()
+    else:
+        deltas = []
+        count = 0
+        for _ in range(num_permutations):
+            X_p, Y_p = permute_func(X, Y)
+            delta = corr_func(X_p, Z) - corr_func(Y_p, Z)
+            if two_tailed:
+                delta = abs(delta)
 
-        # See note about >= versus > in bootstrap_diff_test
-        if delta >= delta_orig:
-            count += 1
-        deltas.append(delta)
+            # See note about >= versus > in bootstrap_diff_test
+            if delta >= delta_orig:
+                count += 1
+            deltas.append(delta)
     pvalue = (count + 1) / (num_permutations + 1)  # +1 for the original delta
 
     output = (pvalue,)
@@ -7,6 +7,7 @@ import unittest
 from sacrerouge.common import TemporaryDirectory
 from sacrerouge.common.testing import MULTILING_METRICS
 from sacrerouge.common.testing.util import sacrerouge_command_exists
+from sacrerouge.data import MetricsTable
 
 
 class TestCorrelate(unittest.TestCase):
@@ -211,3 +212,20 @@ class TestCorrelate(unittest.TestCase):
             subprocess.run(command, check=True)
             assert os.path.exists(system_plot_file)
             assert os.path.exists(global_plot_file)
+
+    def test_correlate_npz(self):
+        # The binary format should give the same correlations as the jsonl file
+        with TemporaryDirectory() as temp_dir:
+            MetricsTable.from_jsonl(MULTILING_METRICS).save_npz(f'{temp_dir}/metrics.npz')
+            for metrics_file, output_file in [(MULTILING_METRICS, 'jsonl.json'), (f'{temp_dir}/metrics.npz', 'npz.json')]:
+                command = [
+                    'python', '-m', 'sacrerouge', 'correlate',
+                    '--metrics-jsonl-files', metrics_file,
+                    '--metrics', 'rouge-1_jk_precision', 'grade',
+                    '--summarizer-type', 'all',
+                    '--confidence-interval-method', 'none',
+                    '--output-file', f'{temp_dir}/{output_file}',
+                    '--silent'
+                ]
+                subprocess.run(command, check=True)
+            assert json.load(open(f'{temp_dir}/jsonl.json', 'r')) == json.load(open(f'{temp_dir}/npz.json', 'r'))
@@ -0,0 +1,113 @@
+import numpy as np
+import unittest
+from subprocess import PIPE, Popen
+
+from sacrerouge.commands.correlate import merge_metrics
+from sacrerouge.commands.merge_scores import merge_score_files
+from sacrerouge.common import TemporaryDirectory
+from sacrerouge.common.testing import FIXTURES_ROOT, MULTILING_METRICS
+from sacrerouge.common.testing.util import sacrerouge_command_exists
+from sacrerouge.data import Metrics, MetricsTable
+from sacrerouge.io import JsonlReader, JsonlWriter
+
+_config_file_path = f'{FIXTURES_ROOT}/configs/score.json'
+
+
+class TestMergeScores(unittest.TestCase):
+    def test_command_exists(self):
+        assert sacrerouge_command_exists(['merge-scores'])
+
+    def test_merge_score_files(self):
+        with TemporaryDirectory() as temp_dir:
+            with JsonlWriter(f'{temp_dir}/a.jsonl') as out:
+                out.write(Metrics('i2', 's1', 'peer', {'a': 1}))
+                out.write(Metrics('i1', 's2', 'peer', {'a': 2, 'b': 3}))
+                out.write(Metrics('i1', 's1', 'reference', {'a': 4}))
+            with JsonlWriter(f'{temp_dir}/b.jsonl') as out:
+                out.write(Metrics('i1', 's2', 'peer', {'b': 5, 'c': 6}))
+                out.write(Metrics('i3', 's1', 'peer', {'a': 7}))
+
+            input_files = [f'{temp_dir}/a.jsonl', f'{temp_dir}/b.jsonl']
+            expected = merge_metrics(JsonlReader(input_files[0], Metrics).read() +
+                                     JsonlReader(input_files[1], Metrics).read())
+            expected = sorted(expected, key=lambda metrics: (metrics.instance_id, metrics.summarizer_id))
+
+            # Use small runs so that the external merge is exercised
+            num_records = merge_score_files(input_files, f'{temp_dir}/merged.jsonl', f'{temp_dir}/merged.npz',
+                                            max_records_in_memory=2)
+            assert num_records == 4
+            assert JsonlReader(f'{temp_dir}/merged.jsonl', Metrics).read() == expected
+            assert expected[1].metrics == {'a': 2, 'b': 5, 'c': 6}
+
+            table = MetricsTable.from_npz(f'{temp_dir}/merged.npz')
+            np.testing.assert_array_equal(table.to_matrices('b'),
+                                          MetricsTable.from_metrics_list(expected).to_matrices('b'))
+
+            with JsonlWriter(f'{temp_dir}/c.jsonl') as out:
+                out.write(Metrics('i3', 's1', 'reference', {'a': 7}))
+            with self.assertRaises(Exception):
+                merge_score_files(input_files + [f'{temp_dir}/c.jsonl'], f'{temp_dir}/merged.jsonl')
+
+    def test_merge_multiling(self):
+        # Splitting the file into the metrics of each instance in reverse order and merging them should
+        # give back the original (sorted) file
+        metrics_list = JsonlReader(MULTILING_METRICS, Metrics).read()
+        with TemporaryDirectory() as temp_dir:
+            input_files = []
+            instance_ids = sorted(set(metrics.instance_id for metrics in metrics_list), reverse=True)
+            for instance_id in instance_ids:
+                input_files.append(f'{temp_dir}/{instance_id}.jsonl')
+                with JsonlWriter(input_files[-1]) as out:
+                    for metrics in metrics_list:
+                        if metrics.instance_id == instance_id:
+                            out.write(metrics)
+
+            merge_score_files(input_files, f'{temp_dir}/merged.jsonl', max_records_in_memory=7)
+            expected = sorted(merge_metrics(metrics_list),
+                              key=lambda metrics: (metrics.instance_id, metrics.summarizer_id))
+            assert JsonlReader(f'{temp_dir}/merged.jsonl', Metrics).read() == expected
+
+    def test_sharded_score(self):
+        # Scoring every shard and merging them should be identical to scoring everything at once
+        with TemporaryDirectory() as temp_dir:
+            command = [
+                'python', '-m', 'sacrerouge', 'score',
+                '--config', _config_file_path,
+                '--output-jsonl', f'{temp_dir}/metrics.jsonl'
+            ]
+            process = Popen(command, stdout=PIPE, stderr=PIPE)
+            process.communicate()
+            assert process.returncode == 0
+
+            shard_files = []
+            for shard_index in range(3):
+                shard_files.append(f'{temp_dir}/shard-{shard_index}.jsonl')
+                command = [
+                    'python', '-m', 'sacrerouge', 'score',
+                    '--config', _config_file_path,
+                    '--output-jsonl', shard_files[-1],
+                    '--num-shards', '3',
+                    '--shard-index', str(shard_index)
+                ]
+                process = Popen(command, stdout=PIPE, stderr=PIPE)
+                process.communicate()
+                assert process.returncode == 0
+
+            # Every instance should be in exactly one shard
+            shard_instance_ids = [set(metrics.instance_id for metrics in JsonlReader(shard_file, Metrics).read())
+                                  for shard_file in shard_files]
+            assert sum(len(instance_ids) for instance_ids in shard_instance_ids) == \
+                len(set.union(*shard_instance_ids))
+
+            command = [
+                'python', '-m', 'sacrerouge', 'merge-scores',
+                '--input-files', *shard_files,
+                '--output-jsonl', f'{temp_dir}/merged.jsonl'
+            ]
+            process = Popen(command, stdout=PIPE, stderr=PIPE)
+            process.communicate()
+            assert process.returncode == 0
+
+            expected = JsonlReader(f'{temp_dir}/metrics.jsonl', Metrics).read()
+            actual = JsonlReader(f'{temp_dir}/merged.jsonl', Metrics).read()
+            assert expected == actual
@@ -1,12 +1,16 @@
+import os
 import unittest
 from collections import defaultdict
 from subprocess import PIPE, Popen
 
+from sacrerouge.commands.score import score_instance_chunks, score_instances
 from sacrerouge.common import TemporaryDirectory
 from sacrerouge.common.testing import FIXTURES_ROOT, MULTILING_SUMMARIES
 from sacrerouge.common.testing.util import sacrerouge_command_exists
 from sacrerouge.data import Metrics
+from sacrerouge.data.dataset_readers import ReferenceBasedDatasetReader
 from sacrerouge.io import JsonlReader
+from sacrerouge.metrics import PythonRouge
 
 _config_file_path = f'{FIXTURES_ROOT}/configs/score.json'
 _numeric_config_file_path = f'{FIXTURES_ROOT}/configs/evaluate-numeric.json'
@@ -195,4 +199,124 @@ class TestScore(unittest.TestCase):
                   "recall": 20.238095238095237,
                   "f1": 20.318725099601597
                 }
-            }
\ No newline at end of file
+            }
+
+    def test_chunk_size(self):
+        # Scoring in chunks should give the same results as scoring everything at once
+        with TemporaryDirectory() as temp_dir:
+            for output_file, extra_args in [('metrics.jsonl', []),
+                                            ('chunked.jsonl', ['--chunk-size', '7']),
+                                            ('sharded.jsonl', ['--chunk-size', '7', '--num-workers', '2'])]:
+                command = [
+                    'python', '-m', 'sacrerouge', 'score',
+                    '--config', _config_file_path,
+                    '--output-jsonl', f'{temp_dir}/{output_file}'
+                ] + extra_args
+
+                process = Popen(command, stdout=PIPE, stderr=PIPE)
+                process.communicate()
+                assert process.returncode == 0
+
+            expected = JsonlReader(f'{temp_dir}/metrics.jsonl', Metrics).read()
+            key = lambda metrics: (metrics.instance_id, metrics.summarizer_id)
+            for output_file in ['chunked.jsonl', 'sharded.jsonl']:
+                actual = JsonlReader(f'{temp_dir}/{output_file}', Metrics).read()
+                assert sorted(expected, key=key) == sorted(actual, key=key)
+
+    def test_resume(self):
+        class _CrashingRouge(PythonRouge):
+            # Records the summaries it scored and raises an error after `max_calls` calls
+            # `max_calls` does not change the scores, so it is not part of the metric's fingerprint
+            execution_parameters = ['max_calls']
+
+            def __init__(self, max_calls: int, ngram_orders=(1,)):
+                super().__init__(ngram_orders=list(ngram_orders))
+                self._max_calls = max_calls
+                self.num_summaries = 0
+
+            def supports_reference_statistics(self) -> bool:
+                # Makes sure that all of the scoring goes through `score_multi_all`
+                return False
+
+            def score_multi_all(self, summaries_list, references_list):
+                if self._max_calls == 0:
+                    raise Exception('Crashed')
+                self._max_calls -= 1
+                self.num_summaries += sum(len(summaries) for summaries in summaries_list)
+                return super().score_multi_all(summaries_list, references_list)
+
+        reader = ReferenceBasedDatasetReader()
+        instances = reader.read(MULTILING_SUMMARIES)
+        metrics_dicts = score_instances(instances, [PythonRouge(ngram_orders=[1]), PythonRouge(ngram_orders=[2])])
+        expected = [metrics_dicts[instance.instance_id][instance.summarizer_id] for instance in instances]
+
+        with TemporaryDirectory() as temp_dir:
+            output_file = f'{temp_dir}/metrics.jsonl'
+            crashing = _CrashingRouge(2)
+            with self.assertRaises(Exception):
+                score_instance_chunks(reader.read_chunks(MULTILING_SUMMARIES, chunk_size=4),
+                                      [crashing, PythonRouge(ngram_orders=[2])], output_file)
+            assert os.path.exists(f'{output_file}.checkpoint')
+            assert not os.path.exists(output_file)
+            assert crashing.num_summaries > 0
+
+            # Simulate a crash in the middle of writing a line
+            with open(f'{output_file}.checkpoint', 'a') as out:
+                out.write('{"metric": "0-')
+
+            # The checkpoint cannot be resumed with different metric parameters
+            with self.assertRaises(Exception):
+                score_instance_chunks(reader.read_chunks(MULTILING_SUMMARIES, chunk_size=4),
+                                      [_CrashingRouge(-1, ngram_orders=[3]), PythonRouge(ngram_orders=[2])],
+                                      output_file)
+
+            resumed = _CrashingRouge(-1)
+            score_instance_chunks(reader.read_chunks(MULTILING_SUMMARIES, chunk_size=4),
+                                  [resumed, PythonRouge(ngram_orders=[2])], output_file, max_records_in_memory=5)
+            # Only the summaries which were not in the checkpoint should have been scored again
+            everything = _CrashingRouge(-1)
+            score_instances(instances, [everything])
+            assert resumed.num_summaries == everything.num_summaries - crashing.num_summaries
+            assert not os.path.exists(f'{output_file}.checkpoint')
+
+            actual = JsonlReader(output_file, Metrics).read()
+            key = lambda metrics: (metrics.instance_id, metrics.summarizer_id)
+            assert sorted(expected, key=key) == sorted(actual, key=key)
+
+    def test_parallel_metrics(self):
+        # Scoring the metrics in parallel should give exactly the same results as scoring them sequentially
+        reader = ReferenceBasedDatasetReader()
+        instances = reader.read(MULTILING_SUMMARIES)
+        metrics = [PythonRouge(ngram_orders=[1]), PythonRouge(ngram_orders=[2]), PythonRouge(ngram_orders=[3])]
+        expected = score_instances(instances, metrics)
+        expected = [expected[instance.instance_id][instance.summarizer_id] for instance in instances]
+
+        for backend in ['thread', 'process']:
+            actual = score_instances(instances, metrics, max_parallel_metrics=2, parallel_backend=backend)
+            actual = [actual[instance.instance_id][instance.summarizer_id] for instance in instances]
+            assert expected == actual
+            for metrics1, metrics2 in zip(expected, actual):
+                assert list(metrics1.metrics.keys()) == list(metrics2.metrics.keys())
+
+        with TemporaryDirectory() as temp_dir:
+            score_instance_chunks(reader.read_chunks(MULTILING_SUMMARIES, chunk_size=7), metrics,
+                                  f'{temp_dir}/metrics.jsonl', max_parallel_metrics=3)
+            actual = JsonlReader(f'{temp_dir}/metrics.jsonl', Metrics).read()
+            key = lambda metrics: (metrics.instance_id, metrics.summarizer_id)
+            assert sorted(expected, key=key) == sorted(actual, key=key)
+
+    def test_reference_statistics(self):
+        # Jackknifing with the per-reference statistics should give the same results as scoring every
+        # leave-one-out subset of the references separately
+        class _NoStatisticsRouge(PythonRouge):
+            def supports_reference_statistics(self) -> bool:
+                return False
+
+        reader = ReferenceBasedDatasetReader()
+        instances = reader.read(MULTILING_SUMMARIES)
+        for kwargs in [{}, {'ngram_orders': [1, 2, 3], 'compute_rouge_l': True}]:
+            expected = score_instances(instances, [_NoStatisticsRouge(**kwargs)])
+            actual = score_instances(instances, [PythonRouge(**kwargs)])
+            assert expected == actual
+            assert any('python-rouge-1_jk' in metrics.metrics
+                       for metrics_dict in actual.values() for metrics in metrics_dict.values())
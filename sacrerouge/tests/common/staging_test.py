@@ -0,0 +1,38 @@
+import os
+import unittest
+from unittest import mock
+
+from sacrerouge.common import StagingDirectory, TemporaryDirectory
+from sacrerouge.common.staging import get_staging_root, get_staging_times
+
+
+class TestStagingDirectory(unittest.TestCase):
+    def test_staging_directory(self):
+        with TemporaryDirectory() as root:
+            with StagingDirectory('staging-test', root=root) as staging:
+                assert os.path.dirname(staging.path) == root
+                file_path = staging.add_file('a/b/file.txt', 'contents')
+                other_path = staging.add_file(f'{staging.path}/other.txt', 'other')
+                assert file_path == f'{staging.path}/a/b/file.txt'
+                assert other_path == f'{staging.path}/other.txt'
+
+                # The files are written in a batch by `flush`
+                assert not os.path.exists(file_path)
+                staging.flush()
+                assert open(file_path, 'r').read() == 'contents'
+                assert open(other_path, 'r').read() == 'other'
+                assert staging.num_files == 2
+            assert not os.path.exists(staging.path)
+        assert get_staging_times()['staging-test'] >= staging.seconds > 0
+
+    def test_get_staging_root(self):
+        with TemporaryDirectory() as temp_dir:
+            root = f'{temp_dir}/staging'
+            with mock.patch.dict(os.environ, {'SACREROUGE_TMPDIR': root}):
+                assert get_staging_root() == root
+                # The root is created if it does not exist
+                with StagingDirectory('staging-test') as staging:
+                    assert os.path.dirname(staging.path) == root
+
+        with mock.patch.dict(os.environ, {'SACREROUGE_TMPDIR': ''}):
+            assert get_staging_root() in ['/dev/shm', None]
@@ -1,9 +1,46 @@
+import pytest
 import unittest
+from tempfile import TemporaryDirectory
 
-from sacrerouge.common.util import command_exists
+from sacrerouge.common.util import command_exists, get_maven_main_class
+
+_POM = '''<project{namespace}>
+  <build>
+    <plugins>
+      <plugin>
+        <artifactId>exec-maven-plugin</artifactId>
+        <executions>
+          <execution>
+            <id>First</id>
+            <configuration>
+              <mainClass>org.example.First</mainClass>
+            </configuration>
+          </execution>
+          <execution>
+            <id>Second</id>
+            <configuration>
+              <mainClass> org.example.Second </mainClass>
+            </configuration>
+          </execution>
+        </executions>
+      </plugin>
+    </plugins>
+  </build>
+</project>
+'''
 
 
 class TestUtil(unittest.TestCase):
     def test_command_exists(self):
         assert command_exists('python')
         assert not command_exists('asdfasd')
+
+    def test_get_maven_main_class(self):
+        for namespace in ['', ' xmlns="http://maven.apache.org/POM/4.0.0"']:
+            with TemporaryDirectory() as temp_dir:
+                with open(f'{temp_dir}/pom.xml', 'w') as out:
+                    out.write(_POM.format(namespace=namespace))
+                assert get_maven_main_class(temp_dir, 'First') == 'org.example.First'
+                assert get_maven_main_class(temp_dir, 'Second') == 'org.example.Second'
+                with pytest.raises(Exception):
+                    get_maven_main_class(temp_dir, 'Third')
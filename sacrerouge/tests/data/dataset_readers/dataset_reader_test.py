@@ -0,0 +1,20 @@
+import unittest
+
+from sacrerouge.common.testing import MULTILING_SUMMARIES
+from sacrerouge.data.dataset_readers import ReferenceBasedDatasetReader
+
+
+class TestDatasetReader(unittest.TestCase):
+    def test_read_chunks(self):
+        reader = ReferenceBasedDatasetReader()
+        instances = reader.read(MULTILING_SUMMARIES)
+        chunks = list(reader.read_chunks(MULTILING_SUMMARIES, chunk_size=4))
+        assert [len(chunk) for chunk in chunks[:-1]] == [4] * (len(chunks) - 1)
+        assert 0 < len(chunks[-1]) <= 4
+
+        chunked_instances = [instance for chunk in chunks for instance in chunk]
+        assert len(chunked_instances) == len(instances)
+        for expected, actual in zip(instances, chunked_instances):
+            assert expected.instance_id == actual.instance_id
+            assert expected.summarizer_id == actual.summarizer_id
+            assert expected.fields == actual.fields
@@ -0,0 +1,151 @@
+import numpy as np
+import unittest
+
+from sacrerouge.commands.correlate import filter_metrics, merge_metrics
+from sacrerouge.common import TemporaryDirectory
+from sacrerouge.common.testing import MULTILING_METRICS
+from sacrerouge.data import Metrics, MetricsTable
+from sacrerouge.io import JsonlReader, JsonlWriter
+from sacrerouge.stats import convert_to_matrices
+
+
+class TestMetricsTable(unittest.TestCase):
+    def test_from_metrics_list(self):
+        metrics_list = [
+            Metrics('i1', 's1', 'peer', {'a': 1, 'b': {'c': [1, 3]}}),
+            Metrics('i2', 's1', 'peer', {'a': 2}),
+            Metrics('i1', 's2', 'reference', {'a': 3, 'b': {'c': [4]}}),
+            # Merged into the first row
+            Metrics('i1', 's1', 'peer', {'d': 5}),
+        ]
+        table = MetricsTable.from_metrics_list(metrics_list)
+        assert len(table) == 3
+        assert sorted(table.metric_names) == ['a', 'b_c', 'd']
+
+        a, b_c, d = table.to_matrices('a', 'b_c', 'd')
+        np.testing.assert_array_equal(a, [[1, 2], [3, np.nan]])
+        np.testing.assert_array_equal(b_c, [[2, np.nan], [4, np.nan]])
+        np.testing.assert_array_equal(d, [[5, np.nan], [np.nan, np.nan]])
+
+        peers = table.filter('peer', 'a')
+        np.testing.assert_array_equal(peers.to_matrices('a'), [[1, 2]])
+        both = table.filter('all', 'a', 'b_c')
+        np.testing.assert_array_equal(both.to_matrices('a'), [[1], [3]])
+        assert len(table.filter('all', 'missing')) == 0
+
+        with self.assertRaises(Exception):
+            MetricsTable.from_metrics_list(metrics_list + [Metrics('i2', 's1', 'reference', {'a': 2})])
+
+    def test_from_metrics_list_merge(self):
+        # A later record should replace the whole top-level metric, like Metrics.merge
+        metrics_list = [
+            Metrics('i1', 's1', 'peer', {'a': {'b': 1, 'c': 2}, 'd': 3}),
+            Metrics('i2', 's1', 'peer', {'a': {'b': 4, 'c': 5}}),
+            Metrics('i1', 's1', 'peer', {'a': {'b': 6}}),
+        ]
+        expected = merge_metrics(metrics_list)
+        for metrics in expected:
+            metrics.flatten_keys()
+
+        table = MetricsTable.from_metrics_list(metrics_list)
+        assert sorted(table.metric_names) == ['a_b', 'a_c', 'd']
+        for name in table.metric_names:
+            np.testing.assert_array_equal(table.to_matrices(name), convert_to_matrices(expected, name))
+        np.testing.assert_array_equal(table.to_matrices('a_c'), [[np.nan, 5]])
+        np.testing.assert_array_equal(table.to_matrices('d'), [[3, np.nan]])
+
+    def test_from_metrics_list_non_numeric(self):
+        metrics_list = [
+            Metrics('i1', 's1', 'peer', {'a': 1, 'b': [], 'c': 'text', 'd': [1, 'text'], 'e': None}),
+            Metrics('i2', 's1', 'peer', {'a': 2, 'b': [3]}),
+        ]
+        table = MetricsTable.from_metrics_list(metrics_list)
+        assert sorted(table.metric_names) == ['a', 'b']
+        np.testing.assert_array_equal(table.to_matrices('b'), [[np.nan, 3]])
+
+        table = MetricsTable.from_metrics_list(metrics_list, metric_names=['a', 'b'])
+        assert sorted(table.metric_names) == ['a', 'b']
+        with self.assertRaises(Exception):
+            MetricsTable.from_metrics_list(metrics_list, metric_names=['a', 'c'])
+
+    def test_matches_convert_to_matrices(self):
+        metric1, metric2 = 'rouge-1_jk_precision', 'grade'
+        for summarizer_type in ['all', 'peer', 'reference']:
+            metrics_list = merge_metrics(JsonlReader(MULTILING_METRICS, Metrics).read())
+            for metrics in metrics_list:
+                metrics.flatten_keys()
+            metrics_list = filter_metrics(metrics_list, summarizer_type, metric1, metric2)
+            for metrics in metrics_list:
+                metrics.select_metrics([metric1, metric2])
+                metrics.average_values()
+            expected = convert_to_matrices(metrics_list, metric1, metric2)
+
+            table = MetricsTable.from_jsonl(MULTILING_METRICS, metric_names=[metric1, metric2])
+            actual = table.filter(summarizer_type, metric1, metric2).to_matrices(metric1, metric2)
+            for X, Y in zip(expected, actual):
+                np.testing.assert_array_equal(X, Y)
+
+    def test_multiple_files(self):
+        with TemporaryDirectory() as temp_dir:
+            with JsonlWriter(f'{temp_dir}/a.jsonl') as out:
+                out.write(Metrics('i1', 's1', 'peer', {'a': 1}))
+            with JsonlWriter(f'{temp_dir}/b.jsonl') as out:
+                out.write(Metrics('i1', 's1', 'peer', {'b': 2}))
+                out.write(Metrics('i2', 's1', 'peer', {'a': 3, 'b': 4}))
+
+            table = MetricsTable.from_jsonl([f'{temp_dir}/a.jsonl', f'{temp_dir}/b.jsonl'], metric_names=['a'])
+            assert table.metric_names == ['a']
+            np.testing.assert_array_equal(table.to_matrices('a'), [[1, 3]])
+
+    def test_npz(self):
+        table = MetricsTable.from_jsonl(MULTILING_METRICS)
+        with TemporaryDirectory() as temp_dir:
+            table.save_npz(f'{temp_dir}/metrics.npz')
+            for mmap in [True, False]:
+                loaded = MetricsTable.from_npz(f'{temp_dir}/metrics.npz', mmap=mmap)
+                assert loaded.instance_ids == table.instance_ids
+                assert loaded.summarizer_ids == table.summarizer_ids
+                assert loaded.metric_names == table.metric_names
+                for name in table.metric_names:
+                    np.testing.assert_array_equal(loaded.to_matrices(name), table.to_matrices(name))
+
+            loaded = MetricsTable.from_files(f'{temp_dir}/metrics.npz', metric_names=['grade'])
+            assert loaded.metric_names == ['grade']
+            np.testing.assert_array_equal(loaded.filter('peer', 'grade').to_matrices('grade'),
+                                          table.filter('peer', 'grade').to_matrices('grade'))
+
+    def test_merge(self):
+        with TemporaryDirectory() as temp_dir:
+            with JsonlWriter(f'{temp_dir}/a.jsonl') as out:
+                out.write(Metrics('i1', 's1', 'peer', {'a': 1}))
+                out.write(Metrics('i2', 's2', 'peer', {'a': 2}))
+            with JsonlWriter(f'{temp_dir}/b.jsonl') as out:
+                out.write(Metrics('i1', 's1', 'peer', {'b': 2}))
+                out.write(Metrics('i3', 's1', 'peer', {'a': 3, 'b': 4}))
+            MetricsTable.from_jsonl(f'{temp_dir}/b.jsonl').save_npz(f'{temp_dir}/b.npz')
+
+            expected = MetricsTable.from_files([f'{temp_dir}/a.jsonl', f'{temp_dir}/b.jsonl'])
+            actual = MetricsTable.from_files([f'{temp_dir}/a.jsonl', f'{temp_dir}/b.npz'])
+            assert len(actual) == 3
+            assert actual.instance_ids == expected.instance_ids
+            assert actual.summarizer_ids == expected.summarizer_ids
+            for name in ['a', 'b']:
+                np.testing.assert_array_equal(actual.to_matrices(name), expected.to_matrices(name))
+
+    def test_merge_replaces_top_level_metrics(self):
+        # A later file's "rouge-1" replaces the earlier one, including the sub-metrics which it does not have
+        with TemporaryDirectory() as temp_dir:
+            with JsonlWriter(f'{temp_dir}/a.jsonl') as out:
+                out.write(Metrics('i1', 's1', 'peer', {'rouge-1': {'recall': 1, 'precision': 2}, 'b': 3}))
+                out.write(Metrics('i2', 's1', 'peer', {'rouge-1': {'recall': 4, 'precision': 5}}))
+            with JsonlWriter(f'{temp_dir}/b.jsonl') as out:
+                out.write(Metrics('i1', 's1', 'peer', {'rouge-1': {'recall': 6}}))
+            MetricsTable.from_jsonl(f'{temp_dir}/b.jsonl').save_npz(f'{temp_dir}/b.npz')
+
+            expected = MetricsTable.from_files([f'{temp_dir}/a.jsonl', f'{temp_dir}/b.jsonl'])
+            actual = MetricsTable.from_files([f'{temp_dir}/a.jsonl', f'{temp_dir}/b.npz'])
+            np.testing.assert_array_equal(actual.to_matrices('rouge-1_recall'), [[6, 4]])
+            np.testing.assert_array_equal(actual.to_matrices('rouge-1_precision'), [[np.nan, 5]])
+            np.testing.assert_array_equal(actual.to_matrices('b'), [[3, np.nan]])
+            for name in ['rouge-1_recall', 'rouge-1_precision', 'b']:
+                np.testing.assert_array_equal(actual.to_matrices(name), expected.to_matrices(name))
@@ -0,0 +1,44 @@
+import jsons
+import math
+import unittest
+from unittest import mock
+
+from sacrerouge.data import Metrics, MetricsDict
+from sacrerouge.io import serialization
+from sacrerouge.io.serialization import dumps, loads
+
+
+class TestSerialization(unittest.TestCase):
+    def test_dumps_matches_jsons(self):
+        metrics = Metrics('d500', '5', 'peer', {'z': 4, 'b': {'c': [1, 2], 'a': float('nan')}})
+        assert dumps(metrics) == jsons.dumps(metrics)
+        assert dumps(metrics.metrics) == jsons.dumps(metrics.metrics)
+
+        instance = {'instance_id': 'd500', 'summary': {'text': ['a', 'b']}, 'references': [{'text': 'c'}]}
+        assert dumps(instance) == jsons.dumps(instance)
+
+        # Types without a fast path fall back to jsons
+        assert dumps((1, 2)) == jsons.dumps((1, 2))
+
+    def test_loads(self):
+        metrics = Metrics('d500', '5', 'peer', {'a': 4, 'b': {'c': [1, 2]}})
+        string = jsons.dumps(metrics)
+
+        deserialized = loads(string, Metrics)
+        assert deserialized == metrics
+        assert isinstance(deserialized.metrics, MetricsDict)
+        assert isinstance(deserialized.metrics['b'], MetricsDict)
+
+        metrics_dict = loads(jsons.dumps(metrics.metrics), MetricsDict)
+        assert metrics_dict == metrics.metrics
+        assert isinstance(metrics_dict['b'], MetricsDict)
+
+        assert loads(string) == jsons.loads(string)
+
+    def test_loads_nan(self):
+        # NaN is not valid json, but it is written by the json module, so it has to be readable with and
+        # without orjson
+        string = dumps(Metrics('d500', '5', 'peer', {'a': float('nan')}))
+        assert math.isnan(loads(string, Metrics).metrics['a'])
+        with mock.patch.object(serialization, 'ORJSON_INSTALLED', False):
+            assert math.isnan(loads(string, Metrics).metrics['a'])
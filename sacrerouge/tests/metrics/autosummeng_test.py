@@ -23,6 +23,11 @@ class TestAutoSummENG(ReferenceBasedMetricTestCase):
         ]
         super().assert_expected_output(metric, expected_output)
 
+    def test_use_maven(self):
+        expected = AutoSummENG().score_all(self.summaries, self.references_list)
+        metric = AutoSummENG(use_maven=False)
+        assert metric.score_all(self.summaries, self.references_list) == expected
+
     def test_autosummeng_order_invariant(self):
         metric = AutoSummENG()
         self.assert_order_invariant(metric)
@@ -26,6 +26,11 @@ class TestBEwTE(ReferenceBasedMetricTestCase):
         ]
         super().assert_expected_output(metric, expected_output)
 
+    def test_use_maven(self):
+        expected = BEwTE().score_all(self.summaries, self.references_list)
+        metric = BEwTE(use_maven=False)
+        assert metric.score_all(self.summaries, self.references_list) == expected
+
     def test_bewte_order_invariant(self):
         metric = BEwTE()
         self.assert_order_invariant(metric)
@@ -27,6 +27,18 @@ class TestMeteor(ReferenceBasedMetricTestCase):
         ]
         super().assert_expected_output(metric, expected_output)
 
+    def test_persistent_worker(self):
+        metric = Meteor(use_persistent_worker=True)
+        expected = Meteor().score_all(self.summaries, self.references_list)
+        assert metric.score_all(self.summaries, self.references_list) == expected
+
+        # The worker is reused by the next call
+        worker = metric._worker
+        assert metric.score_all(self.summaries, self.references_list) == expected
+        assert metric._worker is worker
+        metric.close()
+        assert not worker.is_alive()
+
     def test_bewte_order_invariant(self):
         metric = Meteor()
         self.assert_order_invariant(metric)
@@ -1,10 +1,16 @@
+import gc
 import pytest
+import random
+import weakref
+from collections import Counter
 
 from sacrerouge.common.testing.metric_test_cases import ReferenceBasedMetricTestCase
 from sacrerouge.common.testing.util import sacrerouge_command_exists
 from sacrerouge.data import MetricsDict
 from sacrerouge.metrics import PythonRouge, Rouge
-from sacrerouge.metrics.python_rouge import shorten_summary
+from sacrerouge.metrics.python_rouge import _count_ngram_intersections, _count_skip_bigram_intersections, \
+    _get_tokenization_cache, _stem, shorten_summary
+from sacrerouge.scripts.benchmark_python_rouge import longest_common_substring
 
 
 class TestPythonRouge(ReferenceBasedMetricTestCase):
@@ -232,6 +238,140 @@ class TestPythonRouge(ReferenceBasedMetricTestCase):
         actual_metrics, _ = python_rouge.evaluate(self.summaries, self.references_list)
         self.assert_same_as_rouge(actual_metrics, expected_metrics)
 
+    def test_count_ngram_intersections(self):
+        # The vectorized n-gram counts should exactly match counting the string n-grams
+        random.seed(4)
+        rouge = PythonRouge()
+        vocab = ['a', 'b', 'c', 'd', 'e']
+        for _ in range(20):
+            texts = []
+            for _ in range(random.randint(2, 8)):
+                texts.append([[random.choice(vocab) for _ in range(random.randint(0, 6))]
+                              for _ in range(random.randint(0, 3))])
+            num_summaries = random.randint(1, len(texts) - 1)
+            summaries, references = texts[:num_summaries], texts[num_summaries:]
+
+            counts = _count_ngram_intersections(texts, num_summaries, [1, 2, 4])
+            assert sorted(counts.keys()) == [1, 2, 4]
+            for n, (num_ngrams, intersections) in counts.items():
+                for i, summary in enumerate(summaries):
+                    for j, reference in enumerate(references):
+                        expected = rouge._calculate_intersection(rouge._count_ngrams(reference, n),
+                                                                 rouge._count_ngrams(summary, n))
+                        assert expected == (num_ngrams[num_summaries + j], num_ngrams[i], intersections[i, j])
+
+    def test_bit_parallel_lcs(self):
+        # The bit-parallel LCS should mark exactly the same hits as the dynamic programming implementation
+        random.seed(5)
+        rouge = PythonRouge()
+        for _ in range(1000):
+            vocab = ['a', 'b', 'c', 'd', 'e'][:random.randint(1, 5)]
+            tokens1 = [random.choice(vocab) for _ in range(random.randint(0, 10))]
+            tokens2 = [random.choice(vocab) for _ in range(random.randint(0, 10))]
+            expected = [random.randint(0, 1) for _ in tokens1]
+            actual = list(expected)
+            longest_common_substring(tokens1, tokens2, expected)
+            rouge._bit_parallel_lcs(tokens1, tokens2, rouge._get_match_masks(tokens2), actual)
+            assert expected == actual
+
+    def test_count_skip_bigram_intersections(self):
+        # The vectorized skip-bigram counts should exactly match counting the skip bigrams like the Perl script
+        def count_skip_bigrams(text, gap_length):
+            tokens = [token for sentence in text for token in sentence]
+            counts = Counter()
+            for i in range(len(tokens) - 1):
+                counts[tokens[i]] += 1
+                for j in range(i + 1, len(tokens)):
+                    if gap_length < 0 or j <= i + gap_length + 1:
+                        counts[tokens[i] + ' ' + tokens[j]] += 1
+            return counts
+
+        random.seed(6)
+        vocab = ['a', 'b', 'c', 'd', 'e']
+        for _ in range(50):
+            texts = []
+            for _ in range(random.randint(2, 8)):
+                texts.append([[random.choice(vocab) for _ in range(random.randint(0, 6))]
+                              for _ in range(random.randint(0, 3))])
+            num_summaries = random.randint(1, len(texts) - 1)
+            gap_length = random.randint(-1, 4)
+
+            num_skip_bigrams, intersections = _count_skip_bigram_intersections(texts, num_summaries, gap_length)
+            counts = [count_skip_bigrams(text, gap_length) for text in texts]
+            assert num_skip_bigrams.tolist() == [sum(text_counts.values()) for text_counts in counts]
+            for i in range(num_summaries):
+                for j in range(num_summaries, len(texts)):
+                    expected = sum(min(count, counts[j][key]) for key, count in counts[i].items())
+                    assert intersections[i, j - num_summaries] == expected
+
+    def test_rouge_su_and_w(self):
+        # The expected scores were calculated with the Perl script and the options "-m -2 4 -u -w 1.2 -f A"
+        summary = ['The cat sat on the mat today.', 'A dog barked loudly.']
+        references = [['the cat was on the mat.', 'The dog barked.'], ['A cat sat on a red mat.']]
+        rouge = PythonRouge(ngram_orders=[], skip_bigram_gap_length=4, wlcs_weight=1.2)
+        metrics = rouge.score(summary, references)
+        assert sorted(metrics.keys()) == ['python-rouge-su4', 'python-rouge-w-1.2']
+        assert metrics['python-rouge-su4']['recall'] == pytest.approx(53.125, abs=1e-3)
+        assert metrics['python-rouge-su4']['precision'] == pytest.approx(34.000, abs=1e-3)
+        assert metrics['python-rouge-su4']['f1'] == pytest.approx(41.463, abs=1e-3)
+        assert metrics['python-rouge-w-1.2']['recall'] == pytest.approx(46.264, abs=1e-3)
+        assert metrics['python-rouge-w-1.2']['precision'] == pytest.approx(47.675, abs=1e-3)
+        assert metrics['python-rouge-w-1.2']['f1'] == pytest.approx(46.959, abs=1e-3)
+
+        rouge = PythonRouge(ngram_orders=[], skip_bigram_gap_length=-1)
+        assert list(rouge.score(summary, references).keys()) == ['python-rouge-su*']
+
+    def test_python_rouge_su_and_w_multiling(self):
+        rouge = Rouge(max_ngram=2,
+                      max_words=100,
+                      compute_rouge_l=True,
+                      skip_bigram_gap_length=4,
+                      wlcs_weight=1.2)
+        python_rouge = PythonRouge(max_words=100,
+                                   compute_rouge_l=True,
+                                   skip_bigram_gap_length=4,
+                                   wlcs_weight=1.2)
+        expected_metrics, _ = rouge.evaluate(self.summaries, self.references_list)
+        actual_metrics, _ = python_rouge.evaluate(self.summaries, self.references_list)
+        self.assert_same_as_rouge(actual_metrics, expected_metrics)
+        for name in ['rouge-su4', 'rouge-w-1.2']:
+            for key in ['precision', 'recall', 'f1']:
+                assert expected_metrics[name][key] == pytest.approx(actual_metrics[f'python-{name}'][key], abs=1e-2)
+
+    def test_tokenization_cache(self):
+        sentence = 'The dissidents were sentenced to 13 years in prison.'
+        rouge1 = PythonRouge(ngram_orders=[1])
+        rouge2 = PythonRouge(ngram_orders=[2], compute_rouge_l=True)
+        uncached = PythonRouge(tokenization_cache_size=0)
+        expected = uncached.normalize_and_tokenize_sentence(sentence)
+        assert rouge1.normalize_and_tokenize_sentence(sentence) == expected
+
+        # Metrics with the same cache size share the cache
+        cache_info = _get_tokenization_cache(rouge1._tokenization_cache_size).cache_info()
+        tokens = rouge2.normalize_and_tokenize_sentence(sentence)
+        assert tokens == expected
+        assert _get_tokenization_cache(rouge1._tokenization_cache_size).cache_info().hits == cache_info.hits + 1
+        assert _stem('sentenced', rouge1._rouge_data_dir) == 'sentenc'
+        assert _stem.cache_info().maxsize is not None
+
+        # Modifying the returned tokens should not change the cache
+        tokens.append('extra')
+        assert rouge1.normalize_and_tokenize_sentence(sentence) == expected
+
+        # The preprocessing parameters are part of the cache key
+        no_stopwords = PythonRouge(remove_stopwords=True)
+        assert no_stopwords.normalize_and_tokenize_sentence(sentence) == \
+            PythonRouge(remove_stopwords=True, tokenization_cache_size=0).normalize_and_tokenize_sentence(sentence)
+        assert no_stopwords.normalize_and_tokenize_sentence(sentence) != expected
+
+        # The cache does not keep a reference to the instance which first used it
+        metric = PythonRouge()
+        metric.normalize_and_tokenize_sentence('A sentence which has not been tokenized before.')
+        reference = weakref.ref(metric)
+        del metric
+        gc.collect()
+        assert reference() is None
+
     def test_python_rouge_order_invariant(self):
         metric = PythonRouge()
         self.assert_order_invariant(metric)
@@ -1,10 +1,13 @@
 import os
 import pytest
+from subprocess import Popen, PIPE
 
+from sacrerouge.common import TemporaryDirectory
 from sacrerouge.common.testing import FIXTURES_ROOT
 from sacrerouge.common.testing.metric_test_cases import ReferenceBasedMetricTestCase
 from sacrerouge.common.testing.util import load_references, load_summaries, sacrerouge_command_exists
 from sacrerouge.metrics import Rouge
+from sacrerouge.metrics.rouge import _ROUGE_WORKERS, _RougeWorker
 
 _duc2004_file_path = 'datasets/duc-tac/duc2004/v1.0/task2.jsonl'
 _centroid_file_path = f'{FIXTURES_ROOT}/data/hong2014/centroid.jsonl'
@@ -182,6 +185,75 @@ class TestRouge(ReferenceBasedMetricTestCase):
         ]
         super().assert_expected_output(metric, expected_output)
 
+    def test_persistent_worker(self):
+        metric = Rouge(max_ngram=2, compute_rouge_l=True, use_persistent_worker=True)
+        expected = Rouge(max_ngram=2, compute_rouge_l=True).score_all(self.summaries, self.references_list)
+        assert metric.score_all(self.summaries, self.references_list) == expected
+
+        # The worker is reused by the next call and by other instances with the same script
+        worker = _ROUGE_WORKERS[(metric.rouge_script_location, 0)]
+        assert metric.score_all(self.summaries, self.references_list) == expected
+        other = Rouge(max_ngram=1, use_persistent_worker=True)
+        assert other.score_all(self.summaries, self.references_list) == \
+            Rouge(max_ngram=1).score_all(self.summaries, self.references_list)
+        assert _ROUGE_WORKERS[(metric.rouge_script_location, 0)] is worker
+
+    def test_persistent_worker_output(self):
+        # The worker rewrites the ROUGE script's source, so its output is compared byte-for-byte with running
+        # the script directly. The worker raises an error if the rewrite does not match any lines.
+        metric = Rouge(max_ngram=2, compute_rouge_l=True, skip_bigram_gap_length=4, wlcs_weight=1.2)
+        worker = _RougeWorker(metric.rouge_script_location)
+        try:
+            assert worker.num_rewritten_lines > 0
+            with TemporaryDirectory() as temp_dir:
+                summary_filenames_list, reference_filenames_list = [], []
+                for i, (summary, references) in enumerate(zip(self.summaries, self.references_list)):
+                    summary_filenames_list.append([f'{i}.txt'])
+                    with open(f'{temp_dir}/{i}.txt', 'w') as out:
+                        out.write(metric._format_summary(summary))
+                    reference_filenames_list.append([])
+                    for j, reference in enumerate(references):
+                        reference_filenames_list[-1].append(f'{i}.{j}.txt')
+                        with open(f'{temp_dir}/{i}.{j}.txt', 'w') as out:
+                            out.write(metric._format_summary(reference))
+                config_filename = f'{temp_dir}/config.xml'
+                with open(config_filename, 'w') as out:
+                    out.write(metric._format_config_file(temp_dir, summary_filenames_list, reference_filenames_list))
+
+                for score_only in [False, True]:
+                    command = metric._get_command(config_filename, score_only)
+                    process = Popen(command, stdout=PIPE, stderr=PIPE)
+                    expected_stdout, expected_stderr = process.communicate()
+                    status, stdout, stderr = worker.run(command[1:])
+                    assert status == process.returncode == 0
+                    assert len(expected_stdout) > 0
+                    assert stdout.encode() == expected_stdout
+                    assert stderr.encode() == expected_stderr
+        finally:
+            worker.close()
+
+    def test_score_only_num_processes(self):
+        # The summary-level scores do not depend on the bootstrap resampling or how the instances are chunked
+        _, expected = Rouge(max_ngram=2, compute_rouge_l=True).evaluate(self.summaries, self.references_list)
+        for num_processes in [1, 3]:
+            metric = Rouge(max_ngram=2, compute_rouge_l=True, num_processes=num_processes)
+            assert metric.score_all(self.summaries, self.references_list) == expected
+
+        metric = Rouge(max_ngram=2, compute_rouge_l=True, num_processes=2, use_persistent_worker=True)
+        assert metric.score_all(self.summaries, self.references_list) == expected
+        assert (metric.rouge_script_location, 1) in _ROUGE_WORKERS
+
+    def test_score_only_empty_groups(self):
+        # Groups without any summaries do not produce any ROUGE output, even at the end of a chunk
+        S, refs = self.summaries, self.references_list
+        summaries_list = [S[0:3], [], S[3:5], [], [], S[5:8], []]
+        references_list = [refs[0], refs[1], refs[3], refs[4], refs[5], refs[5], refs[6]]
+        expected = Rouge(max_ngram=2).score_multi_all(summaries_list, references_list)
+        assert [len(metrics_list) for metrics_list in expected] == [3, 0, 2, 0, 0, 3, 0]
+        for num_processes in [2, 3, 4]:
+            metric = Rouge(max_ngram=2, num_processes=num_processes)
+            assert metric.score_multi_all(summaries_list, references_list) == expected
+
     def test_rouge_order_invariant(self):
         metric = Rouge(max_words=100)
         self.assert_order_invariant(metric)
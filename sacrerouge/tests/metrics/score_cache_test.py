@@ -0,0 +1,153 @@
+import unittest
+
+from sacrerouge.commands.score import score_instances
+from sacrerouge.common import TemporaryDirectory
+from sacrerouge.common.testing import MULTILING_SUMMARIES
+from sacrerouge.data.dataset_readers import ReferenceBasedDatasetReader
+from sacrerouge.metrics import CachedMetric, PythonRouge, ScoreCache
+from sacrerouge.metrics.score_cache import get_metric_fingerprint
+
+
+class _CountingRouge(PythonRouge):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.num_summaries = 0
+
+    def supports_reference_statistics(self) -> bool:
+        # Makes sure that all of the scoring goes through `score_multi_all`
+        return False
+
+    def score_multi_all(self, summaries_list, references_list):
+        self.num_summaries += sum(len(summaries) for summaries in summaries_list)
+        return super().score_multi_all(summaries_list, references_list)
+
+
+class _CountingStatisticsRouge(PythonRouge):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.num_summaries = 0
+
+    def score_reference_statistics_multi_all(self, summaries_list, references_list):
+        self.num_summaries += sum(len(summaries) for summaries in summaries_list)
+        return super().score_reference_statistics_multi_all(summaries_list, references_list)
+
+
+class TestScoreCache(unittest.TestCase):
+    def test_cached_metric(self):
+        instances = ReferenceBasedDatasetReader().read(MULTILING_SUMMARIES)
+        expected = score_instances(instances, [PythonRouge()])
+
+        with TemporaryDirectory() as temp_dir:
+            cache = ScoreCache(f'{temp_dir}/cache.db')
+            metric = _CountingRouge()
+            first = score_instances(instances[:10], [CachedMetric(metric, cache)])
+            num_scored = metric.num_summaries
+            assert num_scored > 0
+
+            # Only the summaries which were not scored in the first run should be scored. The cache is
+            # reopened to make sure it is persistent
+            cache.close()
+            cache = ScoreCache(f'{temp_dir}/cache.db')
+            metric = _CountingRouge()
+            second = score_instances(instances, [CachedMetric(metric, cache)])
+            everything = _CountingRouge()
+            score_instances(instances, [everything])
+            assert metric.num_summaries == everything.num_summaries - num_scored
+
+            for metrics_dicts in [first, second]:
+                for instance_id in metrics_dicts:
+                    for summarizer_id in metrics_dicts[instance_id]:
+                        assert metrics_dicts[instance_id][summarizer_id] == expected[instance_id][summarizer_id]
+
+            # A different configuration should not use the same entries
+            metric = _CountingRouge(use_porter_stemmer=False)
+            score_instances(instances[:10], [CachedMetric(metric, cache)])
+            assert metric.num_summaries == num_scored
+
+    def test_cached_reference_statistics(self):
+        instances = ReferenceBasedDatasetReader().read(MULTILING_SUMMARIES)
+        expected = score_instances(instances, [PythonRouge(compute_rouge_l=True)])
+
+        with TemporaryDirectory() as temp_dir:
+            cache = ScoreCache(f'{temp_dir}/cache.db')
+            metric = _CountingStatisticsRouge(compute_rouge_l=True)
+            cached_metric = CachedMetric(metric, cache)
+            assert cached_metric.supports_reference_statistics()
+            first = score_instances(instances[:10], [cached_metric])
+            num_scored = metric.num_summaries
+            assert num_scored > 0
+
+            metric = _CountingStatisticsRouge(compute_rouge_l=True)
+            second = score_instances(instances, [CachedMetric(metric, cache)])
+            everything = _CountingStatisticsRouge(compute_rouge_l=True)
+            score_instances(instances, [everything])
+            assert metric.num_summaries == everything.num_summaries - num_scored
+
+            for metrics_dicts in [first, second]:
+                for instance_id in metrics_dicts:
+                    for summarizer_id in metrics_dicts[instance_id]:
+                        assert metrics_dicts[instance_id][summarizer_id] == expected[instance_id][summarizer_id]
+
+    def test_process_backend(self):
+        # The cache is pickled into the worker processes, which reopen their own connections to the same file
+        instances = ReferenceBasedDatasetReader().read(MULTILING_SUMMARIES)
+        expected = score_instances(instances, [_CountingRouge(ngram_orders=[1]), _CountingRouge(ngram_orders=[2])])
+
+        with TemporaryDirectory() as temp_dir:
+            cache = ScoreCache(f'{temp_dir}/cache.db')
+            metrics = [CachedMetric(_CountingRouge(ngram_orders=[1]), cache),
+                       CachedMetric(_CountingRouge(ngram_orders=[2]), cache)]
+            actual = score_instances(instances, metrics, max_parallel_metrics=2, parallel_backend='process')
+            assert expected == actual
+
+            # Everything should have been cached by the workers
+            assert len(cache) > 0
+            metric = _CountingRouge(ngram_orders=[1])
+            assert score_instances(instances, [CachedMetric(metric, cache)]) == \
+                score_instances(instances, [_CountingRouge(ngram_orders=[1])])
+            assert metric.num_summaries == 0
+
+    def test_fingerprint(self):
+        assert get_metric_fingerprint(PythonRouge()) == get_metric_fingerprint(PythonRouge())
+        # The default values are part of the fingerprint
+        assert get_metric_fingerprint(PythonRouge()) == get_metric_fingerprint(PythonRouge(ngram_orders=[1, 2]))
+        assert get_metric_fingerprint(PythonRouge()) != get_metric_fingerprint(PythonRouge(remove_stopwords=True))
+        # Only the constructor arguments, not private attributes like PythonRouge's resolved data directory, are included
+        assert '_rouge_data_dir' not in get_metric_fingerprint(PythonRouge())
+        # The tokenization cache does not change the scores
+        assert get_metric_fingerprint(PythonRouge()) == get_metric_fingerprint(PythonRouge(tokenization_cache_size=0))
+
+        class _ExecutionRouge(PythonRouge):
+            execution_parameters = ['num_processes']
+
+            def __init__(self, num_processes: int = 1, stemmer=None, **kwargs):
+                super().__init__(**kwargs)
+
+        assert get_metric_fingerprint(_ExecutionRouge(num_processes=1)) == \
+            get_metric_fingerprint(_ExecutionRouge(num_processes=4))
+        with self.assertRaises(Exception):
+            get_metric_fingerprint(_ExecutionRouge(stemmer=object()))
+
+    def test_eviction(self):
+        with TemporaryDirectory() as temp_dir:
+            cache = ScoreCache(f'{temp_dir}/cache.db', max_size_bytes=100)
+            cache.put_many({'a': {'value': 1.0}, 'b': {'value': 2.0}})
+            assert cache.get_many(['a']) == {'a': {'value': 1.0}}
+            for i in range(20):
+                cache.put_many({f'key{i}': {'value': float(i)}})
+            assert len(cache) < 22
+            assert 'key19' in cache.get_many(['key19'])
+            assert cache.get_many(['b']) == {}
+
+            # The total size is maintained incrementally, including when an entry is replaced
+            cache.put_many({'key19': {'value': 19.0, 'other': 1.0}})
+            total, = cache.connection.execute('SELECT SUM(size) FROM scores').fetchone()
+            assert cache._get_total_size() == total <= 100
+            cache.close()
+
+            # The total size of a cache from before the size was tracked is calculated when it is opened
+            cache = ScoreCache(f'{temp_dir}/cache.db')
+            cache.connection.execute('DROP TABLE total_size')
+            cache.close()
+            cache = ScoreCache(f'{temp_dir}/cache.db')
+            assert cache._get_total_size() == total
@@ -0,0 +1,35 @@
+import unittest
+
+from sacrerouge.commands.evaluate import evaluate_instances
+from sacrerouge.commands.score import score_instances
+from sacrerouge.common.testing import MULTILING_SUMMARIES
+from sacrerouge.data.dataset_readers import ReferenceBasedDatasetReader
+from sacrerouge.metrics import PythonRouge, ShardedMetric
+from sacrerouge.metrics.sharded_metric import _get_shard_boundaries
+
+
+class TestShardedMetric(unittest.TestCase):
+    def test_get_shard_boundaries(self):
+        assert _get_shard_boundaries([], 4) == []
+        assert _get_shard_boundaries([1, 1, 1, 1], 2) == [(0, 2), (2, 4)]
+        assert _get_shard_boundaries([1, 1, 1, 1], 8) == [(0, 1), (1, 2), (2, 3), (3, 4)]
+        assert _get_shard_boundaries([5, 1, 1, 1, 1, 1], 2) == [(0, 1), (1, 6)]
+
+    def test_score_instances(self):
+        # Sharding should not change the scores, including the jackknifed ones
+        instances = ReferenceBasedDatasetReader().read(MULTILING_SUMMARIES)
+        expected = score_instances(instances, [PythonRouge()])
+
+        metric = ShardedMetric(PythonRouge(), num_workers=3)
+        try:
+            actual = score_instances(instances, [metric])
+        finally:
+            metric.close()
+        assert expected == actual
+
+    def test_evaluate_instances(self):
+        instances = ReferenceBasedDatasetReader().read(MULTILING_SUMMARIES)
+        expected_macro, expected_micro = evaluate_instances(instances, [PythonRouge()])
+        actual_macro, actual_micro = evaluate_instances(instances, [PythonRouge()], num_workers=2)
+        assert expected_macro == actual_macro
+        assert expected_micro == actual_micro
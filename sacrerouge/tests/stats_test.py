@@ -7,7 +7,16 @@ from sacrerouge.data import Metrics
 from sacrerouge.stats import convert_to_matrices, summary_level_corr, system_level_corr, global_corr, \
     bootstrap_system_sample, bootstrap_input_sample, bootstrap_both_sample, bootstrap_ci, fisher_ci, corr_ci, \
     random_bool_mask, permute_systems, permute_inputs, permute_both, bootstrap_diff_test, permutation_diff_test, \
-    williams_diff_test, corr_diff_test, bonferroni_partial_conjunction_pvalue_test
+    williams_diff_test, corr_diff_test, bonferroni_partial_conjunction_pvalue_test, fast_kendalltau
+
+
+def _custom_system_sample(*matrices: np.ndarray):
+    # A sample function which the vectorized implementation does not know about
+    return bootstrap_system_sample(*matrices)
+
+
+def _custom_permute_systems(X: np.ndarray, Y: np.ndarray):
+    return permute_systems(X, Y)
 
 
 class TestStats(unittest.TestCase):
@@ -212,6 +221,32 @@ class TestStats(unittest.TestCase):
         with self.assertRaises(Exception):
             global_corr(pearsonr, X, Y)
 
+    def test_fast_kendalltau(self):
+        # Tests with and without ties, which should match scipy's asymptotic p-value
+        np.random.seed(8)
+        for n in [3, 10, 57]:
+            for x, y in [(np.random.rand(n), np.random.rand(n)),
+                         (np.random.randint(0, 3, n), np.random.rand(n)),
+                         (np.random.randint(0, 4, n), np.random.randint(0, 2, n))]:
+                expected = kendalltau(x, y, method='asymptotic')
+                actual = fast_kendalltau(x, y)
+                self.assertAlmostEqual(actual[0], expected[0], places=8)
+                self.assertAlmostEqual(actual[1], expected[1], places=8)
+
+        # Constant input is undefined
+        self.assertTrue(np.isnan(fast_kendalltau([1, 1, 1], [1, 2, 3])[0]))
+
+        # The summary-level correlation computes every column at once
+        X = np.random.randint(0, 5, (9, 7)).astype(float)
+        Y = np.random.rand(9, 7)
+        X[0, 1] = Y[0, 1] = np.nan
+        X[:, 3] = 2
+        expected = summary_level_corr(kendalltau, X, Y, return_num_instances=True)
+        actual = summary_level_corr(fast_kendalltau, X, Y, return_num_instances=True)
+        self.assertAlmostEqual(actual[0], expected[0], places=8)
+        self.assertEqual(actual[1], expected[1])
+        self.assertAlmostEqual(global_corr(fast_kendalltau, X, Y), global_corr(kendalltau, X, Y), places=8)
+
     def test_bootstrap_system_sample(self):
         A = np.array([
             [1, 2, 3, 4],
@@ -319,6 +354,75 @@ class TestStats(unittest.TestCase):
         self.assertAlmostEqual(lower, -1.0, places=4)
         self.assertAlmostEqual(upper, 1.0, places=4)
 
+    def test_bootstrap_ci_vectorized(self):
+        # The vectorized implementation should produce the same samples as the non-vectorized version
+        np.random.seed(3)
+        X = np.random.randint(0, 5, (8, 6)).astype(float)
+        Y = np.random.rand(8, 6)
+        X[0, 1] = Y[0, 1] = np.nan
+        X[3, 4] = Y[3, 4] = np.nan
+
+        for level in [global_corr, system_level_corr, summary_level_corr]:
+            for coef in [pearsonr, spearmanr, kendalltau]:
+                corr_func = functools.partial(level, coef)
+                for sample_func in [bootstrap_system_sample, bootstrap_input_sample, bootstrap_both_sample]:
+                    np.random.seed(4)
+                    expected = bootstrap_ci(corr_func, X, Y, sample_func, num_samples=100,
+                                            return_sample_correlations=True, vectorized=False)
+                    np.random.seed(4)
+                    actual = bootstrap_ci(corr_func, X, Y, sample_func, num_samples=100,
+                                          return_sample_correlations=True, batch_size=30)
+                    self.assertAlmostEqual(actual[0], expected[0], places=4)
+                    self.assertAlmostEqual(actual[1], expected[1], places=4)
+                    np.testing.assert_array_almost_equal(actual[2], expected[2])
+
+    def test_bootstrap_ci_parallel(self):
+        # The parallel result should be reproducible and not depend on the number of jobs or the backend
+        np.random.seed(3)
+        X = np.random.rand(8, 6)
+        Y = np.random.rand(8, 6)
+
+        for coef in [pearsonr, kendalltau]:
+            corr_func = functools.partial(summary_level_corr, coef)
+            np.random.seed(4)
+            expected = bootstrap_ci(corr_func, X, Y, bootstrap_both_sample, num_samples=100, batch_size=30,
+                                    n_jobs=2)
+            np.random.seed(4)
+            actual = bootstrap_ci(corr_func, X, Y, bootstrap_both_sample, num_samples=100, batch_size=30,
+                                  n_jobs=3, backend='thread')
+            self.assertAlmostEqual(actual[0], expected[0], places=4)
+            self.assertAlmostEqual(actual[1], expected[1], places=4)
+
+    def test_parallel_custom_functions(self):
+        # Custom sample and permutation functions should be called on each block's own random stream, so the
+        # result is reproducible and does not depend on the number of jobs or the backend
+        np.random.seed(3)
+        X = np.random.rand(8, 6)
+        Y = np.random.rand(8, 6)
+        Z = np.random.rand(8, 6)
+        corr_func = functools.partial(global_corr, pearsonr)
+
+        tests = [
+            functools.partial(bootstrap_ci, corr_func, X, Y, _custom_system_sample, num_samples=100,
+                              return_sample_correlations=True),
+            functools.partial(bootstrap_diff_test, corr_func, X, Y, Z, _custom_system_sample, False,
+                              num_samples=100, return_deltas=True),
+            functools.partial(permutation_diff_test, corr_func, X, Y, Z, _custom_permute_systems, False,
+                              num_permutations=100, return_deltas=True),
+        ]
+        for test in tests:
+            np.random.seed(4)
+            expected = test(batch_size=30, n_jobs=2)
+            state = np.random.get_state()[1].copy()
+            np.random.seed(4)
+            actual = test(batch_size=30, n_jobs=3, backend='thread')
+            np.testing.assert_array_almost_equal(actual[-1], expected[-1])
+            self.assertAlmostEqual(actual[0], expected[0], places=8)
+            assert len(actual[-1]) == 100
+
+            # The global random state should only have advanced by drawing the root seed
+            np.testing.assert_array_equal(np.random.get_state()[1], state)
+
     def test_fisher_ci(self):
         pearson_global = functools.partial(global_corr, pearsonr)
         spearman_global = functools.partial(global_corr, spearmanr)
@@ -506,6 +610,22 @@ class TestStats(unittest.TestCase):
         np.random.seed(2)
         assert bootstrap_diff_test(corr_func, Y, X, Z, bootstrap_system_sample, False) == 0.042
 
+    def test_bootstrap_diff_test_vectorized_ties(self):
+        # Y is a linear function of X, so every delta is 0 up to floating point error and each one should be counted
+        np.random.seed(12)
+        X = np.random.random((9, 5))
+        Y = X * 3.7 + 0.1
+        Z = np.random.random((9, 5))
+
+        for level in [global_corr, system_level_corr, summary_level_corr]:
+            corr_func = functools.partial(level, pearsonr)
+            for two_tailed in [False, True]:
+                for n_jobs in [1, 2]:
+                    np.random.seed(2)
+                    pvalue = bootstrap_diff_test(corr_func, X, Y, Z, bootstrap_both_sample, two_tailed,
+                                                 num_samples=100, batch_size=30, n_jobs=n_jobs, backend='thread')
+                    assert pvalue == 1.0
+
     def test_permutation_diff_test(self):
         # Regression test
         np.random.seed(12)
@@ -519,6 +639,56 @@ class TestStats(unittest.TestCase):
         np.random.seed(2)
         self.assertAlmostEqual(permutation_diff_test(corr_func, Y, X, Z, permute_both, False), 0.030969030969030968, places=4)
 
+    def test_permutation_diff_test_vectorized(self):
+        # The vectorized implementation should use the same permutations as the non-vectorized version
+        np.random.seed(12)
+        X = np.random.random((9, 5))
+        Y = np.random.random((9, 5))
+        Z = np.random.random((9, 5))
+        X[0, 1] = Y[0, 1] = Z[0, 1] = np.nan
+
+        for level in [global_corr, system_level_corr, summary_level_corr]:
+            for coef in [pearsonr, spearmanr]:
+                corr_func = functools.partial(level, coef)
+                for permute_func in [permute_both, permute_systems, permute_inputs]:
+                    np.random.seed(2)
+                    expected_pvalue, delta_orig, expected_deltas = \
+                        permutation_diff_test(corr_func, X, Y, Z, permute_func, True, num_permutations=100,
+                                              return_test_statistic=True, return_deltas=True)
+                    np.random.seed(2)
+                    pvalue, deltas = permutation_diff_test(corr_func, X, Y, Z, permute_func, True,
+                                                           num_permutations=100, return_deltas=True,
+                                                           vectorized=True, batch_size=30)
+                    np.testing.assert_array_almost_equal(deltas, expected_deltas)
+
+                    # The non-vectorized version compares the deltas exactly
+                    expected_deltas = np.array(expected_deltas)
+                    count = (expected_deltas >= delta_orig).sum()
+                    self.assertAlmostEqual(expected_pvalue, (count + 1) / 101, places=8)
+
+                    # The vectorized version also counts the deltas which tie up to floating point error
+                    count = (expected_deltas >= delta_orig - 1e-12).sum()
+                    self.assertAlmostEqual(pvalue, (count + 1) / 101, places=8)
+                    assert pvalue >= expected_pvalue
+
+    def test_permutation_diff_test_parallel(self):
+        # The parallel result should be reproducible and not depend on the number of jobs or the backend
+        np.random.seed(12)
+        X = np.random.random((9, 5))
+        Y = np.random.random((9, 5))
+        Z = np.random.random((9, 5))
+
+        for coef in [pearsonr, kendalltau]:
+            corr_func = functools.partial(global_corr, coef)
+            for vectorized in [False, True]:
+                np.random.seed(2)
+                expected = permutation_diff_test(corr_func, X, Y, Z, permute_both, False, num_permutations=100,
+                                                 vectorized=vectorized, batch_size=30, n_jobs=2)
+                np.random.seed(2)
+                actual = permutation_diff_test(corr_func, X, Y, Z, permute_both, False, num_permutations=100,
+                                               vectorized=vectorized, batch_size=30, n_jobs=3, backend='thread')
+                assert actual == expected
+
     def test_williams_diff_test(self):
         # This test verifies that the output is the same as the psych package for
         # several different randomly generated inputs